@@ -2,28 +2,33 @@ from __future__ import annotations
 
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
 import os
 import math
 import time
 from urllib.parse import urlparse, parse_qs
 import plotly.graph_objects as go
 from src.utils.http_utils import (
-    search_athletes,                                        # FFA autocomplete (legacy)
-    search_athletes_smart,                                  # FFA+LePistard smart search
+    search_athletes_smart,                                  # FFA+LePistard(+DB/WA) recherche parallèle
 )
 from src.utils.wa_utils import (
     search_wa_athletes,                                     # WA autocomplete (fallback)
-    fetch_and_store_wa_results                              # WA scraping (fallback)
+    fetch_and_store_wa_results,                             # WA scraping (fallback)
+    get_wa_fetch_status,                                    # saisons WA récupérées / manquantes
+    schedule_wa_continuation,                               # reprise WA en arrière-plan
 )
 from src.utils.athlete_utils import (
     save_results_to_postgres,
     save_athlete_info,
     clean_and_prepare_results_df,
+    search_athletes_db,                                     # recherche locale (pg_trgm si migré)
     # get_all_athlete_results
 )
-from src.utils.file_utils import convert_time_to_seconds
+from src.utils.file_utils import convert_times_to_seconds
+from src.utils.name_index import AthleteNameIndex
+from src.utils.search_cache import cache_stats as search_cache_stats
 from src.utils.ffa_fast import get_all_results_fast as get_all_athlete_results
+from src.data_storage.engine import get_engine
+from src.data_storage.schema import ensure_schema
 
 
 def get_optional_secret(secret_key: str, env_key: str, default_value: str = "") -> str:
@@ -46,7 +51,23 @@ except Exception:
     db_url = os.getenv("DB_URL")
     WA_API_URL = os.getenv("WA_API_URL")
     WA_API_KEY = os.getenv("WA_API_KEY")
-engine = create_engine(db_url)
+
+
+@st.cache_resource
+def get_db_engine(url: str):
+    """
+    Moteur (et pool) unique pour toutes les sessions et tous les reruns ;
+    les migrations manquantes sont appliquées à sa création.
+    """
+    engine = get_engine(url)
+    try:
+        ensure_schema(engine)
+    except Exception as e:
+        print(f"⚠️ Migrations non appliquées : {e}")
+    return engine
+
+
+engine = get_db_engine(db_url)
 TUTORIAL_VIDEO_URL = get_optional_secret(
     "TUTORIAL_VIDEO_URL",
     "TUTORIAL_VIDEO_URL",
@@ -209,28 +230,32 @@ def merge_athlete_candidates(*groups: list[dict]) -> list[dict]:
     return merged
 
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_name_index() -> AthleteNameIndex:
+    """
+    Index des noms de la table athletes, partagé par toutes les sessions.
+    Chargé en arrière-plan : vide (recherche réseau seule) tant qu'il ne l'est pas.
+    """
+    index = AthleteNameIndex()
+    index.refresh_in_background(engine)
+    return index
+
+
+def memory_search_for(source: str):
+    """Recherche dans l'index en mémoire (rafraîchi en arrière-plan depuis last_update si besoin)."""
+    index = get_name_index()
+    index.refresh_if_stale(engine)
+    return lambda t: index.search(t, source=source)
+
+
 def search_athletes_from_db(term: str, wa_only: bool = False, limit: int = 10) -> list[dict]:
+    # Pas de st.cache_data : appelée depuis un thread de la recherche parallèle
     term_norm = str(term or "").strip().lower()
     if len(term_norm) < 3:
         return []
 
-    where_wa = "AND seq LIKE 'WA_%'" if wa_only else ""
-    query = f"""
-        SELECT seq, name, club, sex
-        FROM athletes
-        WHERE LOWER(name) LIKE %(term)s
-        {where_wa}
-        ORDER BY name ASC
-        LIMIT %(limit)s
-    """
-
     try:
-        df_db = pd.read_sql_query(
-            query,
-            engine,
-            params={"term": f"%{term_norm}%", "limit": int(limit)},
-        )
+        df_db = search_athletes_db(engine, term_norm, wa_only=wa_only, limit=limit)
     except Exception:
         return []
 
@@ -282,16 +307,25 @@ elif search_clicked or search_requested_main:
 if should_search_main:
     with st.spinner("Recherche des athlètes…"):
         if include_wa_search:
-            athletes = search_wa_athletes(search_term)
-            if not athletes:
-                athletes = search_athletes_from_db(search_term, wa_only=True)
+            # WA + base locale en parallèle
+            athletes = search_athletes_smart(
+                search_term,
+                db_search=lambda t: search_athletes_from_db(t, wa_only=True),
+                wa_search=search_wa_athletes,
+                ffa=False,
+                memory_search=memory_search_for("WA"),
+            )
             print(f"Mode WA direct activé: {len(athletes)} résultat(s)")
         else:
-            # Recherche FFA
-            athletes = search_athletes_smart(search_term)
-            if not athletes:
-                athletes = search_athletes(search_term)
+            # Recherche FFA + Le Pistard + base locale en parallèle
+            athletes = search_athletes_smart(
+                search_term,
+                db_search=lambda t: [a for a in search_athletes_from_db(t) if a["source"] == "FFA"],
+                memory_search=memory_search_for("FFA"),
+            )
 
+        stats = search_cache_stats()
+        print(f"Cache des recherches : {stats['hit_ratio']:.0%} de hits ({stats['entries']} entrées)")
         st.session_state["athletes"] = athletes
         st.session_state["athlete_options"] = [
             f"{a['name']} ({a.get('club','')})" for a in athletes
@@ -361,6 +395,13 @@ if selected:
         def wa_progress(message: str):
             set_progress(45, message)
 
+        is_wa_seq = str(seq_local).startswith("WA_")
+        partial_wa = st.session_state.setdefault("wa_partial_seqs", set())
+        if is_wa_seq and seq_local in partial_wa and get_wa_fetch_status(engine, seq_local)["status"] != "partial":
+            # Reprise d'arrière-plan terminée : le cache local ne reflète plus la base
+            partial_wa.discard(seq_local)
+            get_results_from_db.clear()
+
         t0 = time.perf_counter()
         set_progress(10, "Lecture des données en base…")
         df_local = get_results_from_db(seq_local)
@@ -393,11 +434,21 @@ if selected:
                         t_scrape = time.perf_counter()
                         df_local = get_all_athlete_results(seq_local)
                         timings["ffa_scrape_s"] = round(time.perf_counter() - t_scrape, 3)
+                        # Profil (naissance) déjà lu pendant le scraping : pas de second téléchargement
+                        profile = df_local.attrs.get("profile") or {}
                         if not df_local.empty:
                             set_progress(60, "Nettoyage des résultats FFA…")
                             df_local = clean_and_prepare_results_df(df_local, seq_local)
                             set_progress(75, "Insertion des résultats en base…")
-                            save_athlete_info(seq_local, name_local, club_local, sex_local, engine)
+                            save_athlete_info(
+                                seq_local,
+                                name_local,
+                                club_local,
+                                sex_local,
+                                engine,
+                                birth_date_raw=profile.get("birth_date_raw"),
+                                birth_year=profile.get("birth_year"),
+                            )
                             save_results_to_postgres(df_local, seq_local, engine)
                             get_results_from_db.clear()
                             get_birth_year_from_db.clear()
@@ -426,6 +477,17 @@ if selected:
             if show_loaded_message:
                 st.success(f"Données chargées depuis la base pour {name_local}.")
 
+        if is_wa_seq:
+            wa_status = get_wa_fetch_status(engine, seq_local)
+            if wa_status["status"] == "partial":
+                schedule_wa_continuation(engine, seq_local)
+                partial_wa.add(seq_local)
+                st.info(
+                    f"Historique World Athletics partiel ({len(wa_status['expected']) - len(wa_status['missing'])}"
+                    f"/{len(wa_status['expected'])} saisons) : les saisons manquantes sont récupérées "
+                    "en arrière-plan, rechargez dans quelques instants."
+                )
+
         set_progress(100, "Chargement terminé.")
         progress_container.empty()
 
@@ -467,13 +529,19 @@ if selected:
         ):
             with st.spinner("Recherche du 2e athlète…"):
                 if include_wa_compare:
-                    athletes_compare = search_wa_athletes(search_term_compare)
-                    if not athletes_compare:
-                        athletes_compare = search_athletes_from_db(search_term_compare, wa_only=True)
+                    athletes_compare = search_athletes_smart(
+                        search_term_compare,
+                        db_search=lambda t: search_athletes_from_db(t, wa_only=True),
+                        wa_search=search_wa_athletes,
+                        ffa=False,
+                        memory_search=memory_search_for("WA"),
+                    )
                 else:
-                    athletes_compare = search_athletes_smart(search_term_compare)
-                    if not athletes_compare:
-                        athletes_compare = search_athletes(search_term_compare)
+                    athletes_compare = search_athletes_smart(
+                        search_term_compare,
+                        db_search=lambda t: [a for a in search_athletes_from_db(t) if a["source"] == "FFA"],
+                        memory_search=memory_search_for("FFA"),
+                    )
 
                 st.session_state["athletes_compare"] = athletes_compare
                 st.session_state["athlete_options_compare"] = [
@@ -605,7 +673,14 @@ if selected:
         df_plot = df_plot[
             ~df_plot["perf"].str.contains("|".join(["DNS", "DNF", "AB", "DQ"]), na=False)
         ]
-        df_plot["time"] = df_plot["perf"].apply(convert_time_to_seconds)
+        if "perf_seconds" in df_plot.columns:
+            # Valeur calculée à l'écriture ; conversion seulement pour les lignes non complétées
+            df_plot["time"] = pd.to_numeric(df_plot["perf_seconds"], errors="coerce")
+            pending = df_plot["perf_status"].isna()
+            if pending.any():
+                df_plot.loc[pending, "time"] = convert_times_to_seconds(df_plot.loc[pending, "perf"])
+        else:
+            df_plot["time"] = convert_times_to_seconds(df_plot["perf"])
         df_plot["LieuType"] = df_plot["epreuve"].str.contains("Piste Courte", na=False).map(
             {True: "Indoor", False: "Outdoor"}
         )
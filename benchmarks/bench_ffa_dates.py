@@ -0,0 +1,91 @@
+"""Benchmark de la normalisation des dates FFA (`clean_and_prepare_results_df`).
+
+Usage :
+    python -m benchmarks.bench_ffa_dates                # 200 000 lignes
+    python -m benchmarks.bench_ffa_dates --rows 1000000
+
+Compare l'ancienne méthode (un `str.replace` par libellé de mois sur toute
+la colonne, puis `to_datetime`) à `normalize_ffa_dates`, qui n'analyse que
+les couples (date, année) distincts. Les deux sorties doivent coïncider sur
+les formats que l'ancienne méthode savait lire ; les cas qu'elle ratait
+(« févr », « juillet »…) sont listés à part.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from src.utils.athlete_utils import normalize_ffa_dates
+
+_MOIS = [
+    "janv.", "Fév.", "Mars", "avr.", "Mai", "Juin", "juil.", "Août", "sept.", "oct.", "nov.", "déc.",
+    "févr.", "Juillet", "mar", "jun",
+]
+
+_LEGACY_MOIS_MAP = {
+    "janv": "Jan", "jan": "Jan", "fév": "Feb", "fev": "Feb", "mars": "Mar", "mar": "Mar",
+    "avr": "Apr", "avr.": "Apr", "mai": "May", "juin": "Jun", "jun": "Jun", "juil": "Jul",
+    "juil.": "Jul", "août": "Aug", "aout": "Aug", "aoû": "Aug", "sept": "Sep", "sept.": "Sep",
+    "oct": "Oct", "oct.": "Oct", "nov": "Nov", "nov.": "Nov", "déc": "Dec", "dec": "Dec",
+    "déc.": "Dec", "dec.": "Dec",
+}
+
+
+def legacy_dates(dates: pd.Series, years: pd.Series) -> pd.Series:
+    """Ancienne implémentation (avant normalize_ffa_dates)."""
+    date_series = dates.astype(str).str.strip().str.lower()
+    date_series = date_series.str.replace(r"\.", "", regex=True)
+    for fr_token, en_token in _LEGACY_MOIS_MAP.items():
+        date_series = date_series.str.replace(fr_token, en_token.lower(), regex=False)
+    date_series = date_series.str.replace(r"\s+", " ", regex=True).str.strip()
+    return pd.to_datetime(
+        date_series.str.title() + " " + years.astype(str), format="%d %b %Y", errors="coerce"
+    )
+
+
+def synthetic(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        "date": [f"{rnd.randint(1, 28)} {rnd.choice(_MOIS)}" for _ in range(n_rows)],
+        "annee": [str(rnd.randint(2005, 2025)) for _ in range(n_rows)],
+    })
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="nombre de lignes synthétiques")
+    parser.add_argument("--repeat", type=int, default=3, help="passes mesurées")
+    args = parser.parse_args()
+
+    df = synthetic(args.rows)
+    old = legacy_dates(df["date"], df["annee"])
+    new = normalize_ffa_dates(df["date"], df["annee"])
+
+    # 1. Équivalence là où l'ancienne méthode aboutissait
+    ok = old.notna()
+    assert (old[ok] == new[ok]).all(), "dates différentes de l'ancienne méthode"
+    fixed = sorted(df.loc[~ok & new.notna(), "date"].str.split(" ", n=1).str[1].unique())
+    print(f"✅ {ok.sum()} dates identiques ; libellés désormais reconnus : {', '.join(fixed) or '-'}")
+    assert new.notna().all(), "dates non reconnues"
+
+    # 2. Durée
+    t_old = _best(lambda: legacy_dates(df["date"], df["annee"]), args.repeat)
+    t_new = _best(lambda: normalize_ffa_dates(df["date"], df["annee"]), args.repeat)
+    print(f"str.replace x{len(_LEGACY_MOIS_MAP):<3} {t_old * 1000:9.1f} ms")
+    print(f"normalize_ffa_dates {t_new * 1000:9.1f} ms   x{t_old / t_new:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
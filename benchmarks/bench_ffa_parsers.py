@@ -0,0 +1,93 @@
+"""Benchmark des backends de parsing du tableau de résultats FFA.
+
+Usage :
+    python -m benchmarks.bench_ffa_parsers                 # pages synthétiques
+    python -m benchmarks.bench_ffa_parsers --pages DIR     # pages enregistrées (*.html)
+
+Pour enregistrer des pages réelles :
+    curl -s "https://www.athle.fr/ajax/fiche-athlete-resultats.aspx?seq=<seq>&annee=2019" > DIR/<seq>_2019.html
+
+Chaque page est d'abord parsée par tous les backends et comparée à la
+référence BeautifulSoup (échec si une seule ligne diffère), puis le débit
+(pages/s) de chaque backend est mesuré.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import List
+
+from src.utils.ffa_parsers import PARSERS, parse_results_table
+
+_MOIS = ["janv.", "Fév.", "Mars", "avr.", "Mai", "Juin", "juil.", "Août", "sept.", "oct.", "nov.", "déc."]
+_EPREUVES = ["800m", "1 500m", "3 000m Steeple (91)", "5 Km Route", "200m <span>Piste Courte</span>"]
+
+
+def synthetic_page(n_rows: int, seed: int) -> str:
+    """Fragment au format de fiche-athlete-resultats.aspx (lignes + lignes de détail)."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        rows.append(
+            "<tr class=\"clickable\">\r\n"
+            f"  <td>ES MASSY</td><td>{rnd.randint(1, 28)} {rnd.choice(_MOIS)}</td>"
+            f"<td> {rnd.choice(_EPREUVES)} </td><td>{rnd.choice(['Finale', 'Série 2', ''])}</td>"
+            f"<td>{rnd.randint(1, 12)}</td><td><b>{rnd.randint(1, 4)}'{rnd.randint(10, 59)}''{rnd.randint(0, 99):02d}</b></td>"
+            f"<td>{rnd.choice(['+0.4', '-1.2', ''])}</td><td>IR{rnd.randint(1, 4)}</td><td>{rnd.randint(600, 1100)}</td>"
+            f"<td><a href=\"/competitions/{i}\">Val-de-Reuil <i>(27)</i></a> FRA</td>"
+            "<td class=\"desktop-tablet-d-none\"><button>+</button></td>\r\n</tr>\r\n"
+            f"<tr class=\"detail-row-{i}\"><td colspan=\"10\"><table class=\"detail-inner-table\">"
+            f"<tr><td>Vent</td><td>{rnd.random():.1f}</td></tr></table></td></tr>\r\n"
+        )
+    return (
+        "<table class=\"reveal-table\"><thead><tr><th>Club</th><th>Date</th><th>Epreuve</th><th>Tour</th>"
+        "<th>Place</th><th>Performance</th><th>Vent</th><th>Niveau</th><th>Points</th><th>Lieu</th><th></th>"
+        "</tr></thead>\r\n<tbody>\r\n" + "".join(rows) + "</tbody></table>"
+    )
+
+
+def load_pages(pages_dir: str | None, n_pages: int, rows_per_page: int) -> List[str]:
+    if pages_dir:
+        paths = sorted(Path(pages_dir).glob("*.html"))
+        if not paths:
+            raise SystemExit(f"Aucune page *.html dans {pages_dir}")
+        return [p.read_text(encoding="utf-8") for p in paths]
+    return [synthetic_page(rows_per_page, seed) for seed in range(n_pages)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", help="dossier de pages enregistrées (*.html)")
+    parser.add_argument("--n-pages", type=int, default=200, help="nombre de pages synthétiques")
+    parser.add_argument("--rows", type=int, default=40, help="lignes par page synthétique")
+    parser.add_argument("--repeat", type=int, default=3, help="passes mesurées par backend")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.n_pages, args.rows)
+
+    # 1. Équivalence stricte avec la référence BeautifulSoup
+    for idx, html in enumerate(pages):
+        reference = parse_results_table(html, "bs4")
+        for name in PARSERS:
+            got = parse_results_table(html, name)
+            assert got == reference, f"page {idx}: {name} diffère de bs4"
+    print(f"✅ {len(pages)} page(s) : sorties identiques pour {', '.join(PARSERS)}")
+
+    # 2. Débit
+    baseline = None
+    for name in ["bs4"] + [n for n in PARSERS if n != "bs4"]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            for html in pages:
+                parse_results_table(html, name)
+            best = min(best, time.perf_counter() - t0)
+        rate = len(pages) / best
+        baseline = baseline or rate
+        print(f"{name:<11} {rate:9.1f} pages/s   x{rate / baseline:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark de l'écriture des résultats (`save_results_to_postgres`).
+
+Usage (base de test, DB_URL dans l'environnement ou .env) :
+    python -m benchmarks.bench_results_writer
+    python -m benchmarks.bench_results_writer --sizes 1000 10000
+
+Compare, sur une table jetable créée sur le modèle de `results` :
+• l'ancien chemin : COUNT(*) avant / après + `execute_values` ;
+• le chemin COPY → table temporaire → INSERT … ON CONFLICT DO NOTHING
+  RETURNING.
+Chaque taille est écrite deux fois (lignes neuves puis doublons) et les
+deux chemins doivent annoncer les mêmes nombres de lignes insérées.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from contextlib import closing
+
+import pandas as pd
+from psycopg2.extras import execute_values
+from sqlalchemy import text
+
+from src.data_storage.engine import get_engine
+from src.utils.athlete_utils import copy_results, prepare_results_for_db, table_columns
+
+TABLE = "bench_results"
+
+
+def legacy_save(df: pd.DataFrame, seq: str, engine, table: str, batch_size: int = 1000) -> int:
+    """Ancienne implémentation (comptages avant / après)."""
+    columns = list(df.columns)
+    values = [tuple(row) for row in df.to_numpy()]
+    count_sql = f"SELECT COUNT(*) FROM {table} WHERE seq = %s"
+    insert_sql = f"""
+        INSERT INTO {table} ({",".join(columns)})
+        VALUES %s
+        ON CONFLICT (seq, date, epreuve, tour, perf) DO NOTHING
+    """
+    raw_conn = engine.raw_connection()
+    try:
+        with closing(raw_conn.cursor()) as cur:
+            cur.execute(count_sql, (seq,))
+            before = cur.fetchone()[0]
+            execute_values(cur, insert_sql, values, page_size=batch_size)
+            cur.execute(count_sql, (seq,))
+            after = cur.fetchone()[0]
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+    return max(0, int(after) - int(before))
+
+
+def copy_save(df: pd.DataFrame, seq: str, engine, table: str) -> int:
+    raw_conn = engine.raw_connection()
+    try:
+        with closing(raw_conn.cursor()) as cur:
+            inserted = copy_results(cur, df, table, table_columns(engine, table))
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+    return sum(inserted.values())
+
+
+def synthetic_results(n_rows: int, seq: str, seed: int = 0) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    start = pd.Timestamp("1990-01-01")
+    return pd.DataFrame({
+        "seq": seq,
+        "club": "ES MASSY",
+        "date": [start + pd.Timedelta(days=i // 20) for i in range(n_rows)],
+        "epreuve": [rnd.choice(["800m", "1 500m", "5 000m"]) for _ in range(n_rows)],
+        "tour": [f"Série {i % 20}" if i % 3 else "" for i in range(n_rows)],
+        "pl": [str(rnd.randint(1, 12)) for _ in range(n_rows)],
+        "perf": [f"{rnd.randint(1, 15)}'{rnd.randint(0, 59):02d}''{rnd.randint(0, 99):02d}" for _ in range(n_rows)],
+        "vt": "",
+        "niv": "IR2",
+        "pts": "950",
+        "ville": "Val-de-Reuil",
+        "annee": [(start + pd.Timedelta(days=i // 20)).year for i in range(n_rows)],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (LIKE results INCLUDING ALL)"))
+    try:
+        print(f"{'lignes':>8} {'execute_values':>15} {'COPY':>10} {'gain':>6}")
+        for size in args.sizes:
+            df = prepare_results_for_db(synthetic_results(size, f"B{size}"), engine, TABLE)
+            timings = {}
+            for name, writer in (("legacy", legacy_save), ("copy", copy_save)):
+                with engine.begin() as conn:
+                    conn.execute(text(f"TRUNCATE {TABLE}"))
+                t0 = time.perf_counter()
+                first = writer(df, f"B{size}", engine, TABLE)
+                timings[name] = time.perf_counter() - t0
+                again = writer(df, f"B{size}", engine, TABLE)
+                assert (first, again) == (size, 0), f"{name}: {first} / {again} lignes annoncées"
+            print(
+                f"{size:>8} {timings['legacy'] * 1000:>12.0f} ms {timings['copy'] * 1000:>7.0f} ms "
+                f"x{timings['legacy'] / timings['copy']:4.1f}"
+            )
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
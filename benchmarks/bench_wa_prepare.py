@@ -0,0 +1,153 @@
+"""Benchmark / non-régression de `wa_utils._prepare_results_df`.
+
+Usage :
+    python -m benchmarks.bench_wa_prepare                     # 25 saisons x 2 000 résultats
+    python -m benchmarks.bench_wa_prepare --seasons 40 --rows 5000
+
+Le fixture imite la sortie de `pd.json_normalize` sur `resultsByDate`,
+saison par saison puis concaténée (colonnes absentes de certaines saisons
+→ NaN, champs JSON null → None, espaces parasites, disciplines inconnues ou
+en casse variable). La sortie est comparée à l'ancienne implémentation
+(`apply(axis=1)` + `applymap`) : mêmes lignes, mêmes valeurs, une fois les
+colonnes catégorielles (`epreuve`, `niv`, `ville`) repassées en objets.
+La même comparaison tourne sous pytest : tests/test_wa_prepare.py.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from src.utils.wa_utils import (
+    _CATEGORICAL_COLS,
+    _COL_RENAME,
+    _EXPECTED_COLS,
+    _map_discipline,
+    _prepare_results_df,
+)
+
+_DISCIPLINES = [
+    "800 Metres", "800 metres short track", " 1500 Metres ", "3000 Metres Steeplechase",
+    "10 Kilometres Road", "Half Marathon", "Cross Country", "Mile Road", None,
+]
+_VENUES = ["Stade Charléty, Paris (FRA) ", "Hayward Field, Eugene, OR (USA)", None, "Nantes (FRA)"]
+_CATEGORIES = ["A", "B", "F", "GL", None]
+
+
+def legacy_prepare(raw: pd.DataFrame, seq: str) -> pd.DataFrame:
+    """Ancienne implémentation (`applymap` s'appelle `DataFrame.map` depuis pandas 2.1)."""
+    if raw.empty:
+        return raw
+    df = raw.copy()
+
+    def _disc(row):
+        d = row.get("discipline")
+        return _map_discipline(d, bool(row.get("indoor")))
+
+    df["epreuve"] = df.apply(_disc, axis=1)
+    df = df.rename(columns=_COL_RENAME)
+    for col in ["club", "tour", "pl", "vt", "niv", "pts", "ville"]:
+        if col not in df.columns:
+            df[col] = None
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["annee"] = df["date"].dt.year
+    df["seq"] = seq
+    df = df[_EXPECTED_COLS].copy()
+    str_cols = [c for c in _EXPECTED_COLS if c not in ("date", "annee")]
+    applymap = getattr(df[str_cols], "applymap", None) or df[str_cols].map
+    df[str_cols] = applymap(lambda x: str(x).strip() if x is not None else None)
+    return df.drop_duplicates(subset=_EXPECTED_COLS)
+
+
+def synthetic_season(year: int, n_rows: int, rnd: random.Random) -> pd.DataFrame:
+    rows = []
+    for _ in range(n_rows):
+        row = {
+            "date": f"{rnd.randint(1, 28):02d} {rnd.choice(['JAN', 'MAR', 'JUN', 'JUL', 'SEP'])} {year}",
+            "competition": f"Meeting {rnd.randint(1, 50)}",
+            "venue": rnd.choice(_VENUES),
+            "indoor": rnd.random() < 0.2,
+            "disciplineCode": "800",
+            "discipline": rnd.choice(_DISCIPLINES),
+            "country": "FRA",
+            "category": rnd.choice(_CATEGORIES),
+            "race": rnd.choice(["F", "H1", "SF"]),
+            "place": rnd.choice([f"{rnd.randint(1, 12)}.", None, " 3."]),
+            "mark": f"{rnd.randint(1, 4)}:{rnd.randint(0, 59):02d}.{rnd.randint(0, 99):02d}",
+            "wind": rnd.choice([None, "+0.4", "-1.1"]),
+            "notLegal": False,
+            "resultScore": rnd.randint(900, 1250),
+        }
+        if year % 3:
+            row["remark"] = rnd.choice([None, "PB", "SB"])
+        rows.append(row)
+    df = pd.json_normalize(rows)
+    if year % 4 == 0:
+        df = df.drop(columns=["wind"])   # colonne absente certaines saisons → NaN après concat
+    df["year"] = year
+    return df
+
+
+def synthetic_career(n_seasons: int, rows_per_season: int, seed: int = 0) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    seasons = [synthetic_season(2000 + i, rows_per_season, rnd) for i in range(n_seasons)]
+    return pd.concat(seasons, ignore_index=True)
+
+
+def as_legacy_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.astype({c: object for c in _CATEGORICAL_COLS})
+    for c in _CATEGORICAL_COLS:
+        out[c] = out[c].where(out[c].notna(), None)
+    return out
+
+
+def assert_identical(raw: pd.DataFrame, seq: str = "WA_123"):
+    old = legacy_prepare(raw, seq)
+    new = _prepare_results_df(raw, seq)
+    for c in _CATEGORICAL_COLS:
+        assert isinstance(new[c].dtype, pd.CategoricalDtype), f"{c} n'est pas catégorielle"
+    got = as_legacy_dtypes(new)
+    assert list(got.columns) == list(old.columns)
+    assert got.index.equals(old.index), "lignes différentes"
+    for c in old.columns:
+        a, b = old[c].to_numpy(dtype=object), got[c].to_numpy(dtype=object)
+        same = [(x is None and y is None) or (x is not None and y is not None and (x == y or (x != x and y != y)))
+                for x, y in zip(a, b)]
+        assert all(same), f"colonne {c} différente"
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=25, help="saisons dans le fixture")
+    parser.add_argument("--rows", type=int, default=2000, help="résultats par saison")
+    parser.add_argument("--repeat", type=int, default=3, help="passes mesurées")
+    args = parser.parse_args()
+
+    raw = synthetic_career(args.seasons, args.rows)
+
+    # 1. Non-régression : petits cas limites puis fixture complet
+    assert_identical(synthetic_career(3, 50, seed=1))
+    assert_identical(raw.drop(columns=["discipline"]).head(200))
+    assert_identical(raw)
+    print(f"✅ {len(raw)} lignes : sortie identique à l'ancienne implémentation")
+
+    # 2. Durée
+    t_old = _best(lambda: legacy_prepare(raw, "WA_123"), args.repeat)
+    t_new = _best(lambda: _prepare_results_df(raw, "WA_123"), args.repeat)
+    print(f"apply + applymap      {t_old * 1000:9.1f} ms")
+    print(f"_prepare_results_df   {t_new * 1000:9.1f} ms   x{t_old / t_new:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
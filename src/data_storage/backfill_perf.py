@@ -0,0 +1,99 @@
+"""data_storage/backfill_perf.py – Complète perf_seconds / perf_status
+-------------------------------------------------------------------
+Les lignes écrites avant la migration 0003 ont `perf_status` NULL. Le
+travail se fait par paquets de chaînes `perf` distinctes (une carrière
+répète beaucoup les mêmes marques) : conversion vectorisée en Python puis
+un `UPDATE … FROM (VALUES …)` par paquet, validé aussitôt. Interrompu, il
+reprend là où il s'était arrêté.
+
+    python -m src.data_storage.backfill_perf [--batch-size 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from contextlib import closing
+from typing import Optional
+
+import pandas as pd
+from psycopg2.extras import execute_values
+from sqlalchemy.engine import Engine
+
+from src.data_storage.engine import get_engine
+from src.utils.file_utils import convert_times_to_seconds, mark_status
+
+
+def backfill_perf_seconds(
+    engine: Engine,
+    table: str = "results",
+    batch_size: int = 2000,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Renseigne `perf_seconds` / `perf_status` là où `perf_status` est NULL.
+    Renvoie le nombre de lignes mises à jour.
+    """
+    updated = 0
+    raw = engine.raw_connection()
+    try:
+        with closing(raw.cursor()) as cur:
+            cur.execute(
+                f"UPDATE {table} SET perf_status = 'empty' WHERE perf IS NULL AND perf_status IS NULL"
+            )
+            updated += cur.rowcount
+            raw.commit()
+
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                t0 = time.perf_counter()
+                cur.execute(
+                    f"SELECT DISTINCT perf FROM {table} WHERE perf_status IS NULL LIMIT %s",
+                    (batch_size,),
+                )
+                perfs = pd.Series([r[0] for r in cur.fetchall()], dtype=object)
+                if perfs.empty:
+                    break
+
+                seconds = convert_times_to_seconds(perfs)
+                status = mark_status(perfs, seconds)
+                values = [
+                    (perf, None if pd.isna(sec) else float(sec), st)
+                    for perf, sec, st in zip(perfs, seconds, status)
+                ]
+                execute_values(
+                    cur,
+                    f"""
+                    UPDATE {table} AS r
+                    SET perf_seconds = v.perf_seconds, perf_status = v.perf_status
+                    FROM (VALUES %s) AS v (perf, perf_seconds, perf_status)
+                    WHERE r.perf = v.perf AND r.perf_status IS NULL
+                    """,
+                    values,
+                    template="(%s, %s::double precision, %s)",
+                    page_size=len(values),
+                )
+                updated += cur.rowcount
+                raw.commit()
+                batches += 1
+                print(
+                    f"Paquet {batches} : {len(values)} marques distinctes, "
+                    f"{updated} lignes à jour ({time.perf_counter() - t0:.2f}s)"
+                )
+    finally:
+        raw.close()
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill de results.perf_seconds / perf_status")
+    parser.add_argument("--batch-size", type=int, default=2000, help="marques distinctes par paquet")
+    parser.add_argument("--max-batches", type=int, default=None, help="nombre maximal de paquets")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    total = backfill_perf_seconds(engine, batch_size=args.batch_size, max_batches=args.max_batches)
+    print(f"✅ {total} ligne(s) complétée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,364 @@
-# src/data_storage/database_handler.py
+"""data_storage/database_handler.py – Accès asynchrone à Postgres (asyncpg)
+-----------------------------------------------------------------------
+Dépôt asynchrone pour les coroutines de la boucle d'arrière-plan
+(`async_runner`) : les scrapers peuvent lire et écrire sans bloquer la
+boucle, là où psycopg2 / pandas bloquent le thread.
+
+• un pool asyncpg, créé au premier appel (DB_URL, URL SQLAlchemy acceptée) ;
+• requêtes chaudes écrites une fois pour toutes : asyncpg les prépare une
+  seule fois par connexion (cache `statement_cache_size`, voir
+  DB_STATEMENT_CACHE_SIZE ; 0 derrière un pgbouncer en mode transaction),
+  les appels suivants n'envoient plus que les paramètres ;
+• écritures groupées : COPY binaire des résultats vers une table temporaire
+  puis `INSERT … ON CONFLICT DO NOTHING RETURNING seq` (même sémantique que
+  `copy_results`), upsert des athlètes en une requête via `unnest` ;
+  `write_batch` fait les deux dans une transaction (`ResultsWriter`), avec
+  la couverture WA (`wa_fetch_state`) des athlètes concernés : une saison
+  n'est marquée récupérée que si ses lignes sont écrites.
+
+Utilisé par `update_athletes` (athlètes à rafraîchir, années en base) et
+`ResultsWriter` ; depuis du code synchrone, passer par `run_with_handler`.
+
+    db = shared_handler()                       # depuis la boucle d'async_runner
+    df = await db.results_by_seq("123456")
+    inserted = await db.insert_results(df_clean)   # {seq: lignes insérées}
+
+    stale = run_with_handler(lambda db: db.select_stale_athletes(1, 10))
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+import asyncpg
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+from src.utils import async_runner
+from src.utils.athlete_utils import (
+    _PERF_COLUMNS,
+    _RESULTS_KEY,
+    add_perf_columns,
+    categories_to_objects,
+    table_columns_generation,
+)
+
+T = TypeVar("T")
+
+# Paramètres d'URL propres à libpq qu'asyncpg transmettrait comme réglages serveur
+_LIBPQ_ONLY_PARAMS = ("channel_binding",)
+_INTEGER_TYPES = ("integer", "bigint", "smallint")
+_FLOAT_TYPES = ("double precision", "real")
+
+
+def asyncpg_dsn(url: str) -> str:
+    """URL SQLAlchemy (`postgresql+psycopg2://…`) → DSN accepté par asyncpg."""
+    parsed = make_url(url)
+    query = {k: v for k, v in parsed.query.items() if k not in _LIBPQ_ONLY_PARAMS}
+    parsed = parsed.set(drivername="postgresql", query=query)
+    return parsed.render_as_string(hide_password=False)
+
+
+def _column_values(series: pd.Series, data_type: str) -> List[Any]:
+    """Valeurs Python du type attendu par le COPY binaire (None = NULL)."""
+    if data_type == "date":
+        values = pd.to_datetime(series, errors="coerce").dt.date
+    elif data_type in _INTEGER_TYPES:
+        # « 2024.0 » (année float côté WA) accepté comme au COPY texte
+        values = pd.to_numeric(series, errors="coerce").round().astype("Int64")
+    elif data_type in _FLOAT_TYPES:
+        values = pd.to_numeric(series, errors="coerce").astype(float)
+    else:
+        values = series.map(lambda v: v if isinstance(v, str) else str(v), na_action="ignore")
+    values = values.astype(object)
+    return values.where(pd.notna(values), None).tolist()
+
 
-# Handler de base pour la base de données (exemple)
 class DatabaseHandler:
-    def __init__(self, db_path):
-        self.db_path = db_path
+    """Dépôt asyncpg : résultats, athlètes, sélection des athlètes à rafraîchir."""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        results_table: str = "results",
+        athletes_table: str = "athletes",
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+    ):
+        if dsn is None:
+            load_dotenv()
+            dsn = os.getenv("DB_URL")
+        if not dsn:
+            raise RuntimeError("DB_URL manquant dans l'environnement")
+        self.dsn = asyncpg_dsn(dsn)
+        self.results_table = results_table
+        self.athletes_table = athletes_table
+        self.min_size = min_size
+        self.max_size = max_size or int(os.getenv("DB_POOL_SIZE", 5))
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self._column_types: Dict[str, Dict[str, str]] = {}
+        self._columns_generation = table_columns_generation()
+
+        r, a = results_table, athletes_table
+        self._sql_results_by_seq = f"SELECT * FROM {r} WHERE seq = $1"
+        self._sql_athlete = (
+            f"SELECT seq, name, club, sex, birth_date_raw, birth_year, last_update FROM {a} WHERE seq = $1"
+        )
+        self._sql_stale = f"""
+            SELECT seq, name, club, sex, last_update
+              FROM {a}
+             WHERE last_update IS NULL
+                OR last_update < (NOW() AT TIME ZONE 'utc') - $1::interval
+             ORDER BY last_update NULLS FIRST
+             LIMIT $2
+        """
+        self._sql_stored_years = (
+            f"SELECT DISTINCT seq, annee FROM {r} WHERE seq = ANY($1::text[]) AND annee IS NOT NULL"
+        )
+        self._sql_upsert_athletes = f"""
+            INSERT INTO {a} (seq, name, club, sex, birth_date_raw, birth_year, last_update)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::text[],
+                                 $5::text[], $6::integer[], $7::timestamp[])
+            ON CONFLICT (seq) DO UPDATE SET
+                name=EXCLUDED.name,
+                club=EXCLUDED.club,
+                sex=EXCLUDED.sex,
+                birth_date_raw=COALESCE(EXCLUDED.birth_date_raw, {a}.birth_date_raw),
+                birth_year=COALESCE(EXCLUDED.birth_year, {a}.birth_year),
+                last_update=EXCLUDED.last_update
+        """
+        # Même union que wa_utils.record_wa_fetch
+        self._sql_wa_fetch = """
+            INSERT INTO wa_fetch_state (seq, expected_years, fetched_years, updated_at)
+            VALUES ($1, $2::integer[], $3::integer[], $4)
+            ON CONFLICT (seq) DO UPDATE SET
+                expected_years = ARRAY(
+                    SELECT DISTINCT y FROM unnest(wa_fetch_state.expected_years || EXCLUDED.expected_years) AS y ORDER BY y
+                ),
+                fetched_years = ARRAY(
+                    SELECT DISTINCT y FROM unnest(wa_fetch_state.fetched_years || EXCLUDED.fetched_years) AS y ORDER BY y
+                ),
+                updated_at = EXCLUDED.updated_at
+        """
+        self._sql_columns = (
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = $1 "
+            "ORDER BY ordinal_position"
+        )
+
+    # ------------------------------------------------------------ pool
+    async def pool(self) -> asyncpg.Pool:
+        """Pool asyncpg, créé au premier appel (lié à la boucle appelante)."""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        # connexions inactives fermées avant que le serveur ne les coupe
+                        max_inactive_connection_lifetime=float(os.getenv("DB_POOL_RECYCLE", 300)),
+                        statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100)),
+                    )
+        return self._pool
+
+    @property
+    def is_closed(self) -> bool:
+        return self._pool is not None and self._pool.is_closing()
+
+    async def aclose(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def __aenter__(self) -> "DatabaseHandler":
+        await self.pool()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def column_types(self, table: str) -> Dict[str, str]:
+        """Colonnes de `table` → type SQL (relues après chaque migration appliquée)."""
+        generation = table_columns_generation()
+        if generation != self._columns_generation:
+            self._column_types.clear()
+            self._columns_generation = generation
+        cols = self._column_types.get(table)
+        if cols is None:
+            pool = await self.pool()
+            rows = await pool.fetch(self._sql_columns, table)
+            cols = {r["column_name"]: r["data_type"] for r in rows}
+            self._column_types[table] = cols
+        return cols
+
+    # ------------------------------------------------------------ lectures
+    async def results_by_seq(self, seq: str) -> pd.DataFrame:
+        """Résultats d'un athlète (équivalent de `SELECT * FROM results WHERE seq = …`)."""
+        pool = await self.pool()
+        rows = await pool.fetch(self._sql_results_by_seq, str(seq))
+        if not rows:
+            return pd.DataFrame(columns=list(await self.column_types(self.results_table)))
+        return pd.DataFrame([dict(r) for r in rows])
+
+    async def get_athlete(self, seq: str) -> Optional[Dict[str, Any]]:
+        """Ligne `athletes` de `seq` (None si absente)."""
+        pool = await self.pool()
+        row = await pool.fetchrow(self._sql_athlete, str(seq))
+        return dict(row) if row is not None else None
+
+    async def select_stale_athletes(self, max_age_days: float, limit: int) -> List[Dict[str, Any]]:
+        """Athlètes jamais rafraîchis ou plus vieux que `max_age_days`, les plus anciens d'abord."""
+        pool = await self.pool()
+        rows = await pool.fetch(self._sql_stale, timedelta(days=max_age_days), limit)
+        return [dict(r) for r in rows]
+
+    async def stored_years(self, seqs: Iterable[str]) -> Dict[str, Set[str]]:
+        """Années (`annee`) déjà présentes dans `results`, par athlète."""
+        seqs = [str(s) for s in seqs]
+        out: Dict[str, Set[str]] = {seq: set() for seq in seqs}
+        if not seqs:
+            return out
+        pool = await self.pool()
+        for r in await pool.fetch(self._sql_stored_years, seqs):
+            out.setdefault(r["seq"], set()).add(str(int(r["annee"])))
+        return out
+
+    # ------------------------------------------------------------ écritures
+    async def upsert_athletes(self, athletes: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert groupé (une requête) de dicts seq / name / club / sex
+        [/ birth_date_raw / birth_year / last_update, maintenant par défaut].
+        Une naissance absente ne remplace pas celle déjà connue.
+        """
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            return await self._upsert_athletes(conn, athletes)
+
+    async def insert_results(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Insère des résultats nettoyés sans doublons (perf_seconds / perf_status
+        calculés si la table les possède) ; renvoie le nombre de lignes
+        réellement insérées par seq.
+        """
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                return await self._insert_results(conn, df)
+
+    async def write_batch(self, df: Optional[pd.DataFrame], athletes: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        `insert_results(df)` puis `upsert_athletes(athletes)` dans UNE
+        transaction : un athlète n'est marqué à jour que si ses résultats
+        sont écrits. La clé `wa_fetch` d'un athlète (cf. `record_wa_fetch`)
+        est écrite dans `wa_fetch_state` par la même transaction.
+        Renvoie les lignes insérées par seq.
+        """
+        athletes = list(athletes)
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                inserted = await self._insert_results(conn, df) if df is not None else {}
+                await self._upsert_athletes(conn, athletes)
+                await self._record_wa_fetch(conn, athletes)
+        return inserted
+
+    async def _record_wa_fetch(self, conn: asyncpg.Connection, athletes: List[Dict[str, Any]]):
+        now = datetime.utcnow()
+        states = [
+            (
+                str(a["seq"]),
+                [int(y) for y in a["wa_fetch"].get("expected_years") or []],
+                [int(y) for y in a["wa_fetch"].get("fetched_years") or []],
+                now,
+            )
+            for a in athletes
+            if a.get("wa_fetch")
+        ]
+        # Table absente (migration 0005 non appliquée) : couverture non suivie
+        if states and await self.column_types("wa_fetch_state"):
+            await conn.executemany(self._sql_wa_fetch, states)
+
+    async def _upsert_athletes(self, conn: asyncpg.Connection, athletes: Iterable[Dict[str, Any]]) -> int:
+        by_seq = {str(a["seq"]): a for a in athletes}
+        if not by_seq:
+            return 0
+        now = datetime.utcnow()
+        rows = list(by_seq.values())
+        columns = [
+            list(by_seq),
+            [a.get("name") for a in rows],
+            [a.get("club") for a in rows],
+            [a.get("sex") for a in rows],
+            [a.get("birth_date_raw") for a in rows],
+            [int(a["birth_year"]) if a.get("birth_year") is not None else None for a in rows],
+            [a.get("last_update") or now for a in rows],
+        ]
+        await conn.execute(self._sql_upsert_athletes, *columns)
+        return len(rows)
+
+    async def _insert_results(self, conn: asyncpg.Connection, df: pd.DataFrame) -> Dict[str, int]:
+        column_types = await self.column_types(self.results_table)
+        if df.empty:
+            return {}
+        df = categories_to_objects(df)
+        if "perf" in df.columns and set(_PERF_COLUMNS) <= column_types.keys():
+            df = add_perf_columns(df)
+        columns = [c for c in df.columns if c in column_types]
+        if not columns:
+            return {}
+        values = [_column_values(df[c], column_types[c]) for c in columns]
+        records = list(zip(*values))
+
+        # Une table temporaire par connexion et par schéma de colonnes (cf. copy_results)
+        stage = f"_astage_{self.results_table}_{len(column_types)}"
+        col_list = ", ".join(columns)
+        await conn.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+            f"(LIKE {self.results_table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        await conn.copy_records_to_table(stage, records=records, columns=columns)
+        rows = await conn.fetch(
+            f"""
+            WITH ins AS (
+                INSERT INTO {self.results_table} ({col_list})
+                SELECT {col_list} FROM {stage}
+                ON CONFLICT ({', '.join(_RESULTS_KEY)}) DO NOTHING
+                RETURNING seq
+            )
+            SELECT seq, COUNT(*) AS n FROM ins GROUP BY seq
+            """
+        )
+        return {r["seq"]: int(r["n"]) for r in rows}
+
+
+def shared_handler(results_table: str = "results", athletes_table: str = "athletes") -> DatabaseHandler:
+    """
+    Handler unique (par couple de tables) de la boucle d'arrière-plan, pool
+    fermé par `async_runner.shutdown`. À n'appeler que depuis cette boucle.
+    """
+    return async_runner.shared(
+        f"database_handler:{results_table}:{athletes_table}",
+        lambda: DatabaseHandler(results_table=results_table, athletes_table=athletes_table),
+    )
+
+
+def run_with_handler(
+    call: Callable[[DatabaseHandler], Awaitable[T]],
+    results_table: str = "results",
+    athletes_table: str = "athletes",
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Depuis du code synchrone : exécute `call(handler)` dans la boucle
+    d'async_runner et renvoie son résultat.
+
+        stale = run_with_handler(lambda db: db.select_stale_athletes(1, 10))
+    """
+    async def _call():
+        return await call(shared_handler(results_table, athletes_table))
 
-    def connect(self):
-        # Implémenter la connexion à la BDD
-        pass
\ No newline at end of file
+    return async_runner.run(_call(), timeout)
@@ -0,0 +1,71 @@
+"""data_storage/engine.py – Moteur SQLAlchemy partagé par le process
+-----------------------------------------------------------------
+Chaque point d'entrée (app, updater, modules utilitaires, CLIs) créait son
+propre `create_engine`, certains dès l'import ; côté Streamlit, à chaque
+rerun. Ici, un seul moteur (et donc un seul pool) par URL, créé au premier
+`get_engine()` :
+
+• pool_pre_ping  : connexion testée avant usage (NeonDB coupe les
+                   connexions inactives et met la base en veille) ;
+• pool_recycle   : DB_POOL_RECYCLE secondes (300), sous le délai d'inactivité ;
+• pool_size / max_overflow / pool_timeout : DB_POOL_SIZE (5),
+  DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s) ;
+• pool_use_lifo  : les connexions les plus récentes sont réutilisées, les
+                   autres vieillissent et sont recyclées (pool qui dégonfle).
+
+    from src.data_storage.engine import get_engine
+    engine = get_engine()             # DB_URL (environnement ou .env)
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+_lock = threading.Lock()
+_engines: Dict[str, Engine] = {}
+
+
+def _pool_settings() -> dict:
+    return dict(
+        pool_pre_ping=True,
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 300)),
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        pool_use_lifo=True,
+    )
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    Moteur partagé pour `url` (par défaut DB_URL), créé au premier appel.
+    Lève RuntimeError si aucune URL n'est configurée.
+    """
+    if url is None:
+        load_dotenv()
+        url = os.getenv("DB_URL")
+    if not url:
+        raise RuntimeError("DB_URL manquant dans l'environnement")
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = create_engine(url, **_pool_settings())
+            _engines[url] = engine
+    return engine
+
+
+def dispose_engines():
+    """Ferme les pools de tous les moteurs créés (tests, fin de script)."""
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
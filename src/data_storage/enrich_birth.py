@@ -0,0 +1,120 @@
+"""data_storage/enrich_birth.py – Complète la naissance des athlètes FFA
+--------------------------------------------------------------------
+`save_athlete_info` n'écrit que ce qu'on lui donne : la naissance des
+athlètes FFA enregistrés sans page profil est complétée ici, à part.
+
+Seules les lignes `birth_year IS NULL` (hors seq « WA_… ») sont visées, par
+paquets parcourus dans l'ordre des seq : pages profil téléchargées en
+parallèle (`ffa_fast.fetch_many_profiles`, client partagé et limiteur
+athle.fr) puis un `UPDATE … FROM (VALUES …)` par paquet. `last_update`
+n'est pas modifié. Un profil sans naissance est simplement ignoré jusqu'au
+prochain lancement.
+
+    python -m src.data_storage.enrich_birth [--batch-size 200] [--concurrency 20]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from contextlib import closing
+from typing import Optional
+
+from psycopg2.extras import execute_values
+from sqlalchemy.engine import Engine
+
+from src.data_storage.engine import get_engine
+from src.utils.ffa_fast import DEFAULT_MAX_CONCURRENCY, fetch_many_profiles
+
+
+def enrich_birth_info(
+    engine: Engine,
+    table: str = "athletes",
+    batch_size: int = 200,
+    max_batches: Optional[int] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> int:
+    """
+    Renseigne `birth_date_raw` / `birth_year` des athlètes FFA où
+    `birth_year` est NULL. Renvoie le nombre d'athlètes complétés.
+    """
+    updated = 0
+    after = ""
+    raw = engine.raw_connection()
+    try:
+        with closing(raw.cursor()) as cur:
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                t0 = time.perf_counter()
+                # Parcours par seq croissant : chaque athlète n'est tenté qu'une fois par lancement
+                cur.execute(
+                    f"""
+                    SELECT seq FROM {table}
+                     WHERE birth_year IS NULL AND seq NOT LIKE 'WA\\_%%' AND seq > %s
+                     ORDER BY seq
+                     LIMIT %s
+                    """,
+                    (after, batch_size),
+                )
+                seqs = [r[0] for r in cur.fetchall()]
+                raw.commit()
+                if not seqs:
+                    break
+                after = seqs[-1]
+
+                profiles = fetch_many_profiles(seqs, max_concurrency=max_concurrency)
+                values = [
+                    (seq, profile.get("birth_date_raw"), profile["birth_year"])
+                    for seq, profile in profiles.items()
+                    if profile and profile.get("birth_year")
+                ]
+                if values:
+                    execute_values(
+                        cur,
+                        f"""
+                        UPDATE {table} AS a
+                        SET birth_date_raw = COALESCE(v.birth_date_raw, a.birth_date_raw),
+                            birth_year = v.birth_year
+                        FROM (VALUES %s) AS v (seq, birth_date_raw, birth_year)
+                        WHERE a.seq = v.seq AND a.birth_year IS NULL
+                        """,
+                        values,
+                        template="(%s, %s, %s::integer)",
+                        page_size=len(values),
+                    )
+                    updated += cur.rowcount
+                    raw.commit()
+                batches += 1
+                print(
+                    f"Paquet {batches} : {len(seqs)} athlète(s) lus, {len(values)} naissance(s) trouvée(s), "
+                    f"{updated} complété(s) ({time.perf_counter() - t0:.2f}s)"
+                )
+    finally:
+        raw.close()
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Complète athletes.birth_year depuis les profils athle.fr")
+    parser.add_argument("--batch-size", type=int, default=200, help="athlètes par paquet")
+    parser.add_argument("--max-batches", type=int, default=None, help="nombre maximal de paquets")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("FFA_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        help="requêtes athle.fr simultanées",
+    )
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    total = enrich_birth_info(
+        engine,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        max_concurrency=args.concurrency,
+    )
+    print(f"✅ {total} athlète(s) complété(s)")
+
+
+if __name__ == "__main__":
+    main()
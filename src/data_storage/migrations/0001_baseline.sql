@@ -0,0 +1,28 @@
+-- 0001 – Schéma de base (tables créées historiquement à la main).
+-- Idempotent : sans effet sur une base existante.
+
+CREATE TABLE IF NOT EXISTS athletes (
+    seq            TEXT PRIMARY KEY,
+    name           TEXT,
+    club           TEXT,
+    sex            TEXT,
+    birth_date_raw TEXT,
+    birth_year     INTEGER,
+    last_update    TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    seq     TEXT,
+    club    TEXT,
+    date    DATE,
+    epreuve TEXT,
+    tour    TEXT,
+    pl      TEXT,
+    perf    TEXT,
+    vt      TEXT,
+    niv     TEXT,
+    pts     TEXT,
+    ville   TEXT,
+    annee   INTEGER,
+    UNIQUE (seq, date, epreuve, tour, perf)
+);
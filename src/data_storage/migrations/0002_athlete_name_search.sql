@@ -0,0 +1,25 @@
+-- 0002 – Recherche locale d'athlètes : pg_trgm + unaccent.
+-- `name_norm` reproduit http_utils._normalize_text (minuscules, sans
+-- accents, espaces compactés) et porte un index trigramme GIN utilisé par
+-- LIKE '%terme%' et par les opérateurs de similarité.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() est STABLE : enveloppe IMMUTABLE (dictionnaire explicite)
+-- pour pouvoir l'utiliser dans une colonne générée et un index.
+CREATE OR REPLACE FUNCTION immutable_unaccent(value TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, value) $$;
+
+CREATE OR REPLACE FUNCTION normalize_name(value TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT btrim(regexp_replace(lower(immutable_unaccent(coalesce(value, ''))), '\s+', ' ', 'g')) $$;
+
+ALTER TABLE athletes
+    ADD COLUMN IF NOT EXISTS name_norm TEXT GENERATED ALWAYS AS (normalize_name(name)) STORED;
+
+CREATE INDEX IF NOT EXISTS athletes_name_norm_trgm_idx
+    ON athletes USING gin (name_norm gin_trgm_ops);
@@ -0,0 +1,19 @@
+-- 0003 – Performance numérique calculée à l'écriture.
+-- `perf_seconds` : valeur de `file_utils.convert_time_to_seconds` (secondes
+-- pour les courses, valeur brute pour les concours) ; `perf_status` :
+-- 'ok', code d'invalidité ('DNF', 'DQ', 'AB'…), 'unparsed' ou 'empty'.
+-- Les lignes existantes (perf_status NULL) sont complétées par
+-- `python -m src.data_storage.backfill_perf`.
+
+ALTER TABLE results ADD COLUMN IF NOT EXISTS perf_seconds DOUBLE PRECISION;
+ALTER TABLE results ADD COLUMN IF NOT EXISTS perf_status TEXT;
+
+-- Meilleures marques / classements par athlète et épreuve
+CREATE INDEX IF NOT EXISTS results_seq_epreuve_perf_seconds_idx
+    ON results (seq, epreuve, perf_seconds)
+    WHERE perf_status = 'ok';
+
+-- Lignes restant à compléter par le backfill
+CREATE INDEX IF NOT EXISTS results_perf_status_pending_idx
+    ON results (perf)
+    WHERE perf_status IS NULL;
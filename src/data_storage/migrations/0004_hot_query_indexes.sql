@@ -0,0 +1,39 @@
+-- 0004 – Index des requêtes chaudes et clé d'unicité des résultats.
+-- Plans vérifiés par tests/test_query_plans.py (DB_URL requis) ou
+-- python -m src.data_storage.schema --check
+--
+-- Déjà couverts, sans nouvel index :
+-- • results WHERE seq = … / seq = ANY(…) / seq = … AND epreuve = … : la clé
+--   (seq, date, epreuve, tour, perf) commence par seq, et une carrière ne
+--   compte que quelques centaines de lignes ; un index (seq, epreuve) de
+--   plus ralentirait chaque COPY pour un gain nul ;
+-- • athletes WHERE seq = … : clé primaire ;
+-- • recherche par nom : index trigramme de 0002.
+
+-- Athlètes à rafraîchir (update_athletes.select_stale_athletes) :
+-- ORDER BY last_update NULLS FIRST LIMIT n lu dans l'ordre de l'index.
+CREATE INDEX IF NOT EXISTS athletes_last_update_idx
+    ON athletes (last_update NULLS FIRST);
+
+-- Clé de `ON CONFLICT (seq, date, epreuve, tour, perf)` : garantie aussi sur
+-- une base créée à la main. Aucune ligne n'est supprimée : s'il existe des
+-- doublons, la migration échoue et rien n'est modifié.
+-- (NULLS NOT DISTINCT : migration optionnelle optional/1001.)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+          FROM pg_index i
+         WHERE i.indrelid = 'results'::regclass
+           AND i.indisunique
+           AND i.indpred IS NULL
+           AND (
+               SELECT array_agg(a.attname::text ORDER BY k.ord)
+                 FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                 JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+           ) = ARRAY['seq', 'date', 'epreuve', 'tour', 'perf']
+    ) THEN
+        CREATE UNIQUE INDEX results_key_idx ON results (seq, date, epreuve, tour, perf);
+    END IF;
+END
+$$;
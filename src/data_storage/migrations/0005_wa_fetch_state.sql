@@ -0,0 +1,12 @@
+-- 0005 – Saisons WA récupérées par athlète (wa_utils.record_wa_fetch).
+-- Une ligne par athlète WA : saisons attendues (actives dans la plage
+-- demandée) et saisons effectivement récupérées ; les manquantes sont
+-- reprises plus tard. Table auparavant créée à l'exécution par wa_utils :
+-- IF NOT EXISTS la laisse intacte sur les bases existantes.
+
+CREATE TABLE IF NOT EXISTS wa_fetch_state (
+    seq            TEXT PRIMARY KEY,
+    expected_years INTEGER[] NOT NULL DEFAULT '{}',
+    fetched_years  INTEGER[] NOT NULL DEFAULT '{}',
+    updated_at     TIMESTAMP NOT NULL
+);
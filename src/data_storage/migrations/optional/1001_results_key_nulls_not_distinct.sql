@@ -0,0 +1,60 @@
+-- 1001 (optionnelle) – Clé de `results` en NULLS NOT DISTINCT.
+-- Appliquée uniquement sur demande explicite :
+--     python -m src.data_storage.schema --opt-in results_key_nulls_not_distinct
+--
+-- Avec une clé unique classique, une ligne ayant un NULL dans
+-- (seq, date, epreuve, tour, perf) – `tour` NULL côté WA – n'entre jamais
+-- en conflit : elle est réinsérée à chaque passage. Cette migration
+-- SUPPRIME ces doublons (la première ligne de chaque clé est gardée) puis
+-- remplace la clé par un index NULLS NOT DISTINCT.
+-- Refusée avant PostgreSQL 15 (rien n'est alors supprimé).
+-- Tout est dans un bloc DO (EXECUTE pour la syntaxe propre à la v15) : le
+-- test de version précède toute modification.
+
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    IF current_setting('server_version_num')::int < 150000 THEN
+        RAISE EXCEPTION 'NULLS NOT DISTINCT requiert PostgreSQL 15 ou plus (version actuelle : %)',
+            current_setting('server_version');
+    END IF;
+
+    -- Seules les lignes avec un NULL dans la clé peuvent être en double
+    DELETE FROM results
+     WHERE ctid IN (
+        SELECT ctid FROM (
+            SELECT ctid,
+                   row_number() OVER (PARTITION BY seq, date, epreuve, tour, perf ORDER BY ctid) AS rn
+              FROM results
+             WHERE seq IS NULL OR date IS NULL OR epreuve IS NULL OR tour IS NULL OR perf IS NULL
+        ) d
+        WHERE d.rn > 1
+     );
+
+    EXECUTE 'CREATE UNIQUE INDEX IF NOT EXISTS results_key_nnd_idx '
+            'ON results (seq, date, epreuve, tour, perf) NULLS NOT DISTINCT';
+
+    -- Anciennes clés sur les mêmes colonnes (contrainte ou simple index)
+    FOR idx IN
+        SELECT i.indexrelid::regclass::text AS index_name, c.conname
+          FROM pg_index i
+          LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+         WHERE i.indrelid = 'results'::regclass
+           AND i.indisunique
+           AND i.indpred IS NULL
+           AND i.indexrelid::regclass::text <> 'results_key_nnd_idx'
+           AND (
+               SELECT array_agg(a.attname::text ORDER BY k.ord)
+                 FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                 JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+           ) = ARRAY['seq', 'date', 'epreuve', 'tour', 'perf']
+    LOOP
+        IF idx.conname IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE results DROP CONSTRAINT %I', idx.conname);
+        ELSE
+            EXECUTE format('DROP INDEX %s', idx.index_name);
+        END IF;
+    END LOOP;
+END
+$$;
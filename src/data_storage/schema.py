@@ -0,0 +1,281 @@
+"""data_storage/schema.py – Migrations SQL versionnées
+----------------------------------------------------
+Les fichiers `migrations/NNNN_nom.sql` sont appliqués dans l'ordre, chacun
+dans sa propre transaction ; les versions appliquées sont tracées dans la
+table `schema_migrations`. Un verrou consultatif (`pg_advisory_xact_lock`)
+évite que deux process (app + updater) appliquent la même migration.
+
+    python -m src.data_storage.schema            # applique les migrations
+    python -m src.data_storage.schema --status   # affiche l'état
+    python -m src.data_storage.schema --check    # plans des requêtes chaudes
+
+Les migrations de `migrations/optional/` (numéros ≥ 1000) ne sont jamais
+appliquées automatiquement : il faut les demander par leur nom.
+
+    python -m src.data_storage.schema --opt-in results_key_nulls_not_distinct
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.data_storage.engine import get_engine
+
+MIGRATIONS_DIR = Path(__file__).with_name("migrations")
+OPTIONAL_DIR = MIGRATIONS_DIR / "optional"
+_FILENAME_RE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+# Clé arbitraire du verrou consultatif partagé par tous les process
+_LOCK_KEY = 73102024
+
+
+def list_migrations(directory: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    """(version, nom, chemin) de chaque fichier de migration, triés par version."""
+    found = []
+    for path in directory.glob("*.sql"):
+        match = _FILENAME_RE.match(path.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2), path))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Numéros de migration en double dans {directory}")
+    return found
+
+
+def _ensure_version_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def applied_versions(engine: Engine) -> Set[int]:
+    """Versions déjà appliquées (ensemble vide si la table n'existe pas)."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return set()
+        cur.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+    finally:
+        raw.close()
+
+
+def _apply_one(engine: Engine, version: int, name: str, path: Path) -> bool:
+    """Applique une migration dans sa propre transaction ; False si déjà appliquée."""
+    sql = path.read_text(encoding="utf-8")
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+        _ensure_version_table(cur)
+        cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+        if cur.fetchone():
+            raw.rollback()
+            return False
+        cur.execute(sql)
+        cur.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (version, name),
+        )
+        raw.commit()
+        print(f"Migration {version:04d}_{name} appliquée")
+        # Import local : athlete_utils n'a pas besoin du runner de migrations
+        from src.utils.athlete_utils import clear_table_columns_cache
+        clear_table_columns_cache()
+        return True
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def apply_migrations(
+    engine: Engine,
+    target: Optional[int] = None,
+    opt_in: Iterable[str] = (),
+) -> List[int]:
+    """
+    Applique les migrations manquantes (jusqu'à `target` inclus si fourni),
+    puis les migrations optionnelles nommées dans `opt_in`.
+    Le SQL est exécuté tel quel via le curseur DBAPI (pas d'interprétation
+    des `%` ni des `:param`). Renvoie les versions appliquées.
+    """
+    opt_in = set(opt_in)
+    optional = [m for m in list_migrations(OPTIONAL_DIR) if m[1] in opt_in]
+    unknown = opt_in - {name for _, name, _ in optional}
+    if unknown:
+        raise ValueError(f"Migration(s) optionnelle(s) inconnue(s) : {', '.join(sorted(unknown))}")
+
+    done: List[int] = []
+    for version, name, path in list_migrations():
+        if target is not None and version > target:
+            break
+        if _apply_one(engine, version, name, path):
+            done.append(version)
+    for version, name, path in optional:
+        if _apply_one(engine, version, name, path):
+            done.append(version)
+    return done
+
+
+def ensure_schema(engine: Engine) -> List[int]:
+    """Applique les migrations manquantes si besoin (sans effet sinon)."""
+    latest = list_migrations()
+    if latest and latest[-1][0] in applied_versions(engine):
+        return []
+    return apply_migrations(engine)
+
+
+# Requêtes chaudes : (libellé, SQL, paramètres, table qui ne doit pas être
+# parcourue en entier). Même SQL que les appelants cités.
+HOT_QUERIES: List[Tuple[str, str, Dict[str, Any], str]] = [
+    (
+        "résultats d'un athlète (app.get_results_from_db)",
+        "SELECT * FROM results WHERE seq = :seq",
+        {"seq": "0"},
+        "results",
+    ),
+    (
+        "résultats d'un athlète sur une épreuve",
+        "SELECT * FROM results WHERE seq = :seq AND epreuve = :epreuve",
+        {"seq": "0", "epreuve": "100m"},
+        "results",
+    ),
+    (
+        "années en base (DatabaseHandler.stored_years)",
+        "SELECT DISTINCT seq, annee FROM results WHERE seq = ANY(:seqs) AND annee IS NOT NULL",
+        {"seqs": ["0", "1"]},
+        "results",
+    ),
+    (
+        "naissance (app.get_birth_year_from_db)",
+        "SELECT birth_year FROM athletes WHERE seq = :seq",
+        {"seq": "0"},
+        "athletes",
+    ),
+    (
+        "athlètes à rafraîchir (DatabaseHandler.select_stale_athletes)",
+        """
+        SELECT seq, name, club, sex, last_update
+          FROM athletes
+         WHERE last_update IS NULL
+            OR last_update < (NOW() AT TIME ZONE 'utc') - INTERVAL :age
+         ORDER BY last_update NULLS FIRST
+         LIMIT :limit
+        """,
+        {"age": "1 days", "limit": 10},
+        "athletes",
+    ),
+]
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def search_hot_query() -> Tuple[str, str, Dict[str, Any], str]:
+    """Recherche par nom trigramme (n'existe qu'après la migration 0002)."""
+    # Import local : athlete_utils n'est utile qu'à cette vérification
+    from src.utils.athlete_utils import _TRGM_SEARCH_SQL
+
+    return (
+        "recherche par nom (athlete_utils.search_athletes_db)",
+        _TRGM_SEARCH_SQL.format(where_wa=""),
+        {"term": "dupont", "escaped": "dupont", "limit": 10},
+        "athletes",
+    )
+
+
+def _hot_queries(engine: Engine) -> List[Tuple[str, str, Dict[str, Any], str]]:
+    queries = list(HOT_QUERIES)
+    with engine.connect() as conn:
+        has_name_norm = conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() "
+                "AND table_name = 'athletes' AND column_name = 'name_norm'"
+            )
+        ).first()
+    if has_name_norm:
+        queries.append(search_hot_query())
+    return queries
+
+
+def explain_uses_index(engine: Engine, sql: str, params: Dict[str, Any], table: str) -> Tuple[bool, str]:
+    """
+    `EXPLAIN` de `sql`, parcours séquentiel désactivé (`enable_seqscan =
+    off`) : si un index adapté existe, le plan l'utilise quelle que soit la
+    taille de la table. Un « Seq Scan » restant sur `table` signale un index
+    manquant. Renvoie (ok, index utilisés ou motif de l'échec).
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()[0]["Plan"]
+    nodes = [n for n in _plan_nodes(plan) if n.get("Relation Name") == table]
+    if not nodes or any(n["Node Type"] == "Seq Scan" for n in nodes):
+        return False, f"parcours complet de {table}"
+    return True, ", ".join(sorted({n["Index Name"] for n in _plan_nodes(plan) if n.get("Index Name")}))
+
+
+def check_hot_queries(engine: Engine) -> List[Tuple[str, bool, str]]:
+    """`explain_uses_index` de chaque requête chaude : (libellé, ok, détail)."""
+    return [
+        (label, *explain_uses_index(engine, sql, params, table))
+        for label, sql, params, table in _hot_queries(engine)
+    ]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Migrations du schéma PostgreSQL")
+    parser.add_argument("--status", action="store_true", help="affiche l'état sans rien appliquer")
+    parser.add_argument("--target", type=int, default=None, help="version maximale à appliquer")
+    parser.add_argument(
+        "--opt-in",
+        action="append",
+        default=[],
+        metavar="NOM",
+        help="applique aussi la migration optionnelle NOM (répétable)",
+    )
+    parser.add_argument("--check", action="store_true", help="vérifie par EXPLAIN que les requêtes chaudes utilisent un index")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.check:
+        report = check_hot_queries(engine)
+        for label, ok, detail in report:
+            print(f"{'✅' if ok else '❌'} {label} : {detail}")
+        if not all(ok for _, ok, _ in report):
+            raise SystemExit(1)
+        return
+    if args.status:
+        applied = applied_versions(engine)
+        for version, name, _ in list_migrations():
+            state = "appliquée" if version in applied else "en attente"
+            print(f"{version:04d}_{name} : {state}")
+        for version, name, _ in list_migrations(OPTIONAL_DIR):
+            state = "appliquée" if version in applied else "optionnelle, non appliquée"
+            print(f"{version:04d}_{name} : {state}")
+        return
+    done = apply_migrations(engine, target=args.target, opt_in=args.opt_in)
+    if not done:
+        print("Schéma à jour")
+
+
+if __name__ == "__main__":
+    main()
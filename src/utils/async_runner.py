@@ -0,0 +1,162 @@
+"""utils/async_runner.py – Boucle asyncio d'arrière-plan partagée par le process
+-------------------------------------------------------------------------------
+Une seule boucle d'événements tourne dans un thread démon, démarré à la
+première utilisation. Le code synchrone (handlers Streamlit, updater) y
+soumet des coroutines et récupère des `concurrent.futures.Future` ; les
+ressources asynchrones (client httpx keep-alive, sémaphores…) vivent dans
+cette boucle et restent chaudes d'un appel – ou d'un rerun Streamlit – à
+l'autre.
+
+Remplace `asyncio.run` par appel (création / destruction d'une boucle et
+perte du pool de connexions à chaque fois) et le patch `nest_asyncio`
+lorsqu'une boucle tourne déjà (Jupyter, Streamlit récent…).
+
+    fut = submit(coro)                 # non bloquant, thread-safe
+    df  = run(coro, timeout=60)        # bloquant
+    for item in iterate(agen): ...     # générateur asynchrone → synchrone
+    client = shared("ffa", factory)    # ressource unique, liée à la boucle
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_closers: List[Callable[[], Awaitable[None]]] = []
+_resources: Dict[str, Any] = {}
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+    asyncio.set_event_loop(loop)
+    loop.call_soon(ready.set)
+    loop.run_forever()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Boucle d'arrière-plan du process (démarrée à la demande)."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed() or _thread is None or not _thread.is_alive():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=_run_loop, args=(loop, ready), name="async-runner", daemon=True
+            )
+            thread.start()
+            ready.wait()
+            _loop, _thread = loop, thread
+        return _loop
+
+
+def in_runner_loop() -> bool:
+    """Vrai si l'appelant s'exécute dans la boucle d'arrière-plan."""
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def submit(coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+    """Planifie `coro` dans la boucle d'arrière-plan (appelable depuis n'importe quel thread)."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def _wait(fut: "concurrent.futures.Future[T]", timeout: Optional[float]) -> T:
+    try:
+        return fut.result(timeout)
+    except BaseException:
+        # délai dépassé / Ctrl-C côté appelant : on annule la tâche dans la boucle
+        fut.cancel()
+        raise
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Exécute `coro` dans la boucle d'arrière-plan et attend son résultat."""
+    if in_runner_loop():
+        # attendre ici bloquerait la boucle qui doit exécuter la coroutine
+        coro.close()
+        raise RuntimeError("run() appelé depuis la boucle d'arrière-plan : utilisez 'await'.")
+    return _wait(submit(coro), timeout)
+
+
+def iterate(agen: AsyncIterator[T], timeout: Optional[float] = None) -> Iterator[T]:
+    """
+    Consomme un générateur asynchrone depuis du code synchrone : chaque
+    élément est rendu dès qu'il est produit. Si l'itération est interrompue,
+    le générateur est fermé (et ses tâches annulées) dans la boucle.
+    """
+    if in_runner_loop():
+        raise RuntimeError("iterate() appelé depuis la boucle d'arrière-plan : utilisez 'async for'.")
+    exhausted = False
+    try:
+        while True:
+            try:
+                item = _wait(submit(agen.__anext__()), timeout)
+            except StopAsyncIteration:
+                exhausted = True
+                return
+            yield item
+    finally:
+        if not exhausted and hasattr(agen, "aclose"):
+            _wait(submit(agen.aclose()), timeout)
+
+
+def shared(key: str, factory: Callable[[], T]) -> T:
+    """
+    Ressource unique par clé (ex. client httpx keep-alive), créée au premier
+    appel puis réutilisée par toutes les coroutines soumises. À n'appeler
+    que depuis la boucle d'arrière-plan : un client httpx est lié à la
+    boucle qui l'utilise. Les ressources exposant `aclose()` sont fermées
+    par `shutdown()`.
+    """
+    if not in_runner_loop():
+        raise RuntimeError(f"shared({key!r}) doit être appelé depuis la boucle d'async_runner.")
+    resource = _resources.get(key)
+    if resource is None or getattr(resource, "is_closed", False):
+        resource = factory()
+        _resources[key] = resource
+        if hasattr(resource, "aclose"):
+            on_shutdown(resource.aclose)
+    return resource
+
+
+def on_shutdown(closer: Callable[[], Awaitable[None]]):
+    """Enregistre une coroutine de fermeture (ex. `client.aclose`) exécutée à l'arrêt."""
+    _closers.append(closer)
+
+
+def shutdown(timeout: float = 5.0):
+    """Ferme les ressources enregistrées puis arrête la boucle d'arrière-plan."""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+        # les ressources sont liées à l'ancienne boucle : recréées au besoin
+        _resources.clear()
+    if loop is None or loop.is_closed():
+        return
+
+    async def _close_all():
+        while _closers:
+            closer = _closers.pop()
+            try:
+                await closer()
+            except Exception as e:
+                print(f"Erreur à la fermeture d'une ressource asynchrone : {e}")
+
+    if thread is not None and thread.is_alive():
+        try:
+            asyncio.run_coroutine_threadsafe(_close_all(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+    if not loop.is_running():
+        loop.close()
+
+
+atexit.register(shutdown)
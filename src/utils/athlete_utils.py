@@ -1,20 +1,33 @@
-import os
-import re  # <--- Ajout de re
+import io
+import re
 from datetime import datetime
-from sqlalchemy import create_engine, text
-import requests
-from bs4 import BeautifulSoup
+from sqlalchemy import text
 import pandas as pd
-from dotenv import load_dotenv
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional
 
-from psycopg2.extras import execute_values
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import ProgrammingError
 from contextlib import closing
 
-load_dotenv()
-db_url = os.getenv("DB_URL")
-engine = create_engine(db_url)
+from src.utils import season_cache
+from src.utils.ffa_parsers import has_results_table, parse_athlete_profile, results_table_to_df
+from src.utils.file_utils import convert_times_to_seconds, mark_status
+from src.utils.rate_limiter import request as limited_request
+
+
+
+def get_athlete_profile(seq: str) -> dict:
+    """
+    Télécharge la page profil une seule fois : années, naissance, nom, club.
+    Args:
+        seq (str): Identifiant seq de l'athlète.
+    Returns:
+        dict: voir `parse_athlete_profile`.
+    """
+    url = f"https://www.athle.fr/athletes/{seq}/resultats"
+    response = limited_request("GET", url)
+    response.raise_for_status()
+    return parse_athlete_profile(response.text)
 
 
 def get_athlete_years(seq: str) -> List[str]:
@@ -25,30 +38,7 @@ def get_athlete_years(seq: str) -> List[str]:
     Returns:
         List[str]: Liste des années (str).
     """
-    url = f"https://www.athle.fr/athletes/{seq}/resultats"
-    response = requests.get(url)
-    response.raise_for_status()
-    
-    soup = BeautifulSoup(response.text, "html.parser")
-    # Trouver le titre "Résultats par année"
-    header = soup.find(lambda t: t.name in ("h2", "h3") and "Résultats par année" in t.get_text())
-
-    years = []
-    if header:
-        # On lit les éléments suivants jusqu'à la prochaine section
-        for sib in header.find_next_siblings():
-            # Si on tombe sur un autre titre, on arrête
-            if sib.name in ("h2", "h3"):
-                break
-            for txt in sib.stripped_strings:
-                if txt.isdigit() and len(txt) == 4:
-                    y = int(txt)
-                    if 2000 <= y <= datetime.now().year:
-                        s = str(y)
-                        if s not in years:
-                            years.append(s)
-                            
-    return years
+    return get_athlete_profile(seq)["years"]
 
 def get_athlete_results(seq: str, year: str) -> Optional[pd.DataFrame]:
     """
@@ -61,48 +51,11 @@ def get_athlete_results(seq: str, year: str) -> Optional[pd.DataFrame]:
     """
     
     url = f"https://www.athle.fr/ajax/fiche-athlete-resultats.aspx?seq={seq}&annee={year}"
-    r = requests.get(url)
-    r.raise_for_status()
+    html = season_cache.fetch_text("ffa", seq, year, "GET", url, should_cache=has_results_table)
     try:
-        soup = BeautifulSoup(r.text, "html.parser")
-        # Supprimer les sous-tableaux "detail-inner-table"
-        for t in soup.select(".detail-inner-table"):
-            t.decompose()
-
-        thead = soup.select_one("thead")
-        tbody = soup.select_one("tbody")
-        if not thead or not tbody:
+        df = results_table_to_df(html, year)
+        if df is None:
             raise ValueError("thead ou tbody introuvable")
-
-        headers = [th.get_text(strip=True) for th in thead.select("tr > th")]
-        if headers and not headers[-1]:
-            headers = headers[:-1]
-
-        rows = []
-        # On parcourt uniquement les enfants directs de tbody
-        for tr in tbody.find_all("tr", recursive=False):
-            classes = tr.get("class", [])
-            if any(c.startswith("detail-row") for c in classes):
-                continue
-
-            # <td> de premier niveau uniquement
-            tds = tr.find_all("td", recursive=False)
-            if tds and "desktop-tablet-d-none" in tds[-1].get("class", []):
-                tds = tds[:-1]
-
-            cells = []
-            for i, td in enumerate(tds):
-                if i == len(headers) - 1:
-                    a = td.find("a")
-                    cells.append(a.get_text(strip=True) if a else td.get_text(" ", strip=True))
-                else:
-                    cells.append(td.get_text(" ", strip=True))
-
-            cells = cells[:len(headers)]
-            rows.append(cells)
-
-        df = pd.DataFrame(rows, columns=headers)
-        df['Annee'] = year
         return df
     except Exception as e:
         print(f"Erreur lors de la récupération des résultats pour {year}: {e}")
@@ -131,65 +84,15 @@ def get_all_athlete_results(seq: str) -> pd.DataFrame:
         return pd.DataFrame(columns=['seq', 'Club', 'Date', 'Epreuve', 'Tour', 'Pl.', 'Perf.', 'Vt.', 'Niv.', 'Pts', 'Ville', 'Annee'])
 
 
-def get_athlete_birth_info(seq: str) -> Tuple[Optional[str], Optional[int]]:
-    """
-    Scrape la page de l'athlète pour récupérer sa date de naissance brute et son année.
-    Gère les formats "Né(e) le : JJ/MM/AAAA" et "Né(e) en : AAAA".
-    
-    Returns:
-        Tuple[str, int]: (date_brute, année) ou (None, None)
-    """
-    url = f"https://www.athle.fr/athletes/{seq}/resultats"
-    try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return None, None
-            
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Recherche du label "Né(e)"
-        label_span = soup.find('span', string=lambda t: t and "Né(e)" in t)
-        
-        if label_span:
-            # Récupération du texte suivant (soit sibling direct, soit dans un <b>)
-            raw_text = label_span.next_sibling
-            if not raw_text or not raw_text.strip():
-                next_tag = label_span.find_next_sibling('b')
-                if next_tag:
-                    raw_text = next_tag.text
-            
-            if raw_text:
-                full_text = raw_text.strip()
-                # On prend le premier "mot" qui est généralement la date (ex: "19/07/1993" ou "1998")
-                # On ignore ce qui suit (ex: "à Paris")
-                date_part = full_text.split(' ')[0]
-                
-                # Extraction de l'année via Regex (cherche 4 chiffres consécutifs)
-                match_year = re.search(r'(\d{4})', date_part)
-                year = int(match_year.group(1)) if match_year else None
-                
-                return date_part, year
-                
-    except Exception as e:
-        print(f"Erreur scraping date naissance pour {seq}: {e}")
-        
-    return None, None
-
-
 def save_athlete_info(seq: str, name: str, club: str, sex: str, engine, 
                      birth_date_raw: str = None, birth_year: int = None, 
                      table_name: str = 'athletes'):
     """
     Insère ou met à jour les informations d'un athlète, y compris la date de naissance.
+    Écriture en base uniquement : une naissance absente reste NULL (ou garde la
+    valeur déjà connue) et sera complétée par `src.data_storage.enrich_birth`.
     """
     now = datetime.utcnow()
-    
-    # Si les infos de naissance ne sont pas fournies, on essaie de les scraper à la volée
-    if birth_date_raw is None or birth_year is None:
-        scraped_raw, scraped_year = get_athlete_birth_info(seq)
-        # On ne remplace que si on a trouvé quelque chose, sinon on garde None
-        if scraped_raw: birth_date_raw = scraped_raw
-        if scraped_year: birth_year = scraped_year
 
     with engine.begin() as conn:
         conn.execute(text(f'''
@@ -213,6 +116,119 @@ def save_athlete_info(seq: str, name: str, club: str, sex: str, engine,
         ))
 
 
+_TRGM_SEARCH_SQL = """
+    WITH q AS (
+        SELECT normalize_name(:term) AS term,
+               '%' || normalize_name(:escaped) || '%' AS pattern
+    )
+    SELECT a.seq, a.name, a.club, a.sex
+    FROM athletes a, q
+    WHERE (a.name_norm LIKE q.pattern OR q.term <% a.name_norm)
+      {where_wa}
+    ORDER BY (a.name_norm LIKE q.pattern) DESC,
+             word_similarity(q.term, a.name_norm) DESC,
+             similarity(q.term, a.name_norm) DESC,
+             a.name ASC
+    LIMIT :limit
+"""
+
+_LIKE_SEARCH_SQL = """
+    SELECT a.seq, a.name, a.club, a.sex
+    FROM athletes a
+    WHERE LOWER(a.name) LIKE :pattern
+      {where_wa}
+    ORDER BY a.name ASC
+    LIMIT :limit
+"""
+
+# Passe à False si la migration 0002 (pg_trgm / name_norm) n'est pas appliquée
+_trgm_available = True
+
+
+def search_athletes_db(engine, term: str, wa_only: bool = False, limit: int = 10) -> pd.DataFrame:
+    """
+    Recherche d'athlètes dans la table `athletes` (colonnes seq, name, club, sex).
+
+    Avec la migration 0002 : insensible aux accents, classement fait par
+    Postgres (sous-chaîne exacte d'abord, puis similarité trigramme) et
+    tolérant aux fautes de frappe. Sinon : ancien `LOWER(name) LIKE`.
+    """
+    global _trgm_available
+    term = str(term or "").strip()
+    # '\' est le caractère d'échappement par défaut de LIKE
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    where_wa = "AND a.seq LIKE 'WA\\_%'" if wa_only else ""
+    params = {"term": term, "escaped": escaped, "limit": int(limit)}
+
+    if _trgm_available:
+        try:
+            return pd.read_sql_query(
+                text(_TRGM_SEARCH_SQL.format(where_wa=where_wa)), engine, params=params
+            )
+        except (ProgrammingError, pd.errors.DatabaseError) as e:
+            cause = getattr(e, "orig", None) or getattr(e.__cause__, "orig", None) or e
+            if not isinstance(e, ProgrammingError) and not isinstance(e.__cause__, ProgrammingError):
+                raise
+            # fonction / colonne absente : migration 0002 non appliquée
+            print(f"Recherche trigramme indisponible ({cause.__class__.__name__}), repli sur LIKE")
+            _trgm_available = False
+
+    params["pattern"] = f"%{escaped.lower()}%"
+    return pd.read_sql_query(
+        text(_LIKE_SEARCH_SQL.format(where_wa=where_wa)), engine, params=params
+    )
+
+
+# Mois FFA (« 14 Juin », « 3 févr. », « 28 Août »…) → numéro, clés sans accents.
+# Recherche exacte du mot entier : « mar » / « mars » ou « jun » / « juin »
+# ne peuvent plus se remplacer l'un l'autre.
+_MOIS_NUM = {
+    **dict.fromkeys(["janvier", "janv", "jan"], 1),
+    **dict.fromkeys(["fevrier", "fevr", "fev", "feb"], 2),
+    **dict.fromkeys(["mars", "mar"], 3),
+    **dict.fromkeys(["avril", "avr", "apr"], 4),
+    **dict.fromkeys(["mai", "may"], 5),
+    **dict.fromkeys(["juin", "jun"], 6),
+    **dict.fromkeys(["juillet", "juil", "jul"], 7),
+    **dict.fromkeys(["aout", "aou", "aug"], 8),
+    **dict.fromkeys(["septembre", "sept", "sep"], 9),
+    **dict.fromkeys(["octobre", "oct"], 10),
+    **dict.fromkeys(["novembre", "nov"], 11),
+    **dict.fromkeys(["decembre", "dec"], 12),
+}
+_JOUR_MOIS_RE = re.compile(r"^\s*(\d{1,2})(?:er)?\s*([a-z]+)\.?\s*$")
+
+
+def normalize_ffa_dates(dates: pd.Series, years: pd.Series) -> pd.Series:
+    """
+    Dates FFA « jour mois » + colonne année → datetime (NaT si invalide).
+
+    Seuls les couples (date, année) distincts sont analysés – une carrière
+    n'en contient que quelques centaines – puis le résultat est redistribué
+    sur toutes les lignes.
+    """
+    if dates.empty:
+        return pd.Series(pd.to_datetime(dates, errors="coerce"), index=dates.index, name=dates.name)
+    keys = dates.astype(str) + "|" + years.astype(str)
+    codes, uniques = pd.factorize(keys)
+    parts = pd.Series(uniques, dtype=object).str.rsplit("|", n=1, expand=True)
+
+    jour_mois = (
+        parts[0].str.lower()
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.extract(_JOUR_MOIS_RE)
+    )
+    parsed = pd.to_datetime(
+        pd.DataFrame({
+            "year": pd.to_numeric(parts[1], errors="coerce"),
+            "month": jour_mois[1].map(_MOIS_NUM),
+            "day": pd.to_numeric(jour_mois[0], errors="coerce"),
+        }),
+        errors="coerce",
+    )
+    return pd.Series(parsed.to_numpy()[codes], index=dates.index, name=dates.name)
+
+
 def clean_and_prepare_results_df(df, seq):
     """
     Nettoie et prépare le DataFrame pour insertion PostgreSQL :
@@ -226,58 +242,14 @@ def clean_and_prepare_results_df(df, seq):
         'Performance': 'perf', 'Vent': 'vt', 'Niveau': 'niv', 'Points': 'pts', 'Lieu': 'ville', 'Annee': 'annee', 'seq': 'seq'
     }
     
-    mois_map = {
-        "janv": "Jan",
-        "jan": "Jan",
-        "fév": "Feb",
-        "fev": "Feb",
-        "fév": "Feb",
-        "mars": "Mar",
-        "mar": "Mar",
-        "avr": "Apr",
-        "avr.": "Apr",
-        "mai": "May",
-        "juin": "Jun",
-        "jun": "Jun",
-        "juil": "Jul",
-        "juil.": "Jul",
-        "août": "Aug",
-        "aout": "Aug",
-        "aoû": "Aug",
-        "sept": "Sep",
-        "sept.": "Sep",
-        "oct": "Oct",
-        "oct.": "Oct",
-        "nov": "Nov",
-        "nov.": "Nov",
-        "déc": "Dec",
-        "dec": "Dec",
-        "déc.": "Dec",
-        "dec.": "Dec",
-    }
-    
     df = df.rename(columns=col_map)
     # df['seq'] = seq
     # Reconstitue la date complète avant conversion
     if 'date' in df.columns and 'annee' in df.columns:
-        date_series = df["date"].astype(str).str.strip().str.lower()
-        date_series = date_series.str.replace(r"\.", "", regex=True)
-
-        for fr_token, en_token in mois_map.items():
-            date_series = date_series.str.replace(fr_token, en_token.lower(), regex=False)
-
-        date_series = date_series.str.replace(r"\s+", " ", regex=True).str.strip()
-
-        df["date_clean"] = date_series.str.title()
-        df["date"] = pd.to_datetime(
-            df["date_clean"] + " " + df["annee"].astype(str),
-            format="%d %b %Y",
-            errors='coerce',
-        )
+        df["date"] = normalize_ffa_dates(df["date"], df["annee"])
         df = df.dropna(subset=['date'])
         # df = df[df['date'].notna()].copy()       # on ne garde que les dates valides
         # df['date'] = df['date'].astype(object)   # pour autoriser les None  
-        df = df.drop(columns=['date_clean'])
     # Nettoyage des types et valeurs manquantes
     for col in ['club', 'epreuve', 'tour', 'pl', 'perf', 'vt', 'niv', 'pts', 'ville']:
         if col in df.columns:
@@ -306,12 +278,131 @@ def clean_and_prepare_results_df(df, seq):
 #         print(f"Erreur lors de l'insertion batch : {e}")
 #         return 0
 
+_PERF_COLUMNS = ("perf_seconds", "perf_status")
+_table_columns_cache: dict = {}
+_table_columns_generation = 0
+_RESULTS_KEY = ("seq", "date", "epreuve", "tour", "perf")
+
+
+def table_columns(engine: Engine, table: str) -> Dict[str, str]:
+    """Colonnes de `table` → type SQL (lues une fois par moteur et par table)."""
+    key = (str(engine.url), table)
+    cols = _table_columns_cache.get(key)
+    if cols is None:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND table_name = :t "
+                    "ORDER BY ordinal_position"
+                ),
+                {"t": table},
+            ).fetchall()
+        cols = {r[0]: r[1] for r in rows}
+        _table_columns_cache[key] = cols
+    return cols
+
+
+def clear_table_columns_cache():
+    """Oublie les colonnes lues par `table_columns` (appelée après chaque migration)."""
+    global _table_columns_generation
+    _table_columns_cache.clear()
+    _table_columns_generation += 1
+
+
+def table_columns_generation() -> int:
+    """Compteur incrémenté à chaque `clear_table_columns_cache` (caches tiers)."""
+    return _table_columns_generation
+
+
+def with_perf_columns(df: pd.DataFrame, engine: Engine, table: str = "results") -> pd.DataFrame:
+    """
+    Ajoute `perf_seconds` / `perf_status` (calculés une fois à l'écriture) si
+    la table les possède (migration 0003) ; sinon renvoie `df` inchangé.
+    """
+    if "perf" not in df.columns or not set(_PERF_COLUMNS) <= table_columns(engine, table).keys():
+        return df
+    return add_perf_columns(df)
+
+
+def add_perf_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Copie de `df` avec `perf_seconds` / `perf_status` calculés depuis `perf`."""
+    seconds = convert_times_to_seconds(df["perf"])
+    df = df.copy()
+    # None plutôt que NaN : NULL en base
+    df["perf_seconds"] = seconds.astype(object).where(seconds.notna(), None)
+    df["perf_status"] = mark_status(df["perf"], seconds)
+    return df
+
+
+def _sql_cast(column: str, data_type: str) -> str:
+    # Staging en texte : « 2024.0 » (année float côté WA) doit rester accepté
+    if data_type in ("integer", "bigint", "smallint"):
+        return f"{column}::numeric::{data_type}"
+    return f"{column}::{data_type}"
+
+
+def copy_results(cur, df: pd.DataFrame, table: str, column_types: Dict[str, str]) -> Dict[str, int]:
+    """
+    Écrit `df` dans `table` via COPY vers une table temporaire puis
+    `INSERT … SELECT … ON CONFLICT DO NOTHING RETURNING seq`, dans la
+    transaction en cours de `cur`. Renvoie le nombre de lignes réellement
+    insérées par seq (exact même si un autre process écrit en parallèle).
+    """
+    columns = [c for c in df.columns if c in column_types]
+    if df.empty or not columns:
+        return {}
+    # Une table temporaire par connexion (et par schéma de colonnes), en texte
+    stage = f"_stage_{table}_{len(column_types)}"
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} ({', '.join(f'{c} text' for c in column_types)}) "
+        "ON COMMIT DELETE ROWS"
+    )
+
+    buf = io.StringIO()
+    # \N = NULL ; une chaîne vide reste une chaîne vide (clé d'unicité « tour »…)
+    df[columns].to_csv(buf, index=False, header=False, na_rep="\\N", date_format="%Y-%m-%d")
+    buf.seek(0)
+    col_list = ", ".join(columns)
+    cur.copy_expert(f"COPY {stage} ({col_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+
+    select_list = ", ".join(_sql_cast(c, column_types[c]) for c in columns)
+    cur.execute(
+        f"""
+        WITH ins AS (
+            INSERT INTO {table} ({col_list})
+            SELECT {select_list} FROM {stage}
+            ON CONFLICT ({', '.join(_RESULTS_KEY)}) DO NOTHING
+            RETURNING seq
+        )
+        SELECT seq, COUNT(*) FROM ins GROUP BY seq
+        """
+    )
+    inserted = {seq: int(n) for seq, n in cur.fetchall()}
+    cur.execute(f"TRUNCATE {stage}")
+    return inserted
+
+
+def prepare_results_for_db(df: pd.DataFrame, engine: Engine, table: str = "results") -> pd.DataFrame:
+    """Colonnes calculées (perf_seconds…) et catégories repassées en objets (NaN → NULL)."""
+    return categories_to_objects(with_perf_columns(df, engine, table))
+
+
+def categories_to_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes catégorielles repassées en objets (NaN → None, donc NULL)."""
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if categorical:
+        df = df.astype({c: object for c in categorical})
+        for c in categorical:
+            df[c] = df[c].where(df[c].notna(), None)
+    return df
+
+
 def save_results_to_postgres(
     df: pd.DataFrame,
     seq: str,
     engine: Engine,
     table: str = "results",
-    batch_size: int = 1000,
 ) -> int:
     """
     Insère les résultats d'un athlète dans Postgres sans créer de doublons.
@@ -322,37 +413,25 @@ def save_results_to_postgres(
     seq : identifiant de l'athlète
     engine : SQLAlchemy Engine vers la base Postgres
     table : nom de la table cible (défaut « results »)
-    batch_size : taille des paquets pour execute_values
 
     Retour
     ------
-    int : nombre de nouvelles lignes réellement insérées
+    int : nombre de nouvelles lignes réellement insérées (RETURNING, sans
+    recomptage de la table)
     """
     if df.empty:
         return 0
 
-    # ------------------------------------------------------------------ build
-    columns = list(df.columns)
-    values  = [tuple(row) for row in df.to_numpy()]
-
-    placeholders = ",".join(columns)
-    count_sql = f"SELECT COUNT(*) FROM {table} WHERE seq = %s"
-    insert_sql = f"""
-        INSERT INTO {table} ({placeholders})
-        VALUES %s
-        ON CONFLICT (seq, date, epreuve, tour, perf) DO NOTHING
-    """
+    df = prepare_results_for_db(df, engine, table)
 
-    # ─── NEW ─── remplacement du bloc connexion/curseur ──────────────────
-    raw_conn = engine.raw_connection()          # ← plus de « with »
+    raw_conn = engine.raw_connection()
     try:
         with closing(raw_conn.cursor()) as cur:
-            cur.execute(count_sql, (seq,))
-            before_count = cur.fetchone()[0]
-            execute_values(cur, insert_sql, values, page_size=batch_size)
-            cur.execute(count_sql, (seq,))
-            after_count = cur.fetchone()[0]
+            inserted = copy_results(cur, df, table, table_columns(engine, table))
         raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
     finally:
         raw_conn.close()
-    return max(0, int(after_count) - int(before_count))
\ No newline at end of file
+    return sum(inserted.values())
@@ -1,142 +1,313 @@
 import asyncio
+import concurrent.futures
+import contextlib
 import httpx
-from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils import async_runner, season_cache
+from src.utils.ffa_parsers import has_results_table, parse_athlete_profile, results_table_to_df
+from src.utils.rate_limiter import CircuitOpenError, arequest
 
 # Configuration
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-async def fetch_url(client, url):
-    try:
-        # Important: follow_redirects=True pour gérer les redirections éventuelles
-        resp = await client.get(url, follow_redirects=True)
-        resp.raise_for_status()
-        return resp.text
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return None
+# Nombre maximal de requêtes simultanées vers athle.fr, tous athlètes confondus
+DEFAULT_MAX_CONCURRENCY = 20
 
-async def get_athlete_years_async(client, seq: str) -> List[str]:
-    """Récupère les années disponibles (version async)"""
-    # On utilise la même URL que la version synchrone qui fonctionne
+_EMPTY_COLUMNS = ['seq', 'Club', 'Date', 'Epreuve', 'Tour', 'Pl.', 'Perf.', 'Vt.', 'Niv.', 'Pts', 'Ville', 'Annee']
+
+
+def build_client(http2: bool = True, max_connections: int = DEFAULT_MAX_CONCURRENCY) -> httpx.AsyncClient:
+    """
+    Construit un client httpx destiné à être partagé entre de nombreux athlètes :
+    connexions keep-alive conservées dans le pool et multiplexage HTTP/2.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=60.0,
+    )
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=30.0,
+        follow_redirects=True,
+        http2=http2,
+        limits=limits,
+    )
+
+
+def shared_client() -> httpx.AsyncClient:
+    """
+    Client httpx partagé par tous les appels soumis à `async_runner` : le
+    pool de connexions reste chaud entre deux athlètes, deux batchs de
+    l'updater ou deux reruns Streamlit. À n'appeler que depuis la boucle
+    d'arrière-plan.
+    """
+    return async_runner.shared(
+        "ffa_client", lambda: build_client(http2=True, max_connections=DEFAULT_MAX_CONCURRENCY)
+    )
+
+
+async def fetch_url(
+    client,
+    url,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache_key: Optional[Tuple[str, str, str]] = None,
+):
+    # Le sémaphore (optionnel) borne le nombre de requêtes en vol sur tout un batch
+    async with semaphore if semaphore is not None else contextlib.nullcontext():
+        try:
+            if cache_key is not None:
+                # Réponse de saison : cache disque (source, athlète, année) + revalidation ;
+                # seule une page avec tableau de résultats est mise en cache
+                return await season_cache.afetch_text(
+                    client, *cache_key, "GET", url, should_cache=has_results_table, follow_redirects=True
+                )
+            # Important: follow_redirects=True pour gérer les redirections éventuelles
+            # Passage par le limiteur athle.fr (débit adaptatif + disjoncteur)
+            resp = await arequest(client, "GET", url, follow_redirects=True)
+            resp.raise_for_status()
+            return resp.text
+        except CircuitOpenError:
+            # Hôte considéré indisponible : on échoue vite au lieu de tenter chaque année
+            raise
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+async def get_athlete_profile_async(
+    client, seq: str, semaphore: Optional[asyncio.Semaphore] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Télécharge la page profil une seule fois et en extrait années, naissance,
+    nom et club (voir `parse_athlete_profile`). None si la page est inaccessible.
+    """
     url = f"https://www.athle.fr/athletes/{seq}/resultats"
-    html = await fetch_url(client, url)
+    html = await fetch_url(client, url, semaphore)
     if not html:
-        return []
-    
-    soup = BeautifulSoup(html, "html.parser")
-    header = soup.find(lambda t: t.name in ("h2", "h3") and "Résultats par année" in t.get_text())
-    
-    years = []
-    if header:
-        for sib in header.find_next_siblings():
-            if sib.name in ("h2", "h3"):
-                break
-            for txt in sib.stripped_strings:
-                if txt.isdigit() and len(txt) == 4:
-                    y = int(txt)
-                    if 2000 <= y <= datetime.now().year:
-                        s = str(y)
-                        if s not in years:
-                            years.append(s)
-    return years
-
-async def get_athlete_results_async(client, seq: str, year: str) -> Optional[pd.DataFrame]:
-    """Récupère les résultats d'une année (version async)"""
+        return None
+    return parse_athlete_profile(html)
+
+async def get_athlete_years_async(client, seq: str, semaphore: Optional[asyncio.Semaphore] = None) -> List[str]:
+    """Récupère les années disponibles (version async)"""
+    profile = await get_athlete_profile_async(client, seq, semaphore)
+    return profile["years"] if profile else []
+
+async def get_athlete_results_async(
+    client, seq: str, year: str, semaphore: Optional[asyncio.Semaphore] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Récupère les résultats d'une année (version async). None si la saison
+    n'a pas pu être lue (erreur réseau, page sans tableau de résultats).
+    """
     url = f"https://www.athle.fr/ajax/fiche-athlete-resultats.aspx?seq={seq}&annee={year}"
-    html = await fetch_url(client, url)
+    html = await fetch_url(client, url, semaphore, cache_key=("ffa", seq, year))
     if not html:
         return None
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        # Nettoyage comme dans la version synchrone
-        for t in soup.select(".detail-inner-table"):
-            t.decompose()
-
-        thead = soup.select_one("thead")
-        tbody = soup.select_one("tbody")
-        if not thead or not tbody:
-            return None
-
-        headers = [th.get_text(strip=True) for th in thead.select("tr > th")]
-        if headers and not headers[-1]:
-            headers = headers[:-1]
-
-        rows = []
-        for tr in tbody.find_all("tr", recursive=False):
-            classes = tr.get("class", [])
-            if any(c.startswith("detail-row") for c in classes):
-                continue
-
-            tds = tr.find_all("td", recursive=False)
-            if tds and "desktop-tablet-d-none" in tds[-1].get("class", []):
-                tds = tds[:-1]
-
-            cells = []
-            for i, td in enumerate(tds):
-                if i == len(headers) - 1:
-                    a = td.find("a")
-                    cells.append(a.get_text(strip=True) if a else td.get_text(" ", strip=True))
-                else:
-                    cells.append(td.get_text(" ", strip=True))
-
-            cells = cells[:len(headers)]
-            rows.append(cells)
-
-        df = pd.DataFrame(rows, columns=headers)
-        df['Annee'] = year
-        return df
+        return results_table_to_df(html, year)
     except Exception as e:
         print(f"Error parsing results for {year}: {e}")
         return None
 
-async def get_all_results_async(seq: str) -> pd.DataFrame:
-    """Orchestre les appels asynchrones"""
-    # On désactive http2=True car certains serveurs/proxies le gèrent mal et cela peut causer des échecs silencieux
-    async with httpx.AsyncClient(headers=HEADERS, timeout=30.0, follow_redirects=True) as client:
-        # 1. Récupérer les années
-        years = await get_athlete_years_async(client, seq)
-        if not years:
-            # Fallback: si pas d'années trouvées, on renvoie vide
-            return pd.DataFrame(columns=['seq', 'Club', 'Date', 'Epreuve', 'Tour', 'Pl.', 'Perf.', 'Vt.', 'Niv.', 'Pts', 'Ville', 'Annee'])
-        
-        # 2. Lancer toutes les requêtes d'années en PARALLÈLE
-        tasks = [get_athlete_results_async(client, seq, year) for year in years]
-        results = await asyncio.gather(*tasks)
-        
-        # 3. Assembler les résultats
-        dfs = [df for df in results if df is not None]
-        
-        if dfs:
-            final_df = pd.concat(dfs, ignore_index=True)
-            final_df['seq'] = seq
-            return final_df
-        else:
-            return pd.DataFrame(columns=['seq', 'Club', 'Date', 'Epreuve', 'Tour', 'Pl.', 'Perf.', 'Vt.', 'Niv.', 'Pts', 'Ville', 'Annee'])
-
-def get_all_results_fast(seq: str) -> pd.DataFrame:
+def select_years_to_fetch(
+    available: Iterable[str],
+    stored: Iterable,
+    current_year: Optional[int] = None,
+) -> List[str]:
     """
-    Fonction principale à appeler depuis votre code.
-    Remplace get_all_athlete_results.
+    Mode incrémental : parmi les années du profil, ne garde que la saison en
+    cours, la précédente (résultats encore saisis / corrigés) et les années
+    absentes de la base.
+    """
+    current_year = current_year or datetime.now().year
+    stored_set = {str(y) for y in stored}
+    return [y for y in available if int(y) >= current_year - 1 or str(y) not in stored_set]
+
+
+def _empty_results(profile: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(columns=_EMPTY_COLUMNS)
+    df.attrs["profile"] = profile
+    return df
+
+
+async def get_all_results_async(
+    seq: str,
+    client: Optional[httpx.AsyncClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    known_years: Optional[Iterable] = None,
+) -> pd.DataFrame:
+    """
+    Orchestre les appels asynchrones pour un athlète.
+    Si `client` est fourni il est réutilisé (et n'est pas fermé), sinon un client
+    dédié est ouvert le temps de l'appel.
+    Si `known_years` (années déjà en base) est fourni, seules les saisons
+    pouvant encore changer et les années manquantes sont téléchargées.
+    Le profil lu au passage (années, naissance, nom, club – cf.
+    `parse_athlete_profile`) est exposé dans `df.attrs["profile"]` (None si
+    la page profil était inaccessible) : inutile de la re-télécharger.
+    Les années demandées mais non lues (erreur réseau, page sans tableau)
+    sont listées dans `df.attrs["failed_years"]` : une saison en échec n'est
+    pas une saison vide.
+    """
+    if client is None:
+        # On désactive http2=True car certains serveurs/proxies le gèrent mal et cela peut causer des échecs silencieux
+        async with httpx.AsyncClient(headers=HEADERS, timeout=30.0, follow_redirects=True) as own_client:
+            return await get_all_results_async(seq, client=own_client, semaphore=semaphore, known_years=known_years)
+
+    # 1. Récupérer le profil (années + naissance) en un seul téléchargement
+    profile = await get_athlete_profile_async(client, seq, semaphore)
+    years = profile["years"] if profile else []
+    if known_years is not None:
+        years = select_years_to_fetch(years, known_years)
+    if not years:
+        # Fallback: si pas d'années trouvées (ou rien à rafraîchir), on renvoie vide
+        return _empty_results(profile)
+
+    # 2. Lancer toutes les requêtes d'années en PARALLÈLE
+    tasks = [get_athlete_results_async(client, seq, year, semaphore) for year in years]
+    results = await asyncio.gather(*tasks)
+
+    # 3. Assembler les résultats
+    dfs = [df for df in results if df is not None]
+    failed_years = [year for year, df in zip(years, results) if df is None]
+
+    if dfs:
+        final_df = pd.concat(dfs, ignore_index=True)
+        final_df['seq'] = seq
+        final_df.attrs["profile"] = profile
+    else:
+        final_df = _empty_results(profile)
+    final_df.attrs["failed_years"] = failed_years
+    return final_df
+
+
+async def get_many_results_async(
+    seqs: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    http2: bool = True,
+    client: Optional[httpx.AsyncClient] = None,
+    known_years: Optional[Dict[str, Iterable]] = None,
+) -> AsyncIterator[Tuple[str, pd.DataFrame]]:
     """
+    Récupère les résultats de plusieurs athlètes avec un seul client partagé.
+
+    - un unique client keep-alive / HTTP/2 (créé ici si `client` n'est pas fourni)
+    - une limite globale de `max_concurrency` requêtes en vol, tous athlètes confondus
+    - chaque couple (seq, DataFrame) est produit dès que l'athlète est terminé,
+      sans attendre le reste du batch
+    - `known_years` {seq: années en base} active le mode incrémental par athlète
+
+    Usage :
+        async for seq, df in get_many_results_async(seqs):
+            ...
+    """
+    seqs = list(dict.fromkeys(str(s) for s in seqs))
+    if not seqs:
+        return
+
+    own_client = client is None
+    if own_client:
+        client = build_client(http2=http2, max_connections=max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(seq: str) -> Tuple[str, pd.DataFrame]:
+        try:
+            known = known_years.get(seq, ()) if known_years is not None else None
+            return seq, await get_all_results_async(seq, client=client, semaphore=semaphore, known_years=known)
+        except Exception as e:
+            print(f"Error fetching results for {seq}: {e}")
+            return seq, _empty_results(None)
+
+    tasks = [asyncio.create_task(_one(seq)) for seq in seqs]
     try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Arrêt anticipé du consommateur : on n'abandonne pas de tâches en vol
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_client:
+            await client.aclose()
+
+
+async def _all_results_shared(seq: str, known_years: Optional[Iterable]) -> pd.DataFrame:
+    return await get_all_results_async(seq, client=shared_client(), known_years=known_years)
+
 
-    if loop and loop.is_running():
+async def _many_results_shared(
+    seqs: Iterable[str],
+    max_concurrency: int,
+    known_years: Optional[Dict[str, Iterable]],
+) -> AsyncIterator[Tuple[str, pd.DataFrame]]:
+    async for item in get_many_results_async(
+        seqs, max_concurrency=max_concurrency, client=shared_client(), known_years=known_years
+    ):
+        yield item
+
+
+async def _many_profiles_shared(seqs: List[str], max_concurrency: int) -> Dict[str, Optional[Dict[str, Any]]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    client = shared_client()
+
+    async def _one(seq: str) -> Optional[Dict[str, Any]]:
         try:
-            import nest_asyncio
-            nest_asyncio.apply()
-        except ImportError:
-            raise RuntimeError(
-                "Vous êtes dans un environnement asynchrone (Jupyter, etc.). "
-                "Utilisez 'await get_all_results_async(seq)' ou installez 'nest_asyncio'."
-            )
-            
-    return asyncio.run(get_all_results_async(seq))
+            return await get_athlete_profile_async(client, seq, semaphore)
+        except Exception as e:
+            print(f"Error fetching profile for {seq}: {e}")
+            return None
+
+    profiles = await asyncio.gather(*(_one(seq) for seq in seqs))
+    return dict(zip(seqs, profiles))
+
+
+def fetch_many_profiles(
+    seqs: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = None,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Pages profil de plusieurs athlètes en parallèle (client partagé, au plus
+    `max_concurrency` requêtes en vol) : {seq: profil ou None si inaccessible}.
+    """
+    seqs = list(dict.fromkeys(str(s) for s in seqs))
+    if not seqs:
+        return {}
+    return async_runner.run(_many_profiles_shared(seqs, max_concurrency), timeout=timeout)
+
+
+def submit_all_results(seq: str, known_years: Optional[Iterable] = None) -> "concurrent.futures.Future[pd.DataFrame]":
+    """
+    Planifie le scraping d'un athlète dans la boucle d'arrière-plan et
+    renvoie aussitôt un `concurrent.futures.Future` (client partagé).
+    """
+    return async_runner.submit(_all_results_shared(seq, known_years))
+
+
+def get_all_results_fast(seq: str, known_years: Optional[Iterable] = None, timeout: Optional[float] = None) -> pd.DataFrame:
+    """
+    Fonction principale à appeler depuis votre code.
+    Remplace get_all_athlete_results.
+    S'exécute dans la boucle d'arrière-plan d'`async_runner` : utilisable
+    aussi bien depuis un script que depuis un environnement où une boucle
+    tourne déjà (Jupyter, Streamlit), sans `nest_asyncio`.
+    """
+    return async_runner.run(_all_results_shared(seq, known_years), timeout=timeout)
+
+
+def stream_many_results(
+    seqs: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    known_years: Optional[Dict[str, Iterable]] = None,
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Version synchrone de `get_many_results_async` (client partagé) : chaque
+    (seq, DataFrame) est rendu dès que l'athlète est terminé.
+    """
+    return async_runner.iterate(_many_results_shared(list(seqs), max_concurrency, known_years))
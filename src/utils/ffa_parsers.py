@@ -0,0 +1,351 @@
+"""utils/ffa_parsers.py – Parsing des pages FFA
+--------------------------------------------
+• `parse_athlete_profile()` – page profil `/athletes/{seq}/resultats` :
+  années, naissance, nom et club en un seul parse.
+
+Extraction des lignes du fragment `fiche-athlete-resultats.aspx` avec un
+backend au choix :
+
+• `selectolax` (lexbor, C)  – défaut, le plus rapide
+• `lxml`       (libxml2, C)  – alternative
+• `bs4`        (html.parser) – implémentation de référence
+
+Les trois backends renvoient exactement les mêmes (en-têtes, lignes) ;
+le backend par défaut se règle via la variable d'environnement
+`FFA_PARSER`. Vérification d'équivalence : `python -m pytest tests/test_ffa_parsers.py`
+(pages enregistrées dans `tests/fixtures/ffa`) ou `python -m src.utils.ffa_parsers`.
+"""
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+ParsedTable = Tuple[List[str], List[List[str]]]
+
+_SEP = "\x00"
+# Un tableau sans <thead>/<tbody> explicites est ignoré (lexbor les insérerait)
+_THEAD_RE = re.compile(r"<thead[\s>]", re.IGNORECASE)
+_TBODY_RE = re.compile(r"<tbody[\s>]", re.IGNORECASE)
+
+
+def _normalize_newlines(html: str) -> str:
+    # Les parseurs HTML5 normalisent \r\n → \n : on fait de même en amont pour
+    # que tous les backends voient exactement le même texte.
+    return html.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _finalize_row(cells: List[str], headers: List[str]) -> List[str]:
+    return cells[:len(headers)]
+
+
+###############################################################################
+# Page profil athlète #########################################################
+###############################################################################
+
+def _label_value(soup: BeautifulSoup, label: str) -> Optional[str]:
+    """Texte qui suit un libellé `<span>label…</span>` (nœud texte ou `<b>`)."""
+    label_span = soup.find('span', string=lambda t: t and label in t)
+    if not label_span:
+        return None
+    # Récupération du texte suivant (soit sibling direct, soit dans un <b>)
+    raw_text = label_span.next_sibling
+    if not isinstance(raw_text, str) or not raw_text.strip():
+        next_tag = label_span.find_next_sibling('b')
+        raw_text = next_tag.text if next_tag else None
+    return raw_text.strip() if raw_text and raw_text.strip() else None
+
+
+def parse_athlete_profile(html: str) -> Dict[str, Any]:
+    """
+    Extrait d'un seul parse de la page profil :
+    - `years`          : années de la section « Résultats par année » (str)
+    - `birth_date_raw` : date brute (« 19/07/1993 » ou « 1998 »)
+    - `birth_year`     : année de naissance (int)
+    - `name`, `club`   : identité affichée (best effort, None si absente)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Trouver le titre "Résultats par année"
+    header = soup.find(lambda t: t.name in ("h2", "h3") and "Résultats par année" in t.get_text())
+    years: List[str] = []
+    if header:
+        # On lit les éléments suivants jusqu'à la prochaine section
+        for sib in header.find_next_siblings():
+            # Si on tombe sur un autre titre, on arrête
+            if sib.name in ("h2", "h3"):
+                break
+            for txt in sib.stripped_strings:
+                if txt.isdigit() and len(txt) == 4:
+                    y = int(txt)
+                    if 2000 <= y <= datetime.now().year:
+                        s = str(y)
+                        if s not in years:
+                            years.append(s)
+
+    # Naissance : "Né(e) le : JJ/MM/AAAA" ou "Né(e) en : AAAA"
+    birth_date_raw, birth_year = None, None
+    birth_text = _label_value(soup, "Né(e)")
+    if birth_text:
+        # On prend le premier "mot" (la date), on ignore la suite (ex: "à Paris")
+        birth_date_raw = birth_text.split(' ')[0]
+        match_year = re.search(r'(\d{4})', birth_date_raw)
+        birth_year = int(match_year.group(1)) if match_year else None
+
+    h1 = soup.find("h1")
+    name = h1.get_text(" ", strip=True) if h1 else None
+
+    return {
+        "years": years,
+        "birth_date_raw": birth_date_raw,
+        "birth_year": birth_year,
+        "name": name or None,
+        "club": _label_value(soup, "Club"),
+    }
+
+
+###############################################################################
+# Backend de référence : BeautifulSoup ########################################
+###############################################################################
+
+def parse_results_table_bs4(html: str) -> Optional[ParsedTable]:
+    soup = BeautifulSoup(html, "html.parser")
+    # Supprimer les sous-tableaux "detail-inner-table"
+    for t in soup.select(".detail-inner-table"):
+        t.decompose()
+
+    thead = soup.select_one("thead")
+    tbody = soup.select_one("tbody")
+    if not thead or not tbody:
+        return None
+
+    headers = [th.get_text(strip=True) for th in thead.select("tr > th")]
+    if headers and not headers[-1]:
+        headers = headers[:-1]
+
+    rows = []
+    # On parcourt uniquement les enfants directs de tbody
+    for tr in tbody.find_all("tr", recursive=False):
+        classes = tr.get("class", [])
+        if any(c.startswith("detail-row") for c in classes):
+            continue
+
+        # <td> de premier niveau uniquement
+        tds = tr.find_all("td", recursive=False)
+        if tds and "desktop-tablet-d-none" in tds[-1].get("class", []):
+            tds = tds[:-1]
+
+        cells = []
+        for i, td in enumerate(tds):
+            if i == len(headers) - 1:
+                a = td.find("a")
+                cells.append(a.get_text(strip=True) if a else td.get_text(" ", strip=True))
+            else:
+                cells.append(td.get_text(" ", strip=True))
+
+        rows.append(_finalize_row(cells, headers))
+    return headers, rows
+
+
+###############################################################################
+# Backend selectolax (lexbor) #################################################
+###############################################################################
+
+def _lexbor_text(node, separator: str = "") -> str:
+    # Équivalent de bs4 get_text(separator, strip=True) : morceaux vides ignorés
+    raw = node.text(deep=True, separator=_SEP, strip=True)
+    return separator.join(part for part in raw.split(_SEP) if part)
+
+
+def _lexbor_classes(node) -> List[str]:
+    return (node.attributes.get("class") or "").split()
+
+
+def parse_results_table_selectolax(html: str) -> Optional[ParsedTable]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    if not _THEAD_RE.search(html) or not _TBODY_RE.search(html):
+        return None
+
+    tree = LexborHTMLParser(html)
+    # Ordre inverse : les tableaux imbriqués sont détruits avant leur parent
+    for t in reversed(tree.css(".detail-inner-table")):
+        t.decompose()
+
+    thead = tree.css_first("thead")
+    tbody = tree.css_first("tbody")
+    if thead is None or tbody is None:
+        return None
+
+    headers = [_lexbor_text(th) for th in thead.css("tr > th")]
+    if headers and not headers[-1]:
+        headers = headers[:-1]
+
+    rows = []
+    for tr in tbody.iter():
+        if tr.tag != "tr":
+            continue
+        if any(c.startswith("detail-row") for c in _lexbor_classes(tr)):
+            continue
+
+        tds = [td for td in tr.iter() if td.tag == "td"]
+        if tds and "desktop-tablet-d-none" in _lexbor_classes(tds[-1]):
+            tds = tds[:-1]
+
+        cells = []
+        for i, td in enumerate(tds):
+            if i == len(headers) - 1:
+                a = td.css_first("a")
+                cells.append(_lexbor_text(a) if a is not None else _lexbor_text(td, " "))
+            else:
+                cells.append(_lexbor_text(td, " "))
+
+        rows.append(_finalize_row(cells, headers))
+    return headers, rows
+
+
+###############################################################################
+# Backend lxml ################################################################
+###############################################################################
+
+def _lxml_text(node, separator: str = "") -> str:
+    return separator.join(s for s in (t.strip() for t in node.itertext()) if s)
+
+
+def _lxml_classes(node) -> List[str]:
+    return (node.get("class") or "").split()
+
+
+def parse_results_table_lxml(html: str) -> Optional[ParsedTable]:
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return None
+    root = lxml.html.document_fromstring(html)
+    for t in reversed(root.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " detail-inner-table ")]')):
+        # Un commentaire vide prend la place du sous-tableau : le texte qui suit
+        # reste un nœud distinct (drop_tree le fusionnerait avec le précédent)
+        placeholder = etree.Comment("")
+        placeholder.tail = t.tail
+        t.getparent().replace(t, placeholder)
+
+    theads = root.xpath("//thead")
+    tbodies = root.xpath("//tbody")
+    if not theads or not tbodies:
+        return None
+    thead, tbody = theads[0], tbodies[0]
+
+    headers = [_lxml_text(th) for th in thead.xpath(".//tr/th")]
+    if headers and not headers[-1]:
+        headers = headers[:-1]
+
+    rows = []
+    for tr in tbody.iterchildren("tr"):
+        if any(c.startswith("detail-row") for c in _lxml_classes(tr)):
+            continue
+
+        tds = list(tr.iterchildren("td"))
+        if tds and "desktop-tablet-d-none" in _lxml_classes(tds[-1]):
+            tds = tds[:-1]
+
+        cells = []
+        for i, td in enumerate(tds):
+            if i == len(headers) - 1:
+                links = td.xpath(".//a")
+                cells.append(_lxml_text(links[0]) if links else _lxml_text(td, " "))
+            else:
+                cells.append(_lxml_text(td, " "))
+
+        rows.append(_finalize_row(cells, headers))
+    return headers, rows
+
+
+###############################################################################
+# Sélection du backend ########################################################
+###############################################################################
+
+PARSERS: Dict[str, Callable[[str], Optional[ParsedTable]]] = {
+    "selectolax": parse_results_table_selectolax,
+    "lxml": parse_results_table_lxml,
+    "bs4": parse_results_table_bs4,
+}
+
+
+def _default_backend() -> str:
+    wanted = os.getenv("FFA_PARSER", "selectolax").strip().lower()
+    for name in (wanted, "selectolax", "lxml"):
+        try:
+            if name == "selectolax":
+                import selectolax.lexbor  # noqa: F401
+            elif name == "lxml":
+                import lxml.html  # noqa: F401
+            if name in PARSERS:
+                return name
+        except ImportError:
+            continue
+    return "bs4"
+
+
+DEFAULT_BACKEND = _default_backend()
+
+
+def parse_results_table(html: str, backend: Optional[str] = None) -> Optional[ParsedTable]:
+    """
+    Extrait (en-têtes, lignes) du fragment HTML de résultats FFA.
+    Renvoie None si le tableau (thead/tbody) est introuvable.
+    """
+    parser = PARSERS[backend or DEFAULT_BACKEND]
+    return parser(_normalize_newlines(html))
+
+
+def has_results_table(html: str) -> bool:
+    """
+    Vrai si le fragment contient le tableau de résultats : seules ces pages
+    vont dans le cache des saisons (pas une page de maintenance, de
+    captcha ou d'erreur renvoyée en 200).
+    """
+    return parse_results_table(html) is not None
+
+
+def results_table_to_df(html: str, year: str, backend: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """DataFrame des résultats d'une année (colonne `Annee` ajoutée) ou None."""
+    parsed = parse_results_table(html, backend)
+    if parsed is None:
+        return None
+    headers, rows = parsed
+    df = pd.DataFrame(rows, columns=headers)
+    df['Annee'] = year
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Mini‑tests d'équivalence ---------------------------------------------------
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    SAMPLE = (
+        "<div><table class='reveal-table'>\r\n<thead><tr><th>Date</th><th> Epreuve </th>"
+        "<th>Performance</th><th>Lieu</th><th></th></tr></thead>\r\n<tbody>"
+        "<tr class='clickable'><td> 12 janv. </td><td>800m <span>Piste Courte</span></td>"
+        "<td><b>1'52''30</b> <!-- ancien --> </td><td><a href='/c'> Val-de-Reuil <i>(27)</i></a> FRA</td>"
+        "<td class='desktop-tablet-d-none'>+</td></tr>"
+        "<tr class='detail-row-1'><td colspan='4'><table class='detail-inner-table'>"
+        "<tr><td>IR2</td></tr></table></td></tr>"
+        "<tr><td>3 Fév.</td><td>1 500m</td><td>3'58''1\r\n(3'57)</td><td>Liévin</td></tr>"
+        "<tr><td> </td><td>A<table class='detail-inner-table'><tr><td>x</td></tr></table>B</td>"
+        "<td></td><td><a></a></td><td>extra</td><td>extra</td></tr>"
+        "</tbody></table></div>"
+    )
+    EMPTY = "<p>Aucun résultat</p>"
+
+    reference = parse_results_table(SAMPLE, "bs4")
+    assert reference is not None and len(reference[1]) == 3, reference
+    for name in PARSERS:
+        got = parse_results_table(SAMPLE, name)
+        assert got == reference, f"{name} ≠ bs4 :\n{got}\n{reference}"
+        assert parse_results_table(EMPTY, name) is None, name
+    print(f"✅ Backends équivalents ({', '.join(PARSERS)}) – défaut : {DEFAULT_BACKEND}")
@@ -40,8 +40,12 @@ def str_to_hex(id_str: str) -> str:
 # ---------------------------------------------------------------------------
 # utils/file_utils.py – version corrigée
 import re
+from functools import lru_cache
 from typing import Optional
 
+import numpy as np
+import pandas as pd
+
 _INVALID = {
     "DQ", "AB", "DNS", "DNF", "NP", "RET", "NC",
     "NCL", "NQ", "EL", "DSQ", "X"
@@ -138,6 +142,125 @@ def convert_time_to_seconds(time_str: str) -> Optional[float]:
         return None
 
 
+@lru_cache(maxsize=4096)
+def _convert_time_cached(time_str: str) -> Optional[float]:
+    return convert_time_to_seconds(time_str)
+
+
+def convert_time_to_seconds_cached(time_str) -> Optional[float]:
+    """`convert_time_to_seconds` mémoïsé (LRU) pour les appels scalaires répétés."""
+    if not isinstance(time_str, str):
+        return None
+    return _convert_time_cached(time_str)
+
+
+# ---------------------------------------------------------------------------
+# Conversion vectorisée -------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Mêmes règles que convert_time_to_seconds, appliquées en une passe
+# `str.extract` par famille de formats sur les valeurs distinctes.
+_INVALID_PAT = "|".join(sorted(_INVALID, key=len, reverse=True))
+_PAREN_PAT = r"\(([^)]+)\)"
+# 1) secondes''centièmes | secondes"centièmes (testés avant toute normalisation)
+_SHORT_PAT = (
+    r"^(?:(?P<dp_sec>\d+)''(?P<dp_cent>\d{1,2})|(?P<s_sec>\d+)\"(?P<s_cent>\d{1,2}))\Z"
+)
+# 2) piste 14'09'95 / 1h02'23 | route 1:02:23.45 (après normalisation des '')
+_LONG_PAT = (
+    r"^(?:(?:(?P<t_h>\d+)h)?(?P<t_min>\d+)'(?P<t_sec>\d{1,2})(?:'+(?P<t_cent>\d{1,2}))?"
+    r"|(?:(?P<r_h>\d+):)?(?P<r_min>\d{1,2}):(?P<r_sec>\d{1,2})(?:\.(?P<r_cent>\d{1,2}))?)\Z"
+)
+
+
+def _num(col: pd.Series) -> np.ndarray:
+    return pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+
+
+def _short_seconds(sec: pd.Series, cent: pd.Series) -> np.ndarray:
+    # get_cent_val : 1 chiffre → dixièmes (x 0.10), 2 chiffres → centièmes (/ 100)
+    c = _num(cent)
+    cent_val = np.where(cent.str.len() == 1, c * 0.10, c / 100)
+    return _num(sec) + cent_val
+
+
+def _long_seconds(h: pd.Series, min_: pd.Series, sec: pd.Series, cent: pd.Series) -> np.ndarray:
+    # _to_seconds : entier h/min/sec puis dixièmes (x 10 / 100) ou centièmes (/ 100)
+    total = _num(min_) * 60 + _num(sec) + np.nan_to_num(_num(h)) * 3600
+    c = _num(cent)
+    cent_val = np.where(cent.str.len() == 1, c * 10 / 100, c / 100)
+    return total + np.nan_to_num(cent_val)
+
+
+def _parse_unique_marks(values: pd.Series) -> pd.Series:
+    """Secondes pour des chaînes distinctes (NaN si non interprétable)."""
+    out = np.full(len(values), np.nan)
+    valid = ~values.str.contains(_INVALID_PAT, regex=True).to_numpy(dtype=bool)
+
+    cleaned = values.str.strip()
+    inner = cleaned.str.extract(_PAREN_PAT, expand=False).str.strip()
+    cleaned = inner.where(inner.notna(), cleaned)
+
+    short = cleaned.str.extract(_SHORT_PAT)
+    is_dp = short["dp_sec"].notna().to_numpy()
+    is_s = short["s_sec"].notna().to_numpy()
+    out = np.where(is_dp, _short_seconds(short["dp_sec"], short["dp_cent"]), out)
+    out = np.where(is_s, _short_seconds(short["s_sec"], short["s_cent"]), out)
+
+    normalized = cleaned.str.replace("''", "'", regex=False)
+    normalized = normalized.where(~normalized.str.endswith("'"), normalized.str[:-1])
+    long_ = normalized.str.extract(_LONG_PAT)
+    is_t = long_["t_min"].notna().to_numpy() & ~is_dp & ~is_s
+    is_r = long_["r_min"].notna().to_numpy() & ~is_dp & ~is_s & ~is_t
+    out = np.where(is_t, _long_seconds(long_["t_h"], long_["t_min"], long_["t_sec"], long_["t_cent"]), out)
+    out = np.where(is_r, _long_seconds(long_["r_h"], long_["r_min"], long_["r_sec"], long_["r_cent"]), out)
+
+    # 3) Reste (valeurs numériques brutes « 7.45 »…) : float() via la version scalaire
+    rest = valid & ~(is_dp | is_s | is_t | is_r)
+    if rest.any():
+        out[rest] = [
+            np.nan if (v := _convert_time_cached(t)) is None else v
+            for t in values[rest]
+        ]
+    out[~valid] = np.nan
+    return pd.Series(out, index=values.index)
+
+
+def convert_times_to_seconds(series: pd.Series) -> pd.Series:
+    """
+    Équivalent vectorisé de `series.apply(convert_time_to_seconds)` (NaN au
+    lieu de None) : chaque performance distincte n'est analysée qu'une fois.
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    is_str = uniques.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+
+    seconds = np.full(len(uniques), np.nan)
+    if is_str.any():
+        seconds[is_str] = _parse_unique_marks(uniques[is_str].astype(str)).to_numpy()
+    # codes == -1 : valeurs manquantes
+    values = np.where(codes >= 0, seconds[codes], np.nan)
+    return pd.Series(values, index=series.index, name=series.name, dtype=float)
+
+
+def mark_status(series: pd.Series, seconds: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Statut de chaque performance : "ok" (convertible), code d'invalidité
+    trouvé ("DNF", "DQ", "AB"…), "unparsed" ou "empty" (vide / manquante).
+    `seconds` : résultat de `convert_times_to_seconds` s'il est déjà calculé.
+    """
+    if seconds is None:
+        seconds = convert_times_to_seconds(series)
+    text_ = series.where(series.map(lambda v: isinstance(v, str)), None).astype(object)
+    code = text_.str.extract(f"({_INVALID_PAT})", expand=False)
+    empty = text_.isna() | (text_.str.strip() == "")
+    status = np.select(
+        [seconds.notna().to_numpy(), code.notna().to_numpy(), empty.to_numpy(dtype=bool)],
+        ["ok", code.to_numpy(dtype=object), "empty"],
+        default="unparsed",
+    )
+    return pd.Series(status, index=series.index, dtype=object)
+
+
 # ---------------------------------------------------------------------------
 # Mini‑tests automatiques ----------------------------------------------------
 # ---------------------------------------------------------------------------
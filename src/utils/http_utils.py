@@ -5,10 +5,12 @@ import requests
 import json
 import re
 import unicodedata
+from . import search_cache
 from .file_utils import str_to_hex
+from .rate_limiter import CircuitOpenError, request as limited_request
 
 def get_html(url, headers=None):
-    response = requests.get(url, headers=headers)
+    response = limited_request("GET", url, headers=headers)
     response.raise_for_status()
     return response.text
 
@@ -27,6 +29,54 @@ def search_athletes(search_term: str) -> list[dict]:
         print("Search term must be at least 3 characters long.")
         return []
 
+    try:
+        return search_cache.get_or_fetch("ffa", cleaned_term, lambda: _ffa_autocomplete(cleaned_term))
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
+        print(f"Error making request: {e}")
+        return []
+    except json.JSONDecodeError:
+        print("Error parsing JSON response")
+        return []
+
+
+def _ffa_autocomplete(cleaned_term: str) -> list[dict]:
+    """Autocomplétion FFA sur les termes candidats (lève en cas d'erreur réseau / JSON)."""
+    athletes = []
+    seen_seq = set()
+
+    for candidate in ffa_search_candidates(cleaned_term):
+        response = limited_request(
+            "GET",
+            "https://www.athle.fr/ajax/autocompletion.aspx",
+            params={"mode": 1, "recherche": candidate},
+            timeout=10,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        for item in data:
+            seq = item.get('actseq', '')
+            if seq in seen_seq:
+                continue
+
+            athlete = {
+                'name': item.get('nom', ''),
+                'club': item.get('club', ''),
+                'sex': item.get('sexe', ''),
+                'seq': seq,
+            }
+            athletes.append(athlete)
+            seen_seq.add(seq)
+
+        if athletes:
+            break
+
+    return athletes
+
+
+def ffa_search_candidates(search_term: str) -> list[str]:
+    """Termes essayés sur l'autocomplétion FFA, par ordre de priorité."""
+    cleaned_term = (search_term or "").strip()
     search_candidates = [cleaned_term]
     parts = [part.strip() for part in cleaned_term.split() if part.strip()]
     if len(parts) > 1:
@@ -40,45 +90,7 @@ def search_athletes(search_term: str) -> list[dict]:
         if len(candidate) >= 3 and key not in seen_candidates:
             deduped_candidates.append(candidate)
             seen_candidates.add(key)
-
-    try:
-        athletes = []
-        seen_seq = set()
-
-        for candidate in deduped_candidates:
-            response = requests.get(
-                "https://www.athle.fr/ajax/autocompletion.aspx",
-                params={"mode": 1, "recherche": candidate},
-                timeout=10,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            for item in data:
-                seq = item.get('actseq', '')
-                if seq in seen_seq:
-                    continue
-
-                athlete = {
-                    'name': item.get('nom', ''),
-                    'club': item.get('club', ''),
-                    'sex': item.get('sexe', ''),
-                    'seq': seq,
-                }
-                athletes.append(athlete)
-                seen_seq.add(seq)
-
-            if athletes:
-                break
-
-        return athletes
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error making request: {e}")
-        return []
-    except json.JSONDecodeError:
-        print("Error parsing JSON response")
-        return []
+    return deduped_candidates
 
 
 def _normalize_text(value: str) -> str:
@@ -121,21 +133,24 @@ def _score_athlete_candidate(query: str, athlete_name: str) -> int:
     return score
 
 
-def search_athletes_lepistard(search_term: str, max_results: int = 50) -> list[dict]:
-    """
-    Recherche athlètes via l'endpoint Le Pistard et renvoie un format compatible app.
-    """
-    cleaned_term = (search_term or "").strip()
-    if len(cleaned_term) < 3:
-        return []
+LEPISTARD_ENDPOINT = "https://lepistard.run/wp-admin/admin-ajax.php"
+LEPISTARD_HEADERS = {
+    "accept": "application/json, text/javascript, */*; q=0.01",
+    "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+    "x-requested-with": "XMLHttpRequest",
+    "origin": "https://lepistard.run",
+    "referer": "https://lepistard.run/",
+    "user-agent": "Mozilla/5.0",
+}
+
 
-    tokens = [token for token in cleaned_term.split() if len(token) >= 3]
+def lepistard_search_keys(search_term: str) -> list[str]:
+    """Mots envoyés à Le Pistard, par ordre de priorité (dernier mot puis plus longs)."""
+    tokens = [token for token in (search_term or "").strip().split() if len(token) >= 3]
     if not tokens:
         return []
 
-    candidates = []
     seen = set()
-
     search_keys = [tokens[-1]] + sorted(tokens, key=len, reverse=True)
     deduped_search_keys = []
     for key in search_keys:
@@ -143,22 +158,106 @@ def search_athletes_lepistard(search_term: str, max_results: int = 50) -> list[d
         if norm_key not in seen:
             deduped_search_keys.append(key)
             seen.add(norm_key)
+    return deduped_search_keys
+
+
+def lepistard_items_to_athletes(data) -> list[dict]:
+    """Réponse JSON Le Pistard → athlètes au format app."""
+    if not isinstance(data, list):
+        return []
+
+    candidates = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+
+        seq = (
+            str(item.get("actseq") or "").strip()
+            or _extract_seq_from_ffa_profile(item.get("ffa_profile", ""))
+        )
+        first_name = str(item.get("prenom") or "").strip()
+        last_name = str(item.get("nom") or "").strip()
+        raw_name = str(item.get("name") or item.get("nom_complet") or "").strip()
+        name = raw_name or " ".join(part for part in [first_name, last_name] if part).strip()
+        if not name:
+            name = last_name or first_name
+
+        key_id = seq or _normalize_text(name)
+        if not key_id:
+            continue
+
+        athlete = {
+            "name": name,
+            "club": str(item.get("club") or item.get("ligue") or "").strip(),
+            "sex": str(item.get("sexe") or "").strip(),
+            "seq": seq,
+            "source": "FFA_LEPISTARD",
+            "ffa_profile": item.get("ffa_profile"),
+        }
 
-    endpoint = "https://lepistard.run/wp-admin/admin-ajax.php"
-    headers = {
-        "accept": "application/json, text/javascript, */*; q=0.01",
-        "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-        "x-requested-with": "XMLHttpRequest",
-        "origin": "https://lepistard.run",
-        "referer": "https://lepistard.run/",
-        "user-agent": "Mozilla/5.0",
-    }
-
-    for key in deduped_search_keys:
+        candidates.append(athlete)
+    return candidates
+
+
+def merge_ranked_candidates(search_term: str, *groups: list[dict]) -> list[dict]:
+    """
+    Fusionne plusieurs listes d'athlètes (ordre = priorité en cas de doublon
+    de seq / nom) puis les trie par pertinence vis-à-vis de la recherche.
+    """
+    merged = []
+    seen = set()
+
+    for group in groups:
+        for athlete in group or []:
+            seq = str(athlete.get("seq") or "").strip()
+            if not seq:
+                seq = _extract_seq_from_ffa_profile(athlete.get("ffa_profile", ""))
+                athlete["seq"] = seq
+
+            unique_key = seq or _normalize_text(athlete.get("name", ""))
+            if not unique_key or unique_key in seen:
+                continue
+            seen.add(unique_key)
+            merged.append(athlete)
+
+    return sorted(
+        merged,
+        key=lambda athlete: _score_athlete_candidate(search_term, athlete.get("name", "")),
+        reverse=True,
+    )
+
+
+def search_athletes_lepistard(search_term: str, max_results: int = 50) -> list[dict]:
+    """
+    Recherche athlètes via l'endpoint Le Pistard et renvoie un format compatible app.
+    """
+    cleaned_term = (search_term or "").strip()
+    if len(cleaned_term) < 3:
+        return []
+
+    try:
+        ranked = search_cache.get_or_fetch(
+            "lepistard", cleaned_term, lambda: _lepistard_lookup(cleaned_term)
+        )
+    except (CircuitOpenError, requests.exceptions.RequestException, json.JSONDecodeError):
+        return []
+    return ranked[:max_results]
+
+
+def _lepistard_lookup(cleaned_term: str) -> list[dict]:
+    """
+    Interroge Le Pistard mot par mot jusqu'au premier résultat. Lève la
+    dernière erreur si aucune requête n'a abouti (réponse vide non fiable).
+    """
+    candidates = []
+    last_error = None
+    answered = False
+    for key in lepistard_search_keys(cleaned_term):
         try:
-            response = requests.post(
-                endpoint,
-                headers=headers,
+            response = limited_request(
+                "POST",
+                LEPISTARD_ENDPOINT,
+                headers=LEPISTARD_HEADERS,
                 data={
                     "action": "get_listing_names",
                     "name": key,
@@ -166,49 +265,28 @@ def search_athletes_lepistard(search_term: str, max_results: int = 50) -> list[d
                     "column": "nom",
                 },
                 timeout=4,
+                max_attempts=1,
             )
             response.raise_for_status()
-            data = response.json()
-            if not isinstance(data, list):
-                continue
-
-            for item in data:
-                if not isinstance(item, dict):
-                    continue
-
-                seq = (
-                    str(item.get("actseq") or "").strip()
-                    or _extract_seq_from_ffa_profile(item.get("ffa_profile", ""))
-                )
-                first_name = str(item.get("prenom") or "").strip()
-                last_name = str(item.get("nom") or "").strip()
-                raw_name = str(item.get("name") or item.get("nom_complet") or "").strip()
-                name = raw_name or " ".join(part for part in [first_name, last_name] if part).strip()
-                if not name:
-                    name = last_name or first_name
-
-                key_id = seq or _normalize_text(name)
-                if not key_id:
-                    continue
-
-                athlete = {
-                    "name": name,
-                    "club": str(item.get("club") or item.get("ligue") or "").strip(),
-                    "sex": str(item.get("sexe") or "").strip(),
-                    "seq": seq,
-                    "source": "FFA_LEPISTARD",
-                    "ffa_profile": item.get("ffa_profile"),
-                }
-
-                candidates.append(athlete)
+            candidates.extend(lepistard_items_to_athletes(response.json()))
+            answered = True
 
             if candidates:
                 break
 
-        except (requests.exceptions.RequestException, json.JSONDecodeError):
+        except CircuitOpenError:
+            raise
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            last_error = e
             continue
 
-    # déduplication finale
+    if not answered and last_error is not None:
+        raise last_error
+    return rank_lepistard_candidates(cleaned_term, candidates)
+
+
+def rank_lepistard_candidates(cleaned_term: str, candidates: list[dict]) -> list[dict]:
+    """Déduplique (seq ou nom normalisé) puis trie par pertinence."""
     deduped = []
     seen_keys = set()
     for athlete in candidates:
@@ -218,51 +296,47 @@ def search_athletes_lepistard(search_term: str, max_results: int = 50) -> list[d
         seen_keys.add(unique_key)
         deduped.append(athlete)
 
-    scored = sorted(
+    return sorted(
         deduped,
         key=lambda athlete: _score_athlete_candidate(cleaned_term, athlete.get("name", "")),
         reverse=True,
     )
-    return scored[:max_results]
 
 
-def search_athletes_smart(search_term: str, max_results: int = 50) -> list[dict]:
+def search_athletes_smart(
+    search_term: str,
+    max_results: int = 50,
+    db_search=None,
+    wa_search=None,
+    ffa: bool = True,
+    memory_search=None,
+) -> list[dict]:
     """
     Nouvelle stratégie de recherche:
-    - FFA standard (fonction existante)
-    - enrichissement Le Pistard pour les cas prénom + nom
+    - index en mémoire (`memory_search`) consulté d'abord, sans réseau
+    - FFA standard et enrichissement Le Pistard interrogés en parallèle
+      (+ base locale / World Athletics si `db_search` / `wa_search` sont fournis ;
+      `ffa=False` pour n'interroger que ces dernières)
+    - délai propre à chaque source, arrêt dès que assez de bons candidats
     - tri/ranking par pertinence nom utilisateur
+    Cf. `search_async.search_athletes_stream`.
     """
     cleaned_term = (search_term or "").strip()
     if len(cleaned_term) < 3:
         return []
 
-    base_results = search_athletes(cleaned_term)
-    lp_results = search_athletes_lepistard(cleaned_term, max_results=max_results)
+    # Import local : search_async importe ce module
+    from .search_async import search_athletes_concurrent
 
-    merged = []
-    seen = set()
-
-    for athlete in base_results + lp_results:
-        seq = str(athlete.get("seq") or "").strip()
-        if not seq:
-            seq = _extract_seq_from_ffa_profile(athlete.get("ffa_profile", ""))
-            athlete["seq"] = seq
-
-        unique_key = seq or _normalize_text(athlete.get("name", ""))
-        if not unique_key or unique_key in seen:
-            continue
-        seen.add(unique_key)
-        merged.append(athlete)
-
-    ranked = sorted(
-        merged,
-        key=lambda athlete: _score_athlete_candidate(cleaned_term, athlete.get("name", "")),
-        reverse=True,
+    return search_athletes_concurrent(
+        cleaned_term,
+        max_results=max_results,
+        db_search=db_search,
+        wa_search=wa_search,
+        ffa=ffa,
+        memory_search=memory_search,
     )
 
-    return ranked[:max_results]
-
 def open_athlete_page(base: str = 'base', hactseq: str = 'hactseq', annee: int = 2025, espace: str = None, structure: str = None) -> str:
     """
     Génère l'URL de la page d'un athlète, similaire à bddThrowAthlete en JavaScript.
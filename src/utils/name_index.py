@@ -0,0 +1,259 @@
+"""utils/name_index.py – Index en mémoire des noms d'athlètes
+----------------------------------------------------------
+La table `athletes` ne fait que grossir au fil des scrapings : on la garde
+en mémoire pour répondre à l'autocomplétion avant tout appel réseau.
+
+• tokens normalisés (`http_utils._normalize_text`, découpés aussi sur les
+  tirets / apostrophes) rangés dans un tableau trié → recherche par préfixe
+  en O(log n) avec `np.searchsorted` ;
+• score vectorisé (numpy) identique à `_score_athlete_candidate` ;
+• rafraîchissement incrémental sur `athletes.last_update`, lancé en
+  arrière-plan (`refresh_in_background`) : une recherche n'attend jamais
+  la base, elle lit le dernier instantané complet.
+
+Les candidats sont les athlètes dont un mot commence par un mot de la
+requête ; le score, lui, reprend exactement les règles de sous-chaîne de
+`_score_athlete_candidate`.
+
+    index = AthleteNameIndex()
+    index.refresh(engine)             # chargement complet puis incrémental
+    index.refresh_if_stale(engine)    # idem, dans un thread, si trop ancien
+    index.search("dupont jean", source="FFA")
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from src.utils.http_utils import _normalize_text
+
+_SUBTOKEN_RE = re.compile(r"[-'’.]+")
+# Plus grand caractère Unicode : borne haute d'une plage de préfixe
+_MAX_CHAR = "\U0010ffff"
+
+
+def _name_tokens(name_norm: str) -> set:
+    """Mots du nom normalisé, plus leurs morceaux (« jean-pierre » → jean, pierre)."""
+    tokens = set()
+    for tok in name_norm.split(" "):
+        if tok:
+            tokens.add(tok)
+            tokens.update(part for part in _SUBTOKEN_RE.split(tok) if part)
+    return tokens
+
+
+def score_names(query: str, names_norm: np.ndarray) -> np.ndarray:
+    """
+    Version vectorisée de `_score_athlete_candidate` sur des noms déjà
+    normalisés (tableau numpy de chaînes).
+    """
+    q_norm = _normalize_text(query)
+    tokens = [tok for tok in q_norm.split(" ") if tok]
+    scores = np.zeros(len(names_norm), dtype=np.int32)
+    if not tokens or len(names_norm) == 0:
+        return scores
+
+    nonempty = np.char.str_len(names_norm) > 0
+    scores += 100 * (np.char.find(names_norm, q_norm) >= 0)
+    hits = [np.char.find(names_norm, tok) >= 0 for tok in tokens]
+    token_hits = np.sum(hits, axis=0)
+    scores += 20 * token_hits
+    scores += 60 * (token_hits == len(tokens))
+    if len(tokens) >= 2:
+        scores += 15 * hits[-1]
+    scores += 10 * hits[0]
+    return np.where(nonempty, scores, 0)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """État immuable lu par les recherches (remplacé d'un bloc à chaque rafraîchissement)."""
+    vocab: np.ndarray           # tokens triés
+    offsets: np.ndarray         # postings[offsets[i]:offsets[i+1]] = lignes du token i
+    postings: np.ndarray        # numéros de ligne, concaténés dans l'ordre de vocab
+    names_norm: np.ndarray
+    is_wa: np.ndarray
+    rows: List[dict]
+
+
+class AthleteNameIndex:
+    """Index des noms de la table `athletes`, partagé entre sessions (thread-safe)."""
+
+    def __init__(self, table: str = "athletes"):
+        self.table = table
+        self._lock = threading.Lock()
+        self._rows: List[dict] = []
+        self._row_by_seq: Dict[str, int] = {}
+        self._tokens_by_row: List[set] = []
+        self._names_norm: List[str] = []
+        self._postings: Dict[str, set] = {}
+        self._last_update = None
+        self._last_refresh = 0.0
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+        self._snapshot = _Snapshot(
+            np.array([], dtype=str),
+            np.zeros(1, dtype=np.int64),
+            np.array([], dtype=np.int64),
+            np.array([], dtype=str),
+            np.array([], dtype=bool),
+            [],
+        )
+
+    def __len__(self) -> int:
+        return len(self._snapshot.rows)
+
+    # ------------------------------------------------------------ chargement
+    def refresh(self, engine) -> int:
+        """
+        Charge les athlètes modifiés depuis le dernier rafraîchissement
+        (tous au premier appel). Renvoie le nombre de lignes lues.
+        """
+        with self._lock:
+            query = f"SELECT seq, name, club, sex, last_update FROM {self.table}"
+            params = {}
+            if self._last_update is not None:
+                # >= : les lignes écrites dans la même seconde ne sont pas perdues
+                query += " WHERE last_update >= :since"
+                params["since"] = self._last_update
+            with engine.connect() as conn:
+                fetched = conn.execute(text(query), params).fetchall()
+
+            changed = 0
+            for seq, name, club, sex, last_update in fetched:
+                if self._upsert(str(seq), name, club, sex):
+                    changed += 1
+                if last_update is not None and (self._last_update is None or last_update > self._last_update):
+                    self._last_update = last_update
+            if changed or not self._snapshot.rows:
+                self._rebuild()
+            self._last_refresh = time.monotonic()
+            return len(fetched)
+
+    def refresh_in_background(self, engine) -> bool:
+        """
+        Lance `refresh` dans un thread, sauf s'il y en a déjà un en cours.
+        Renvoie True si un rafraîchissement a été lancé.
+        """
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return False
+            self._refresher = threading.Thread(
+                target=self._refresh_quietly, args=(engine,), name="name-index-refresh", daemon=True
+            )
+            self._refresher.start()
+            return True
+
+    def refresh_if_stale(self, engine, max_age: float = 60.0) -> bool:
+        """`refresh_in_background` si le dernier rafraîchissement date de plus de `max_age` secondes."""
+        if time.monotonic() - self._last_refresh < max_age:
+            return False
+        return self.refresh_in_background(engine)
+
+    def _refresh_quietly(self, engine):
+        try:
+            self.refresh(engine)
+        except Exception as e:
+            # Nouvel essai au prochain refresh_if_stale, pas avant max_age
+            self._last_refresh = time.monotonic()
+            print(f"Rafraîchissement de l'index des noms impossible : {e}")
+
+    def _upsert(self, seq: str, name, club, sex) -> bool:
+        row = {
+            "hactseq": None,
+            "name": str(name or "").strip(),
+            "club": str(club or "").strip(),
+            "sex": str(sex or "").strip(),
+            "seq": seq,
+            "source": "WA" if seq.startswith("WA_") else "FFA",
+        }
+        idx = self._row_by_seq.get(seq)
+        if idx is not None:
+            if self._rows[idx] == row:
+                return False
+            for tok in self._tokens_by_row[idx]:
+                self._postings[tok].discard(idx)
+        else:
+            idx = len(self._rows)
+            self._row_by_seq[seq] = idx
+            self._rows.append(row)
+            self._tokens_by_row.append(set())
+            self._names_norm.append("")
+
+        name_norm = _normalize_text(row["name"])
+        tokens = _name_tokens(name_norm)
+        self._rows[idx] = row
+        self._names_norm[idx] = name_norm
+        self._tokens_by_row[idx] = tokens
+        for tok in tokens:
+            self._postings.setdefault(tok, set()).add(idx)
+        return True
+
+    def _rebuild(self):
+        vocab = sorted(tok for tok, ids in self._postings.items() if ids)
+        sizes = [len(self._postings[tok]) for tok in vocab]
+        postings = np.fromiter(
+            (i for tok in vocab for i in self._postings[tok]), dtype=np.int64, count=sum(sizes)
+        )
+        self._snapshot = _Snapshot(
+            vocab=np.array(vocab, dtype=str),
+            offsets=np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))),
+            postings=postings,
+            names_norm=np.array(self._names_norm, dtype=str),
+            is_wa=np.array([r["source"] == "WA" for r in self._rows], dtype=bool),
+            rows=list(self._rows),
+        )
+
+    # ------------------------------------------------------------ recherche
+    def _candidates(self, snap: _Snapshot, tokens: List[str], enough: int) -> np.ndarray:
+        """
+        Lignes contenant tous les mots de la requête (en préfixe) s'il y en a
+        au moins `enough`, sinon celles qui en contiennent au moins un.
+        """
+        per_token = []
+        for tok in tokens:
+            lo = np.searchsorted(snap.vocab, tok, side="left")
+            hi = np.searchsorted(snap.vocab, tok + _MAX_CHAR, side="left")
+            if hi > lo:
+                # plage de préfixe contiguë dans vocab → une seule tranche de postings
+                per_token.append(np.unique(snap.postings[snap.offsets[lo]:snap.offsets[hi]]))
+        if not per_token:
+            return np.array([], dtype=np.int64)
+        common = per_token[0]
+        for ids in per_token[1:]:
+            common = np.intersect1d(common, ids, assume_unique=True)
+        if len(per_token) == len(tokens) and len(common) >= enough:
+            return common
+        return np.unique(np.concatenate(per_token))
+
+    def search(self, term: str, max_results: int = 20, source: Optional[str] = None) -> List[dict]:
+        """
+        Athlètes dont un mot commence par un mot de `term`, triés comme
+        `merge_ranked_candidates` (score décroissant, puis ordre d'insertion).
+        `source` : "FFA" ou "WA" pour filtrer.
+        """
+        snap = self._snapshot
+        tokens = sorted({
+            part
+            for tok in _normalize_text(term).split(" ") if tok
+            for part in [tok, *_SUBTOKEN_RE.split(tok)] if len(part) >= 2
+        })
+        if not tokens or not snap.rows:
+            return []
+
+        cand = self._candidates(snap, tokens, max_results)
+        if source is not None:
+            cand = cand[snap.is_wa[cand] == (source == "WA")]
+        if not len(cand):
+            return []
+
+        scores = score_names(term, snap.names_norm[cand])
+        # tri stable : à score égal, ordre d'insertion (comme sorted())
+        order = np.argsort(-scores, kind="stable")[:max_results]
+        return [dict(snap.rows[i]) for i in cand[order]]
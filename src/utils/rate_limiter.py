@@ -0,0 +1,338 @@
+"""utils/rate_limiter.py – Limiteur de débit adaptatif par hôte + disjoncteur
+---------------------------------------------------------------------------
+Un `HostLimiter` par hôte (athle.fr, lepistard.run, API World Athletics),
+partagé par tous les scrapers du process, qu'ils soient synchrones
+(`requests`) ou asynchrones (`httpx`).
+
+• Seau à jetons  : débit moyen `rate` req/s, rafales jusqu'à `burst`.
+• Fenêtre AIMD   : nombre de requêtes en vol borné par une limite qui
+  augmente de 1/limite à chaque succès et est divisée par deux sur un
+  429/503 ou une latence au-delà de `latency_target`.
+• Disjoncteur    : après `failure_threshold` échecs consécutifs (erreurs
+  réseau, 5xx) l'hôte est considéré tombé ; les appels échouent aussitôt
+  avec `CircuitOpenError` pendant `reset_timeout` s, puis une requête
+  d'essai décide de la réouverture.
+• Retry-After    : pause imposée par le serveur sur 429/503, plafonnée à
+  `max_retry_after` s (un en-tête aberrant ne bloque pas un worker).
+
+Les compteurs par hôte sont disponibles via `limiter_stats()`.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Statuts qui déclenchent une nouvelle tentative
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Statuts qui signalent une surcharge côté serveur (réduction de la fenêtre)
+_OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+class CircuitOpenError(RuntimeError):
+    """Levée quand le disjoncteur d'un hôte est ouvert (hôte considéré indisponible)."""
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    rate: float = 10.0               # jetons ajoutés par seconde
+    burst: int = 20                  # capacité du seau
+    initial_concurrency: int = 8     # fenêtre AIMD de départ
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    latency_target: float = 3.0      # s ; au-delà, la fenêtre est réduite
+    failure_threshold: int = 5       # échecs consécutifs avant ouverture
+    reset_timeout: float = 30.0      # s avant la requête d'essai
+    max_retry_after: float = 60.0    # s ; plafond de la pause Retry-After
+
+
+class HostLimiter:
+    """Seau à jetons + fenêtre de concurrence AIMD + disjoncteur pour un hôte."""
+
+    _POLL_SECONDS = 0.05
+
+    def __init__(self, host: str, policy: HostPolicy, clock: Callable[[], float] = time.monotonic):
+        self.host = host
+        self.policy = policy
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        # seau à jetons
+        self._tokens = float(policy.burst)
+        self._last_refill = now
+        self._paused_until = 0.0
+        # fenêtre AIMD
+        self._limit = float(policy.initial_concurrency)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        # disjoncteur
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # compteurs
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "throttled_seconds": 0.0,
+            "rate_limited": 0,
+            "failures": 0,
+            "breaker_trips": 0,
+            "breaker_rejections": 0,
+        }
+
+    # ------------------------------------------------------------------ acquire
+    def _try_acquire(self) -> float:
+        """Prend un créneau si possible (0.0) sinon renvoie l'attente suggérée."""
+        with self._lock:
+            now = self._clock()
+
+            if self._state == "open":
+                if now - self._opened_at < self.policy.reset_timeout:
+                    self._stats["breaker_rejections"] += 1
+                    raise CircuitOpenError(f"Disjoncteur ouvert pour {self.host}")
+                self._state = "half_open"
+            if self._state == "half_open" and self._trial_in_flight:
+                self._stats["breaker_rejections"] += 1
+                raise CircuitOpenError(f"Disjoncteur en test pour {self.host}")
+
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= max(1, int(self._limit)):
+                return self._POLL_SECONDS
+
+            elapsed = now - self._last_refill
+            self._tokens = min(float(self.policy.burst), self._tokens + elapsed * self.policy.rate)
+            self._last_refill = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.policy.rate
+
+            self._tokens -= 1.0
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            if self._state == "half_open":
+                self._trial_in_flight = True
+            return 0.0
+
+    def _record_wait(self, waited: float):
+        if waited > 0:
+            with self._lock:
+                self._stats["throttled"] += 1
+                self._stats["throttled_seconds"] += waited
+
+    def acquire(self):
+        """Version bloquante (threads / code synchrone)."""
+        waited = 0.0
+        while True:
+            delay = self._try_acquire()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+            waited += delay
+        self._record_wait(waited)
+
+    async def acquire_async(self):
+        """Version asyncio : n'immobilise pas la boucle d'événements."""
+        waited = 0.0
+        while True:
+            delay = self._try_acquire()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        self._record_wait(waited)
+
+    # ------------------------------------------------------------------ release
+    def release(
+        self,
+        status: Optional[int],
+        latency: float,
+        error: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        """Libère le créneau et ajuste fenêtre / disjoncteur selon l'issue."""
+        with self._lock:
+            now = self._clock()
+            self._in_flight = max(0, self._in_flight - 1)
+            was_trial = self._state == "half_open" and self._trial_in_flight
+            if was_trial:
+                self._trial_in_flight = False
+            if status is None and not error:
+                # requête abandonnée (annulation) : ni succès ni échec
+                return
+
+            # --- disjoncteur
+            failed = error or (status is not None and status >= 500)
+            if failed:
+                self._stats["failures"] += 1
+                self._consecutive_failures += 1
+                if was_trial or self._consecutive_failures >= self.policy.failure_threshold:
+                    if self._state != "open":
+                        self._stats["breaker_trips"] += 1
+                    self._state = "open"
+                    self._opened_at = now
+            else:
+                self._consecutive_failures = 0
+                if was_trial:
+                    self._state = "closed"
+
+            # --- AIMD
+            overloaded = status in _OVERLOAD_STATUSES
+            if overloaded:
+                self._stats["rate_limited"] += 1
+                pause = min(retry_after, self.policy.max_retry_after) if retry_after is not None else 1.0
+                self._paused_until = max(self._paused_until, now + pause)
+                self._tokens = 0.0
+            if overloaded or latency > self.policy.latency_target:
+                # une seule réduction par fenêtre de latence cible
+                if now - self._last_decrease >= self.policy.latency_target:
+                    self._limit = max(float(self.policy.min_concurrency), self._limit / 2)
+                    self._last_decrease = now
+            elif not failed:
+                self._limit = min(float(self.policy.max_concurrency), self._limit + 1.0 / self._limit)
+
+    # ------------------------------------------------------------------ stats
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["throttled_seconds"] = round(out["throttled_seconds"], 3)
+            out["concurrency_limit"] = round(self._limit, 2)
+            out["in_flight"] = self._in_flight
+            out["breaker_state"] = self._state
+            return out
+
+
+###############################################################################
+# Registre par hôte ###########################################################
+###############################################################################
+
+_DEFAULT_POLICY = HostPolicy()
+
+_POLICIES: Dict[str, HostPolicy] = {
+    "www.athle.fr": HostPolicy(rate=8.0, burst=16, initial_concurrency=8, max_concurrency=24),
+    "lepistard.run": HostPolicy(rate=4.0, burst=8, initial_concurrency=4, max_concurrency=8),
+}
+_wa_host = urlparse(os.getenv("WA_API_URL") or "").hostname
+if _wa_host:
+    _POLICIES[_wa_host] = HostPolicy(rate=10.0, burst=10, initial_concurrency=6, max_concurrency=16)
+
+_LIMITERS: Dict[str, HostLimiter] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_limiter(url_or_host: str) -> HostLimiter:
+    """Renvoie le limiteur (unique dans le process) associé à l'hôte de l'URL."""
+    url_or_host = url_or_host or ""
+    host = urlparse(url_or_host).hostname if "//" in url_or_host else url_or_host
+    host = (host or "").lower()
+    with _REGISTRY_LOCK:
+        limiter = _LIMITERS.get(host)
+        if limiter is None:
+            limiter = HostLimiter(host, _POLICIES.get(host, _DEFAULT_POLICY))
+            _LIMITERS[host] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, dict]:
+    """Compteurs par hôte : requêtes, attentes de throttling, 429, déclenchements du disjoncteur…"""
+    with _REGISTRY_LOCK:
+        limiters = list(_LIMITERS.values())
+    return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+
+###############################################################################
+# Envoi de requêtes ###########################################################
+###############################################################################
+
+def _retry_after(headers) -> Optional[float]:
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return 0.4 * attempt
+
+
+def request(
+    method: str,
+    url: str,
+    session: Optional[requests.Session] = None,
+    max_attempts: int = 3,
+    **kwargs,
+) -> requests.Response:
+    """
+    `requests.request` passé par le limiteur de l'hôte.
+    Relance sur erreur réseau / 429 / 5xx ; ne lève pas sur statut HTTP
+    (l'appelant garde son `raise_for_status()`).
+    """
+    limiter = get_limiter(url)
+    sender = session if session is not None else requests
+    for attempt in range(1, max_attempts + 1):
+        limiter.acquire()
+        t0 = time.perf_counter()
+        try:
+            resp = sender.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            limiter.release(None, time.perf_counter() - t0, error=True)
+            if attempt == max_attempts:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        except BaseException:
+            limiter.release(None, time.perf_counter() - t0)
+            raise
+
+        limiter.release(resp.status_code, time.perf_counter() - t0, retry_after=_retry_after(resp.headers))
+        if resp.status_code in RETRY_STATUSES and attempt < max_attempts:
+            if resp.status_code not in _OVERLOAD_STATUSES:
+                time.sleep(_backoff(attempt))
+            continue
+        return resp
+    return resp
+
+
+async def arequest(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    max_attempts: int = 3,
+    **kwargs,
+) -> httpx.Response:
+    """Équivalent asynchrone de `request` pour un client httpx."""
+    limiter = get_limiter(url)
+    for attempt in range(1, max_attempts + 1):
+        await limiter.acquire_async()
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            limiter.release(None, time.perf_counter() - t0, error=True)
+            if attempt == max_attempts:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        except BaseException:
+            # annulation / erreur inattendue : on rend le créneau sans pénaliser l'hôte
+            limiter.release(None, time.perf_counter() - t0)
+            raise
+
+        limiter.release(resp.status_code, time.perf_counter() - t0, retry_after=_retry_after(resp.headers))
+        if resp.status_code in RETRY_STATUSES and attempt < max_attempts:
+            if resp.status_code not in _OVERLOAD_STATUSES:
+                await asyncio.sleep(_backoff(attempt))
+            continue
+        return resp
+    return resp
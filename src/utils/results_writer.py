@@ -0,0 +1,173 @@
+"""utils/results_writer.py – Écritures groupées de l'updater
+---------------------------------------------------------
+`update_athletes` validait chaque athlète séparément : une transaction pour
+ses résultats (`save_results_to_postgres`) puis une autre pour `last_update`
+(`save_athlete_info`). Sur une base hébergée (NeonDB), ce sont surtout les
+allers-retours et les COMMIT qui coûtent.
+
+`ResultsWriter` accumule les résultats nettoyés et les « touches » de
+plusieurs athlètes puis les écrit dans UNE transaction, via le
+`DatabaseHandler` asyncpg de la boucle d'arrière-plan (`write_batch`) :
+
+• COPY de toutes les lignes + `INSERT … ON CONFLICT DO NOTHING RETURNING seq`
+  → nombre de lignes insérées par athlète (perf_seconds / perf_status
+  calculés si la table les possède) ;
+• un seul upsert `athletes` (`unnest`) pour les `last_update`, dans la même
+  transaction : un athlète n'est marqué à jour que si ses résultats ont
+  été écrits ;
+• la couverture WA (`fetch_info`, saisons attendues / récupérées) dans la
+  même transaction : une saison n'est marquée récupérée qu'une fois ses
+  lignes en base, jamais pendant qu'elles attendent dans le tampon.
+
+Vidage dès RESULTS_WRITER_MAX_ROWS lignes (5000) ou RESULTS_WRITER_MAX_SECONDS
+secondes (30) depuis la plus ancienne entrée, et à l'appel de `flush()`.
+Si la transaction groupée échoue, chaque athlète est réécrit seul : une
+ligne invalide ne fait échouer que son athlète.
+
+    writer = ResultsWriter()
+    outcomes = writer.add(ath, df)      # vidages éventuellement déclenchés
+    outcomes += writer.flush()          # [(seq, lignes insérées | None si échec)]
+"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.data_storage.database_handler import run_with_handler
+
+load_dotenv()
+
+MAX_ROWS = int(os.getenv("RESULTS_WRITER_MAX_ROWS", 5000))
+MAX_SECONDS = float(os.getenv("RESULTS_WRITER_MAX_SECONDS", 30))
+
+# (seq, lignes insérées) ; None = écriture en échec
+Outcome = Tuple[str, Optional[int]]
+
+
+class ResultsWriter:
+    """Tampon d'écriture résultats + athlètes partagé par tout un batch."""
+
+    def __init__(
+        self,
+        table: str = "results",
+        athletes_table: str = "athletes",
+        max_rows: int = MAX_ROWS,
+        max_seconds: float = MAX_SECONDS,
+    ):
+        self.table = table
+        self.athletes_table = athletes_table
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._athletes: Dict[str, Dict[str, Any]] = {}
+        self._rows = 0
+        self._since: Optional[float] = None
+        self.stats = {"flushes": 0, "fallbacks": 0, "rows": 0, "inserted": 0}
+
+    def __len__(self) -> int:
+        return len(self._athletes)
+
+    # ------------------------------------------------------------ tampon
+    def add(
+        self,
+        ath: Dict,
+        df: Optional[pd.DataFrame] = None,
+        profile: Optional[Dict] = None,
+        fetch_info: Optional[Dict] = None,
+    ) -> List[Outcome]:
+        """
+        Met en attente les résultats `df` (déjà nettoyés, éventuellement vides)
+        et la mise à jour de `last_update` de l'athlète `ath` (seq, name, club,
+        sex). `profile` : page profil déjà lue (naissance reprise sans
+        re-téléchargement). `fetch_info` : couverture WA de la requête
+        (`df.attrs["wa_fetch"]`), écrite avec les résultats. Renvoie les
+        issues des vidages déclenchés.
+        """
+        seq = str(ath["seq"])
+        profile = profile or {}
+        previous_fetch = self._athletes.get(seq, {}).get("wa_fetch")
+        if previous_fetch and fetch_info:
+            fetch_info = {
+                key: sorted(set(previous_fetch.get(key) or []) | set(fetch_info.get(key) or []))
+                for key in ("expected_years", "fetched_years")
+            }
+        self._athletes[seq] = dict(
+            seq=seq,
+            name=ath.get("name"),
+            club=ath.get("club"),
+            sex=ath.get("sex"),
+            birth_date_raw=profile.get("birth_date_raw"),
+            birth_year=profile.get("birth_year"),
+            last_update=datetime.utcnow(),
+            wa_fetch=fetch_info or previous_fetch,
+        )
+        if df is not None and not df.empty:
+            previous = self._frames.get(seq)
+            self._frames[seq] = df if previous is None else pd.concat([previous, df], ignore_index=True)
+            self._rows += len(df)
+        if self._since is None:
+            self._since = time.monotonic()
+
+        if self._rows >= self.max_rows or time.monotonic() - self._since >= self.max_seconds:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[Outcome]:
+        """Écrit tout le tampon (une transaction, repli athlète par athlète en cas d'échec)."""
+        if not self._athletes:
+            return []
+        frames, athletes = self._frames, self._athletes
+        self._frames, self._athletes, self._rows, self._since = {}, {}, 0, None
+
+        t0 = time.perf_counter()
+        try:
+            inserted = self._write(frames, athletes)
+        except Exception as e:
+            if len(athletes) == 1:
+                print(f"Écriture groupée impossible pour {next(iter(athletes))} : {e}")
+                return [(seq, None) for seq in athletes]
+            print(f"Écriture groupée de {len(athletes)} athlètes impossible ({e}) : reprise une par une")
+            self.stats["fallbacks"] += 1
+            return self._write_one_by_one(frames, athletes)
+
+        rows = sum(len(df) for df in frames.values())
+        self.stats["flushes"] += 1
+        self.stats["rows"] += rows
+        self.stats["inserted"] += sum(inserted.values())
+        print(
+            f"Vidage : {len(athletes)} athlète(s), {rows} ligne(s), "
+            f"{sum(inserted.values())} insérée(s) en {time.perf_counter() - t0:.2f}s"
+        )
+        return [(seq, inserted.get(seq, 0)) for seq in athletes]
+
+    # ------------------------------------------------------------ écriture
+    def _write(self, frames: Dict[str, pd.DataFrame], athletes: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        df = pd.concat(list(frames.values()), ignore_index=True) if frames else None
+        return run_with_handler(
+            lambda db: db.write_batch(df, athletes.values()),
+            results_table=self.table,
+            athletes_table=self.athletes_table,
+        )
+
+    def _write_one_by_one(
+        self, frames: Dict[str, pd.DataFrame], athletes: Dict[str, Dict[str, Any]]
+    ) -> List[Outcome]:
+        outcomes: List[Outcome] = []
+        for seq, athlete in athletes.items():
+            one = {seq: frames[seq]} if seq in frames else {}
+            try:
+                inserted = self._write(one, {seq: athlete}).get(seq, 0)
+            except Exception as e:
+                print(f"Écriture impossible pour {seq} : {e}")
+                outcomes.append((seq, None))
+                continue
+            self.stats["rows"] += len(one.get(seq, ()))
+            self.stats["inserted"] += inserted
+            outcomes.append((seq, inserted))
+        self.stats["flushes"] += 1
+        return outcomes
@@ -1,14 +1,16 @@
+import json
 import requests
 import pandas as pd
 from json.decoder import JSONDecodeError
-import concurrent.futures
 import time
 from datetime import datetime
 from tqdm.auto import tqdm
 import os
 from dotenv import load_dotenv
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from src.utils import search_cache, season_cache
+from src.utils.rate_limiter import CircuitOpenError, request as limited_request
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -22,16 +24,9 @@ _DEFAULT_TIMEOUT = (4, 12)
 
 def _build_session() -> requests.Session:
     session = requests.Session()
-    retry = Retry(
-        total=2,
-        read=2,
-        connect=2,
-        backoff_factor=0.4,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=frozenset(["POST"]),
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retry)
+    # Pas de Retry urllib3 : les relances (réseau, 429, 5xx) sont faites par le
+    # limiteur partagé (rate_limiter) qui doit observer ces réponses pour adapter le débit.
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=0)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
@@ -39,6 +34,15 @@ def _build_session() -> requests.Session:
 
 _WA_SESSION = _build_session()
 
+
+def _has_competitor_data(body: str) -> bool:
+    """Seules les réponses WA contenant effectivement la saison sont mises en cache."""
+    try:
+        data = json.loads(body).get("data") or {}
+    except (ValueError, AttributeError):
+        return False
+    return data.get("getSingleCompetitorResultsDate") is not None
+
 def get_athlete_results_by_name(
     athlete_name,
     start_year=1990,
@@ -117,12 +121,7 @@ def search_athletes_by_name(athlete_name):
         pd.DataFrame: DataFrame contenant les informations de l'athlète
         ou un message d'erreur si la recherche échoue
     """
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "x-amz-user-agent": "aws-amplify/3.0.2",
-        "x-api-key": WA_API_KEY,
-    }
+    headers = api_headers()
     payload = {
         "operationName": "SearchCompetitors",
         "variables": {
@@ -146,10 +145,23 @@ def search_athletes_by_name(athlete_name):
         """
     }
     
+    try:
+        return search_cache.get_or_fetch(
+            "wa", athlete_name, lambda: _search_competitors(payload, headers)
+        )
+    except (CircuitOpenError, JSONDecodeError, requests.exceptions.RequestException):
+        return pd.DataFrame()
+
+
+def _search_competitors(payload: dict, headers: dict) -> pd.DataFrame:
+    """`SearchCompetitors` avec 3 essais ; lève la dernière erreur si aucun n'aboutit."""
     for attempt in range(1, 4):
         try:
-            response = _WA_SESSION.post(
+            response = limited_request(
+                "POST",
                 WA_API_URL,
+                session=_WA_SESSION,
+                max_attempts=1,
                 json=payload,
                 headers=headers,
                 timeout=(8, 25),
@@ -170,45 +182,16 @@ def search_athletes_by_name(athlete_name):
             if attempt < 3:
                 time.sleep(0.4 * attempt)
                 continue
-            return pd.DataFrame()
+            raise
 
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.RequestException:
             if attempt < 3:
                 time.sleep(0.4 * attempt)
                 continue
-            return pd.DataFrame()
+            raise
 
-    return pd.DataFrame()
-
-def fetch_year_data(athlete_id, year):
-    """
-    Fonction auxiliaire pour récupérer les résultats d'une année spécifique.
-    Utilisée par le multithreading.
-    
-    Args:
-        athlete_id (int): ID de l'athlète
-        year (int): Année à récupérer
-        
-    Returns:
-        tuple: (année, données de l'année, années actives)
-    """
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "x-amz-user-agent": "aws-amplify/3.0.2",
-        "x-api-key": WA_API_KEY
-    }
-    
-    payload = {
-        "operationName": "GetSingleCompetitorResultsDate",
-        "variables": {
-            "resultsByYear": year,
-            "resultsByYearOrderBy": "date",
-            "id": athlete_id  
-        },
-        "query": """
-        query GetSingleCompetitorResultsDate($id: Int, $resultsByYearOrderBy: String, $resultsByYear: Int) {
-          getSingleCompetitorResultsDate(id: $id, resultsByYear: $resultsByYear, resultsByYearOrderBy: $resultsByYearOrderBy) {
+# Sélection GraphQL commune à la requête par année et aux requêtes groupées (wa_fast)
+RESULTS_SELECTION = """
             parameters {
               resultsByYear
               resultsByYearOrderBy
@@ -236,39 +219,91 @@ def fetch_year_data(athlete_id, year):
               __typename
             }
             __typename
-          }
+"""
+
+
+def api_headers() -> dict:
+    headers = {
+        "accept": "*/*",
+        "content-type": "application/json",
+        "x-amz-user-agent": "aws-amplify/3.0.2",
+        "x-api-key": WA_API_KEY,
+    }
+    # httpx refuse les valeurs None (requests les ignorait silencieusement)
+    return {k: v for k, v in headers.items() if v is not None}
+
+
+def parse_competitor_data(year, competitor_data):
+    """
+    Transforme un bloc `getSingleCompetitorResultsDate` en
+    (année, DataFrame des résultats ou None, années actives).
+    """
+    # Vérifier si competitor_data est None
+    if competitor_data is None:
+        return year, None, []
+
+    # Récupérer les années actives
+    active_years = competitor_data.get("activeYears") or []
+
+    # Récupérer les résultats
+    results_data = competitor_data.get("resultsByDate", [])
+    if not results_data:
+        return year, None, active_years
+
+    df = pd.json_normalize(results_data)
+    df['year'] = year
+
+    return year, df, active_years
+
+
+def fetch_year_data(athlete_id, year):
+    """
+    Fonction auxiliaire pour récupérer les résultats d'une année spécifique.
+    Utilisée par le multithreading.
+    
+    Args:
+        athlete_id (int): ID de l'athlète
+        year (int): Année à récupérer
+        
+    Returns:
+        tuple: (année, données de l'année, années actives)
+    """
+    payload = {
+        "operationName": "GetSingleCompetitorResultsDate",
+        "variables": {
+            "resultsByYear": year,
+            "resultsByYearOrderBy": "date",
+            "id": athlete_id  
+        },
+        "query": """
+        query GetSingleCompetitorResultsDate($id: Int, $resultsByYearOrderBy: String, $resultsByYear: Int) {
+          getSingleCompetitorResultsDate(id: $id, resultsByYear: $resultsByYear, resultsByYearOrderBy: $resultsByYearOrderBy) {"""
+        + RESULTS_SELECTION
+        + """          }
         }
         """
     }
     
     try:
-        response = _WA_SESSION.post(WA_API_URL, json=payload, headers=headers, timeout=_DEFAULT_TIMEOUT)
-        response.raise_for_status()
-        
-        data = response.json()
+        body = season_cache.fetch_text(
+            "wa",
+            athlete_id,
+            year,
+            "POST",
+            WA_API_URL,
+            session=_WA_SESSION,
+            should_cache=_has_competitor_data,
+            json=payload,
+            headers=api_headers(),
+            timeout=_DEFAULT_TIMEOUT,
+        )
+        data = json.loads(body)
         
         # Vérifier la présence des clés nécessaires
         if "data" not in data or data["data"] is None:
             return year, None, []
-            
-        competitor_data = data["data"]["getSingleCompetitorResultsDate"]
-        
-        # Vérifier si competitor_data est None
-        if competitor_data is None:
-            return year, None, []
-        
-        # Récupérer les années actives
-        active_years = competitor_data.get("activeYears", [])
-        
-        # Récupérer les résultats
-        results_data = competitor_data.get("resultsByDate", [])
-        if not results_data:
-            return year, None, active_years
-            
-        df = pd.json_normalize(results_data)
-        df['year'] = year
-        
-        return year, df, active_years
+
+        return parse_competitor_data(year, data["data"]["getSingleCompetitorResultsDate"])
         
     except Exception as e:
         return year, None, []
@@ -283,14 +318,15 @@ def get_athlete_competition_results(
 ):
     """
     Récupère tous les résultats de compétition d'un athlète par son ID.
-    Version optimisée avec support du multithreading.
+    Version optimisée : saisons groupées par requête GraphQL (client asynchrone, cf. wa_fast).
     
     Args:
         athlete_id (int): ID de l'athlète
         start_year (int, optional): Année de début pour la recherche de résultats. Par défaut 1990.
         end_year (int, optional): Année de fin pour la recherche de résultats. Par défaut année courante.
-        use_threading (bool, optional): Utiliser le multithreading pour accélérer les requêtes
-        max_workers (int, optional): Nombre maximum de workers pour le multithreading
+        use_threading (bool, optional): Utiliser le client asynchrone à requêtes groupées (wa_fast)
+            plutôt que la récupération séquentielle saison par saison
+        max_workers (int, optional): Conservé pour compatibilité (ignoré)
         
     Returns:
         pd.DataFrame: DataFrame contenant tous les résultats de l'athlète
@@ -303,6 +339,17 @@ def get_athlete_competition_results(
     if start_year > end_year:
         start_year = end_year
 
+    if use_threading:
+        # Chemin rapide : client httpx asynchrone, saisons groupées par POST
+        # GraphQL (alias) au lieu d'un thread et d'un POST par saison.
+        # Import local : wa_fast importe ce module.
+        from src.utils.wa_fast import get_competition_results_fast
+        try:
+            return get_competition_results_fast(athlete_id, start_year, end_year, max_total_seconds)
+        except CircuitOpenError:
+            print("API World Athletics indisponible (disjoncteur ouvert).")
+            return pd.DataFrame()
+
     all_years = list(range(start_year, end_year + 1))
     df_list = []
     all_active_years = set()
@@ -311,70 +358,39 @@ def get_athlete_competition_results(
     # ÉTAPE 1 : Récupérer seulement les années actives d'abord
     first_year = end_year
     print(f"Recherche des années actives pour l'athlète ID: {athlete_id}...")
-    _, _, active_years = fetch_year_data(athlete_id, first_year)
+    _, probe_df, active_years = fetch_year_data(athlete_id, first_year)
+    # Les résultats de la requête d'amorce sont conservés : l'année n'est pas redemandée
+    if probe_df is not None:
+        df_list.append(probe_df)
     
     # Si nous avons des années actives, ne récupérer que ces années
     if active_years:
         all_active_years.update(active_years)
         filtered_years = sorted(
             y for y in set(active_years)
-            if start_year <= int(y) <= end_year
+            if start_year <= int(y) <= end_year and int(y) != first_year
         )
         print(f"Années actives trouvées: {sorted(active_years)}")
         print(f"Récupération des données pour {len(filtered_years)} années au lieu de {len(all_years)}")
     else:
         # Si pas d'années actives, continuer avec toutes les années
-        filtered_years = all_years
+        filtered_years = [y for y in all_years if y != first_year]
         print("Aucune information sur les années actives. Récupération de toutes les années.")
     
-    # ÉTAPE 2 : Récupérer les données pour les années filtrées
-    if use_threading and len(filtered_years) > 1:
-        workers = min(max_workers, len(filtered_years))
-        print(f"Utilisation du multithreading avec {workers} workers...")
-        # Utiliser ThreadPoolExecutor pour le multithreading
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            # Soumettre toutes les tâches et créer un dict pour suivre les résultats
-            future_to_year = {
-                executor.submit(fetch_year_data, athlete_id, year): year 
-                for year in filtered_years
-            }
-            
-            # Utiliser tqdm pour afficher une barre de progression
-            for future in tqdm(concurrent.futures.as_completed(future_to_year), total=len(filtered_years), desc="Récupération des données"):
-                elapsed = time.perf_counter() - start_exec_time
-                if elapsed > max_total_seconds:
-                    print(f"Arrêt anticipé WA après {elapsed:.1f}s pour préserver l'expérience utilisateur.")
-                    for pending in future_to_year:
-                        if not pending.done():
-                            pending.cancel()
-                    break
-                year = future_to_year[future]
-                try:
-                    year, df, active_years = future.result()
-                    if df is not None:
-                        print(f"✓ Données récupérées pour l'année {year} ({len(df)} résultats)")
-                        df_list.append(df)
-                    
-                    if active_years:
-                        all_active_years.update(active_years)
-                        
-                except Exception as e:
-                    print(f"✗ Erreur pour l'année {year}: {str(e)}")
-    else:
-        # Version séquentielle pour les cas simples
-        for year in tqdm(filtered_years, desc="Récupération des données"):
-            elapsed = time.perf_counter() - start_exec_time
-            if elapsed > max_total_seconds:
-                print(f"Arrêt anticipé WA après {elapsed:.1f}s pour préserver l'expérience utilisateur.")
-                break
-            year, df, active_years = fetch_year_data(athlete_id, year)
-            if df is not None:
-                print(f"✓ Données récupérées pour l'année {year} ({len(df)} résultats)")
-                df_list.append(df)
+    # ÉTAPE 2 : Récupérer les données pour les années filtrées (séquentiel)
+    for year in tqdm(filtered_years, desc="Récupération des données"):
+        elapsed = time.perf_counter() - start_exec_time
+        if elapsed > max_total_seconds:
+            print(f"Arrêt anticipé WA après {elapsed:.1f}s pour préserver l'expérience utilisateur.")
+            break
+        year, df, active_years = fetch_year_data(athlete_id, year)
+        if df is not None:
+            print(f"✓ Données récupérées pour l'année {year} ({len(df)} résultats)")
+            df_list.append(df)
+        
+        if active_years:
+            all_active_years.update(active_years)
             
-            if active_years:
-                all_active_years.update(active_years)
-                
     # ÉTAPE 3 : Consolidation des résultats    
     if df_list:
         final_df = pd.concat(df_list, ignore_index=True)
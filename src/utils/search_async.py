@@ -0,0 +1,264 @@
+"""utils/search_async.py – Recherche d'athlètes multi-sources en parallèle
+-----------------------------------------------------------------------
+`search_athletes_smart` interrogeait l'autocomplétion FFA puis Le Pistard
+l'une après l'autre, chacune bouclant sur plusieurs termes candidats avec
+des appels `requests` bloquants : un échec pouvait enchaîner 6+ allers-
+retours avant le moindre résultat.
+
+Ici chaque source tourne dans sa propre tâche asyncio (boucle
+d'arrière-plan d'`async_runner`, client httpx partagé) :
+
+• FFA / Le Pistard : tous les termes candidats partent en même temps ; le
+  premier, dans l'ordre de priorité, qui renvoie des athlètes l'emporte.
+• base locale / World Athletics (optionnels) : fonctions synchrones
+  exécutées dans un thread.
+• index en mémoire (`memory_search`, optionnel) : consulté avant tout
+  appel réseau ; s'il fournit déjà assez de candidats forts, aucune autre
+  source n'est interrogée.
+
+Chaque source a son propre délai (`SOURCE_DEADLINES`). Les résultats sont
+fusionnés et classés (`_score_athlete_candidate`) au fil de l'eau ; la
+recherche se termine dès que `min_strong` candidats couvrent tous les
+mots de la requête, ou quand toutes les sources ont répondu ou expiré.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from src.utils import async_runner, search_cache
+from src.utils.ffa_fast import shared_client
+from src.utils.http_utils import (
+    LEPISTARD_ENDPOINT,
+    LEPISTARD_HEADERS,
+    _normalize_text,
+    _score_athlete_candidate,
+    ffa_search_candidates,
+    lepistard_items_to_athletes,
+    lepistard_search_keys,
+    merge_ranked_candidates,
+    rank_lepistard_candidates,
+)
+from src.utils.rate_limiter import CircuitOpenError, arequest
+
+# Délai maximal (s) accordé à chaque source
+SOURCE_DEADLINES: Dict[str, float] = {"ffa": 5.0, "lepistard": 4.0, "db": 2.0, "wa": 8.0}
+# Ordre de priorité à score égal (et pour la déduplication par seq)
+SOURCE_PRIORITY = ("ffa", "lepistard", "wa", "db", "memory")
+
+SyncSearch = Callable[[str], List[dict]]
+
+
+def _strong_threshold(term: str) -> int:
+    """Score minimal d'un candidat contenant tous les mots de la requête."""
+    tokens = [tok for tok in _normalize_text(term).split(" ") if tok]
+    return 20 * len(tokens) + 60
+
+
+async def _first_hit_in_order(coros: Sequence[Awaitable[List[dict]]]) -> List[dict]:
+    """
+    Lance toutes les requêtes en parallèle et renvoie le premier résultat
+    non vide dans l'ordre de priorité (les requêtes restantes sont annulées).
+    `[]` n'est renvoyé que si toutes les requêtes ont répondu ; si l'une
+    d'elles a échoué, la dernière erreur est levée : une réponse vide n'est
+    ainsi jamais confondue avec une panne (cache négatif).
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    last_error: Optional[BaseException] = None
+    try:
+        for task in tasks:
+            try:
+                found = await task
+            except CircuitOpenError:
+                raise
+            except (httpx.HTTPError, ValueError) as e:
+                last_error = e
+                continue
+            if found:
+                return found
+        if last_error is not None:
+            raise last_error
+        return []
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _ffa_query(client: httpx.AsyncClient, candidate: str) -> List[dict]:
+    resp = await arequest(
+        client,
+        "GET",
+        "https://www.athle.fr/ajax/autocompletion.aspx",
+        params={"mode": 1, "recherche": candidate},
+        timeout=10,
+        max_attempts=1,
+    )
+    resp.raise_for_status()
+    athletes, seen = [], set()
+    for item in resp.json():
+        seq = item.get('actseq', '')
+        if seq in seen:
+            continue
+        seen.add(seq)
+        athletes.append({
+            'name': item.get('nom', ''),
+            'club': item.get('club', ''),
+            'sex': item.get('sexe', ''),
+            'seq': seq,
+        })
+    return athletes
+
+
+async def search_ffa_async(client: httpx.AsyncClient, term: str) -> List[dict]:
+    """Équivalent asynchrone de `http_utils.search_athletes` (termes candidats en parallèle)."""
+    return await search_cache.aget_or_fetch(
+        "ffa",
+        term,
+        lambda: _first_hit_in_order([_ffa_query(client, c) for c in ffa_search_candidates(term)]),
+    )
+
+
+async def _lepistard_query(client: httpx.AsyncClient, key: str) -> List[dict]:
+    resp = await arequest(
+        client,
+        "POST",
+        LEPISTARD_ENDPOINT,
+        headers=LEPISTARD_HEADERS,
+        data={"action": "get_listing_names", "name": key, "table": "athlete", "column": "nom"},
+        timeout=4,
+        max_attempts=1,
+    )
+    resp.raise_for_status()
+    return lepistard_items_to_athletes(resp.json())
+
+
+async def search_lepistard_async(client: httpx.AsyncClient, term: str) -> List[dict]:
+    """Équivalent asynchrone de `http_utils.search_athletes_lepistard` (non tronqué)."""
+
+    async def _lookup() -> List[dict]:
+        found = await _first_hit_in_order([_lepistard_query(client, k) for k in lepistard_search_keys(term)])
+        return rank_lepistard_candidates(term, found)
+
+    return await search_cache.aget_or_fetch("lepistard", term, _lookup)
+
+
+async def search_athletes_stream(
+    term: str,
+    max_results: int = 50,
+    db_search: Optional[SyncSearch] = None,
+    wa_search: Optional[SyncSearch] = None,
+    min_strong: int = 3,
+    deadlines: Optional[Dict[str, float]] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    ffa: bool = True,
+    memory_search: Optional[SyncSearch] = None,
+) -> AsyncIterator[List[dict]]:
+    """
+    Interroge FFA + Le Pistard (sauf `ffa=False`) et, si fournis, la base
+    locale (`db_search`) et World Athletics (`wa_search`) en parallèle.
+    Produit la liste fusionnée et classée à chaque nouvelle source
+    terminée ; s'arrête dès que `min_strong` candidats forts sont présents.
+    `memory_search` (index en mémoire, appel direct) passe avant le réseau.
+    """
+    cleaned_term = (term or "").strip()
+    if len(cleaned_term) < 3:
+        return
+
+    threshold = _strong_threshold(cleaned_term)
+    by_source: Dict[str, List[dict]] = {}
+
+    def _merged() -> List[dict]:
+        return merge_ranked_candidates(
+            cleaned_term, *(by_source.get(s, []) for s in SOURCE_PRIORITY)
+        )[:max_results]
+
+    def _enough(ranked: List[dict]) -> bool:
+        strong = sum(
+            1 for a in ranked if _score_athlete_candidate(cleaned_term, a.get("name", "")) >= threshold
+        )
+        return strong >= min_strong
+
+    if memory_search is not None:
+        try:
+            by_source["memory"] = memory_search(cleaned_term) or []
+        except Exception as e:
+            print(f"Recherche memory en échec : {e}")
+        if by_source.get("memory"):
+            ranked = _merged()
+            yield ranked
+            if _enough(ranked):
+                return
+
+    limits = {**SOURCE_DEADLINES, **(deadlines or {})}
+
+    # Fabriques : aucune coroutine n'est créée pour une source annulée avant son démarrage
+    sources: Dict[str, Callable[[], Awaitable[List[dict]]]] = {}
+    if ffa:
+        client = client or shared_client()
+        sources["ffa"] = lambda: search_ffa_async(client, cleaned_term)
+        sources["lepistard"] = lambda: search_lepistard_async(client, cleaned_term)
+    if db_search is not None:
+        sources["db"] = lambda: asyncio.to_thread(db_search, cleaned_term)
+    if wa_search is not None:
+        sources["wa"] = lambda: asyncio.to_thread(wa_search, cleaned_term)
+    if not sources:
+        return
+
+    async def _bounded(name: str, factory: Callable[[], Awaitable[List[dict]]]):
+        try:
+            found = await asyncio.wait_for(factory(), limits.get(name))
+        except asyncio.TimeoutError:
+            print(f"Recherche {name} : délai de {limits.get(name)}s dépassé")
+            found = []
+        except Exception as e:
+            print(f"Recherche {name} en échec : {e}")
+            found = []
+        return name, found or []
+
+    tasks = [asyncio.create_task(_bounded(name, factory)) for name, factory in sources.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            name, found = await next_done
+            by_source[name] = found
+            ranked = _merged()
+            yield ranked
+            if _enough(ranked):
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def search_athletes_async(term: str, max_results: int = 50, **kwargs) -> List[dict]:
+    """Dernier classement produit par `search_athletes_stream` (liste vide si rien)."""
+    ranked: List[dict] = []
+    async for ranked in search_athletes_stream(term, max_results=max_results, **kwargs):
+        pass
+    return ranked
+
+
+def search_athletes_concurrent(
+    term: str,
+    max_results: int = 50,
+    db_search: Optional[SyncSearch] = None,
+    wa_search: Optional[SyncSearch] = None,
+    min_strong: int = 3,
+    ffa: bool = True,
+    memory_search: Optional[SyncSearch] = None,
+) -> List[dict]:
+    """Version synchrone (boucle d'arrière-plan d'`async_runner`)."""
+    return async_runner.run(
+        search_athletes_async(
+            term,
+            max_results=max_results,
+            db_search=db_search,
+            wa_search=wa_search,
+            min_strong=min_strong,
+            ffa=ffa,
+            memory_search=memory_search,
+        )
+    )
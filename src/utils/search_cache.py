@@ -0,0 +1,135 @@
+"""utils/search_cache.py – Cache partagé des recherches d'athlètes externes
+------------------------------------------------------------------------
+Chaque session Streamlit (et chaque rerun) qui cherche le même nom
+réinterrogeait l'autocomplétion athle.fr, Le Pistard et `SearchCompetitors`
+de World Athletics. Les réponses sont gardées ici, en mémoire du process
+(donc partagées entre sessions), dans un LRU borné avec expiration :
+
+• clé      : (source, terme normalisé via `_normalize_text`) ;
+• TTL      : SEARCH_CACHE_TTL (30 min) pour une réponse non vide,
+             SEARCH_CACHE_NEGATIVE_TTL (5 min) pour une réponse vide ;
+• taille   : SEARCH_CACHE_MAX entrées (512), la moins récemment lue sort.
+
+Seules les réponses obtenues sans erreur sont mises en cache : la fonction
+de récupération doit lever une exception en cas d'échec (réseau, JSON,
+circuit ouvert) pour ne pas enregistrer un faux « aucun résultat ».
+Désactivation : SEARCH_CACHE=0.
+
+    athletes = get_or_fetch("ffa", term, lambda: _ffa_autocomplete(term))
+    athletes = await aget_or_fetch("ffa", term, lambda: search_ffa(term))
+"""
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("SEARCH_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX", 512))
+POSITIVE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 30 * 60))
+NEGATIVE_TTL = float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", 5 * 60))
+
+T = TypeVar("T")
+_MISSING = object()
+
+_lock = threading.Lock()
+# (source, terme normalisé) → (expiration, valeur) ; ordre = du moins au plus récemment lu
+_entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+
+def _key(source: str, term: str) -> Tuple[str, str]:
+    # Import local : http_utils importe ce module
+    from src.utils.http_utils import _normalize_text
+
+    return source, _normalize_text(term)
+
+
+def _is_empty(value) -> bool:
+    try:
+        return len(value) == 0
+    except TypeError:
+        return value is None
+
+
+def get(source: str, term: str, default=_MISSING):
+    """
+    Valeur en cache (copie) si présente et non expirée, sinon `default`
+    (sentinelle interne par défaut : tester avec `is_miss`).
+    """
+    if not CACHE_ENABLED:
+        return default
+    key = _key(source, term)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                del _entries[key]
+            _stats["misses"] += 1
+            return default
+        _entries.move_to_end(key)
+        _stats["negative_hits" if _is_empty(entry[1]) else "hits"] += 1
+        value = entry[1]
+    # copie : les appelants modifient parfois les dicts renvoyés
+    return copy.deepcopy(value)
+
+
+def is_miss(value) -> bool:
+    return value is _MISSING
+
+
+def put(source: str, term: str, value):
+    """Enregistre `value` (TTL court si la réponse est vide)."""
+    if not CACHE_ENABLED:
+        return
+    ttl = NEGATIVE_TTL if _is_empty(value) else POSITIVE_TTL
+    key = _key(source, term)
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+        _entries.move_to_end(key)
+        _stats["stored"] += 1
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evicted"] += 1
+
+
+def get_or_fetch(source: str, term: str, fetch: Callable[[], T]) -> T:
+    """Renvoie la valeur en cache ou appelle `fetch()` (une exception n'est pas mise en cache)."""
+    cached = get(source, term)
+    if not is_miss(cached):
+        return cached
+    value = fetch()
+    put(source, term, value)
+    return value
+
+
+async def aget_or_fetch(source: str, term: str, fetch: Callable[[], Awaitable[T]]) -> T:
+    """Équivalent asynchrone de `get_or_fetch`."""
+    cached = get(source, term)
+    if not is_miss(cached):
+        return cached
+    value = await fetch()
+    put(source, term, value)
+    return value
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _lock:
+        out = dict(_stats)
+        out["entries"] = len(_entries)
+    lookups = out["hits"] + out["negative_hits"] + out["misses"]
+    out["hit_ratio"] = round((out["hits"] + out["negative_hits"]) / lookups, 3) if lookups else 0.0
+    return out
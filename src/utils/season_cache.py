@@ -0,0 +1,297 @@
+"""utils/season_cache.py – Cache disque des réponses « saison » FFA / WA
+---------------------------------------------------------------------
+Les résultats d'une saison terminée ne changent presque plus : la réponse
+HTTP brute de chaque (source, athlète, année) est conservée dans un fichier
+SQLite partagé par les scrapers synchrones et asynchrones.
+
+• saison en cours           → TTL court  (SEASON_CACHE_CURRENT_TTL, 6 h)
+• saison précédente         → TTL moyen  (SEASON_CACHE_RECENT_TTL, 1 j) :
+  le mode incrémental de l'updater la relit toute l'année
+• saisons closes            → TTL long   (SEASON_CACHE_CLOSED_TTL, 30 j)
+
+Une entrée expirée est revalidée par requête conditionnelle
+(If-None-Match / If-Modified-Since) quand le serveur a fourni un ETag ou
+un Last-Modified ; un 304 prolonge simplement l'entrée.
+
+Taille bornée : au démarrage puis toutes les SEASON_CACHE_PRUNE_EVERY
+écritures (500), les entrées expirées depuis plus de SEASON_CACHE_MAX_STALE
+(90 j, plus utiles pour la revalidation) sont supprimées, puis les plus
+anciennement téléchargées au-delà de SEASON_CACHE_MAX_ENTRIES (50 000).
+
+`requests-cache` ne s'applique qu'aux sessions `requests` : le scraper FFA
+utilisant httpx, le stockage est mutualisé ici pour les deux clients.
+Désactivation : SEASON_CACHE=0.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+from src.utils.rate_limiter import arequest, request as limited_request
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("SEASON_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("SEASON_CACHE_PATH", os.path.join(".cache", "season_cache.sqlite"))
+CURRENT_SEASON_TTL = float(os.getenv("SEASON_CACHE_CURRENT_TTL", 6 * 3600))
+RECENT_SEASON_TTL = float(os.getenv("SEASON_CACHE_RECENT_TTL", 24 * 3600))
+CLOSED_SEASON_TTL = float(os.getenv("SEASON_CACHE_CLOSED_TTL", 30 * 24 * 3600))
+MAX_ENTRIES = int(os.getenv("SEASON_CACHE_MAX_ENTRIES", 50_000))
+MAX_STALE = float(os.getenv("SEASON_CACHE_MAX_STALE", 90 * 24 * 3600))
+PRUNE_EVERY = int(os.getenv("SEASON_CACHE_PRUNE_EVERY", 500))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS season_responses (
+    source        TEXT NOT NULL,
+    athlete       TEXT NOT NULL,
+    year          TEXT NOT NULL,
+    body          TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    fetched_at    REAL NOT NULL,
+    expires_at    REAL NOT NULL,
+    PRIMARY KEY (source, athlete, year)
+)
+"""
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "pruned": 0}
+# Écritures restant avant le prochain élagage (0 : élagage à la première connexion)
+_prune_lock = threading.Lock()
+_writes_before_prune = 0
+
+
+@dataclass
+class CachedResponse:
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    expires_at: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) < self.expires_at
+
+
+def season_ttl(year, now: Optional[datetime] = None) -> float:
+    """Durée de vie (s) d'une réponse selon que la saison est close ou non."""
+    now = now or datetime.now()
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return CURRENT_SEASON_TTL
+    if year >= now.year:
+        return CURRENT_SEASON_TTL
+    if year == now.year - 1:
+        # relue à chaque passage incrémental ; corrections encore possibles
+        return RECENT_SEASON_TTL
+    return CLOSED_SEASON_TTL
+
+
+def _connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        Path(CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        _local.conn = conn
+        _maybe_prune(conn, writes=0)
+    return conn
+
+
+def prune(conn: Optional[sqlite3.Connection] = None, now: Optional[float] = None) -> int:
+    """
+    Supprime les entrées expirées depuis plus de MAX_STALE puis, au-delà de
+    MAX_ENTRIES, les plus anciennement téléchargées. Renvoie le nombre
+    d'entrées supprimées.
+    """
+    conn = conn or _connection()
+    now = now if now is not None else time.time()
+    with conn:
+        removed = conn.execute(
+            "DELETE FROM season_responses WHERE expires_at < ?", (now - MAX_STALE,)
+        ).rowcount
+        removed += conn.execute(
+            "DELETE FROM season_responses WHERE rowid IN ("
+            "  SELECT rowid FROM season_responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (MAX_ENTRIES,),
+        ).rowcount
+    with _stats_lock:
+        _stats["pruned"] += removed
+    return removed
+
+
+def _maybe_prune(conn: sqlite3.Connection, writes: int = 1):
+    global _writes_before_prune
+    with _prune_lock:
+        _writes_before_prune -= writes
+        if _writes_before_prune > 0:
+            return
+        _writes_before_prune = PRUNE_EVERY
+    prune(conn)
+
+
+def _bump(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get(source: str, athlete, year) -> Optional[CachedResponse]:
+    if not CACHE_ENABLED:
+        return None
+    row = _connection().execute(
+        "SELECT body, etag, last_modified, fetched_at, expires_at FROM season_responses "
+        "WHERE source = ? AND athlete = ? AND year = ?",
+        (source, str(athlete), str(year)),
+    ).fetchone()
+    return CachedResponse(*row) if row else None
+
+
+def lookup(source: str, athlete, year) -> Optional[str]:
+    """Corps en cache s'il est encore frais (compté comme hit), sinon None (miss)."""
+    entry = get(source, athlete, year)
+    if entry is not None and entry.is_fresh():
+        _bump("hits")
+        return entry.body
+    _bump("misses")
+    return None
+
+
+def put(source: str, athlete, year, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+    if not CACHE_ENABLED:
+        return
+    now = time.time()
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO season_responses "
+            "(source, athlete, year, body, etag, last_modified, fetched_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (source, str(athlete), str(year), body, etag, last_modified, now, now + season_ttl(year)),
+        )
+    _bump("stored")
+    _maybe_prune(conn)
+
+
+def touch(source: str, athlete, year):
+    """Prolonge une entrée revalidée (réponse 304)."""
+    if not CACHE_ENABLED:
+        return
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE season_responses SET expires_at = ? WHERE source = ? AND athlete = ? AND year = ?",
+            (time.time() + season_ttl(year), source, str(athlete), str(year)),
+        )
+
+
+def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+    if entry is None:
+        return {}
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats)
+    lookups = out["hits"] + out["misses"] + out["revalidated"]
+    out["hit_ratio"] = round((out["hits"] + out["revalidated"]) / lookups, 3) if lookups else 0.0
+    return out
+
+
+###############################################################################
+# Récupération avec cache #####################################################
+###############################################################################
+
+def _merge_headers(kwargs: dict, extra: Dict[str, str]) -> dict:
+    if extra:
+        kwargs = dict(kwargs)
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **extra}
+    return kwargs
+
+
+def fetch_text(
+    source: str,
+    athlete,
+    year,
+    method: str,
+    url: str,
+    session: Optional[requests.Session] = None,
+    should_cache: Optional[Callable[[str], bool]] = None,
+    **kwargs,
+) -> str:
+    """
+    Corps de la réponse pour (source, athlète, année), depuis le cache si
+    l'entrée est fraîche, sinon via le réseau (limiteur partagé).
+    Lève `requests.HTTPError` sur statut d'erreur, comme `raise_for_status`.
+    """
+    entry = get(source, athlete, year)
+    if entry is not None and entry.is_fresh():
+        _bump("hits")
+        return entry.body
+
+    resp = limited_request(method, url, session=session, **_merge_headers(kwargs, conditional_headers(entry)))
+    if resp.status_code == 304 and entry is not None:
+        touch(source, athlete, year)
+        _bump("revalidated")
+        return entry.body
+
+    _bump("misses")
+    resp.raise_for_status()
+    if should_cache is None or should_cache(resp.text):
+        put(source, athlete, year, resp.text, resp.headers.get("etag"), resp.headers.get("last-modified"))
+    return resp.text
+
+
+async def afetch_text(
+    client: httpx.AsyncClient,
+    source: str,
+    athlete,
+    year,
+    method: str,
+    url: str,
+    should_cache: Optional[Callable[[str], bool]] = None,
+    **kwargs,
+) -> str:
+    """
+    Équivalent asynchrone de `fetch_text` (client httpx). Les accès SQLite
+    (bloquants) passent par `asyncio.to_thread` pour ne pas geler la boucle.
+    """
+    entry = await asyncio.to_thread(get, source, athlete, year)
+    if entry is not None and entry.is_fresh():
+        _bump("hits")
+        return entry.body
+
+    resp = await arequest(client, method, url, **_merge_headers(kwargs, conditional_headers(entry)))
+    if resp.status_code == 304 and entry is not None:
+        await asyncio.to_thread(touch, source, athlete, year)
+        _bump("revalidated")
+        return entry.body
+
+    _bump("misses")
+    resp.raise_for_status()
+    if should_cache is None or should_cache(resp.text):
+        await asyncio.to_thread(
+            put, source, athlete, year, resp.text, resp.headers.get("etag"), resp.headers.get("last-modified")
+        )
+    return resp.text
@@ -0,0 +1,413 @@
+"""utils/wa_fast.py – Client World Athletics asynchrone (httpx) à requêtes groupées
+-----------------------------------------------------------------------------
+`scraping_wa.fetch_year_data` envoie un POST GraphQL par saison. Ici
+plusieurs requêtes `getSingleCompetitorResultsDate` sont regroupées dans un
+seul document grâce aux alias GraphQL :
+
+    query GetSingleCompetitorResultsDates($id: Int, $orderBy: String, $y2019: Int, $y2020: Int) {
+      y2019: getSingleCompetitorResultsDate(id: $id, resultsByYear: $y2019, ...) { ... }
+      y2020: getSingleCompetitorResultsDate(id: $id, resultsByYear: $y2020, ...) { ... }
+    }
+
+Une carrière de 15 saisons passe ainsi de ~15 POST à 2–3 (`WA_BATCH_YEARS`
+saisons par requête), sans pool de threads. Plusieurs athlètes peuvent
+être traités en pipeline sur le même client keep-alive / HTTP/2
+(`get_many_competition_results_async`).
+
+La requête d'amorce (années actives) part en parallèle d'une requête
+spéculative sur les saisons les plus récentes ; ses résultats sont
+conservés au lieu d'être redemandés ensuite.
+
+Chaque saison reste stockée individuellement dans `season_cache` au format
+de la requête unitaire : les deux chemins partagent le même cache.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+
+from src.utils import async_runner, season_cache
+from src.utils.rate_limiter import CircuitOpenError, arequest
+from src.utils.scraping_wa import (
+    RESULTS_SELECTION,
+    WA_API_URL,
+    _has_competitor_data,
+    api_headers,
+    parse_competitor_data,
+)
+
+# Nombre de saisons regroupées dans un même POST GraphQL
+WA_BATCH_YEARS = int(os.getenv("WA_BATCH_YEARS", "6"))
+# Saisons récentes demandées en même temps que la requête d'amorce (années actives)
+WA_SPECULATIVE_YEARS = int(os.getenv("WA_SPECULATIVE_YEARS", "3"))
+# Requêtes WA simultanées, tous athlètes confondus
+DEFAULT_MAX_CONCURRENCY = 8
+
+YearResult = Tuple[int, Optional[pd.DataFrame], List[int]]
+
+
+def build_client(http2: bool = True, max_connections: int = DEFAULT_MAX_CONCURRENCY) -> httpx.AsyncClient:
+    """Client httpx keep-alive destiné à l'API WA (partagé entre athlètes)."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=60.0,
+    )
+    return httpx.AsyncClient(timeout=httpx.Timeout(25.0, connect=8.0), http2=http2, limits=limits)
+
+
+def shared_client() -> httpx.AsyncClient:
+    """Client WA unique de la boucle d'arrière-plan (`async_runner`)."""
+    return async_runner.shared("wa_client", build_client)
+
+
+def build_batched_query(athlete_id: int, years: Iterable[int]) -> dict:
+    """Payload GraphQL demandant plusieurs saisons d'un athlète (un alias `y<année>` par saison)."""
+    years = [int(y) for y in years]
+    var_defs = "".join(f", $y{y}: Int" for y in years)
+    fields = "".join(
+        f"""
+          y{y}: getSingleCompetitorResultsDate(id: $id, resultsByYear: $y{y}, resultsByYearOrderBy: $orderBy) {{"""
+        + RESULTS_SELECTION
+        + "          }"
+        for y in years
+    )
+    variables = {"id": int(athlete_id), "orderBy": "date"}
+    variables.update({f"y{y}": y for y in years})
+    return {
+        "operationName": "GetSingleCompetitorResultsDates",
+        "variables": variables,
+        "query": f"""
+        query GetSingleCompetitorResultsDates($id: Int, $orderBy: String{var_defs}) {{{fields}
+        }}
+        """,
+    }
+
+
+def _chunks(items: List[int], size: int) -> List[List[int]]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _failed_years(payload: dict, years: List[int]) -> set:
+    """
+    Saisons d'une réponse GraphQL à considérer comme non récupérées : alias
+    `y<année>` absent, ou cité dans le `path` d'une erreur. Une erreur sans
+    `path` invalide toute la requête. (Un alias présent à null sans erreur
+    signifie « aucun résultat cette saison ».)
+    """
+    data = payload.get("data") or {}
+    failed = {y for y in years if f"y{y}" not in data}
+    for error in payload.get("errors") or []:
+        path = error.get("path") if isinstance(error, dict) else None
+        if not path:
+            return set(years)
+        alias = str(path[0])
+        failed.update(y for y in years if alias == f"y{y}")
+    return failed
+
+
+async def fetch_years_async(
+    client: httpx.AsyncClient,
+    athlete_id: int,
+    years: Iterable[int],
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Dict[int, YearResult]:
+    """
+    Récupère plusieurs saisons d'un athlète en un seul POST (saisons fraîches
+    en cache exclues). Renvoie {année: (année, DataFrame ou None, années actives)}
+    pour les seules saisons effectivement récupérées (requête en échec : absentes).
+    """
+    years = [int(y) for y in years]
+    out: Dict[int, YearResult] = {}
+
+    # SQLite bloquant : hors de la boucle, en un seul aller-retour de thread
+    cached = await asyncio.to_thread(lambda: {y: season_cache.lookup("wa", athlete_id, y) for y in years})
+    to_fetch: List[int] = []
+    for year in years:
+        body = cached[year]
+        if body is None:
+            to_fetch.append(year)
+            continue
+        data = json.loads(body).get("data") or {}
+        out[year] = parse_competitor_data(year, data.get("getSingleCompetitorResultsDate"))
+    if not to_fetch:
+        return out
+
+    async with semaphore if semaphore is not None else contextlib.nullcontext():
+        try:
+            resp = await arequest(
+                client, "POST", WA_API_URL, json=build_batched_query(athlete_id, to_fetch), headers=api_headers()
+            )
+            resp.raise_for_status()
+            payload = resp.json()
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            # saisons absentes du résultat : considérées comme non récupérées
+            print(f"Erreur WA (athlète {athlete_id}, saisons {to_fetch}): {e}")
+            return out
+
+    data = payload.get("data") or {}
+    failed = _failed_years(payload, to_fetch)
+    if failed:
+        print(f"Erreur GraphQL WA (athlète {athlete_id}, saisons {sorted(failed)}): {payload.get('errors')}")
+    to_store: Dict[int, str] = {}
+    for year in to_fetch:
+        if year in failed:
+            # absente du résultat : reste « à récupérer » dans wa_fetch_state
+            continue
+        competitor_data = data[f"y{year}"]
+        # Stockage au format de la requête unitaire (cf. scraping_wa.fetch_year_data)
+        body = json.dumps({"data": {"getSingleCompetitorResultsDate": competitor_data}})
+        if _has_competitor_data(body):
+            to_store[year] = body
+        out[year] = parse_competitor_data(year, competitor_data)
+    if to_store:
+        await asyncio.to_thread(
+            lambda: [season_cache.put("wa", athlete_id, y, body) for y, body in to_store.items()]
+        )
+    return out
+
+
+async def _gather_until(tasks: List[asyncio.Task], timeout: Optional[float], athlete_id: int) -> Dict[int, YearResult]:
+    """Attend les paquets jusqu'à `timeout` ; les paquets non terminés sont annulés."""
+    results: Dict[int, YearResult] = {}
+    if not tasks:
+        return results
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        print(f"Arrêt anticipé WA pour l'athlète {athlete_id} : {len(pending)} paquet(s) reporté(s).")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        if task.exception() is None:
+            results.update(task.result())
+        else:
+            print(f"✗ Erreur WA pour l'athlète {athlete_id}: {task.exception()}")
+    return results
+
+
+def _results_to_df(
+    athlete_id: int,
+    results: Dict[int, YearResult],
+    active_years: set,
+    expected_years: Iterable[int],
+) -> pd.DataFrame:
+    """
+    Consolide les saisons reçues. `df.attrs["wa_fetch"]` décrit la couverture :
+    saisons attendues (actives dans la plage demandée) et saisons récupérées.
+    """
+    df_list = []
+    for year in sorted(results):
+        _, df, year_active = results[year]
+        active_years.update(year_active)
+        if df is not None:
+            df_list.append(df)
+
+    if df_list:
+        final_df = pd.concat(df_list, ignore_index=True)
+        final_df['athlete_id'] = athlete_id
+        if active_years:
+            final_df['all_active_years'] = ','.join(map(str, sorted(active_years)))
+    else:
+        final_df = pd.DataFrame()
+    final_df.attrs["wa_fetch"] = {
+        "active_years": sorted(int(y) for y in active_years),
+        "expected_years": sorted(int(y) for y in expected_years),
+        "fetched_years": sorted(results),
+    }
+    return final_df
+
+
+async def get_competition_results_async(
+    athlete_id: int,
+    start_year: int = 1990,
+    end_year: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    batch_years: int = WA_BATCH_YEARS,
+    max_total_seconds: Optional[float] = None,
+    speculative_years: int = WA_SPECULATIVE_YEARS,
+) -> pd.DataFrame:
+    """
+    Équivalent asynchrone de `scraping_wa.get_athlete_competition_results`
+    (même DataFrame de sortie).
+
+    La requête d'amorce (saison `end_year`, qui donne aussi `activeYears`)
+    part en même temps qu'une requête spéculative sur les
+    `speculative_years` saisons précédentes ; leurs résultats sont
+    conservés et seules les saisons actives restantes sont ensuite
+    demandées, par paquets de `batch_years` envoyés en parallèle.
+    Passé `max_total_seconds`, les paquets non terminés sont abandonnés et
+    les saisons déjà reçues sont renvoyées ; `df.attrs["wa_fetch"]` indique
+    alors les saisons manquantes (cf. `get_years_results_async`).
+    """
+    if client is None:
+        async with build_client() as own_client:
+            return await get_competition_results_async(
+                athlete_id, start_year, end_year, own_client, semaphore, batch_years,
+                max_total_seconds, speculative_years,
+            )
+
+    t0 = time.perf_counter()
+    athlete_id = int(athlete_id)
+    end_year = int(end_year or datetime.now().year)
+    start_year = min(int(start_year), end_year)
+
+    def _remaining() -> Optional[float]:
+        if max_total_seconds is None:
+            return None
+        return max(0.0, max_total_seconds - (time.perf_counter() - t0))
+
+    # ÉTAPE 1 : amorce (années actives) + saisons récentes en spéculatif
+    speculative = list(range(end_year - 1, max(start_year, end_year - speculative_years) - 1, -1))
+    probe_task = asyncio.create_task(fetch_years_async(client, athlete_id, [end_year], semaphore))
+    tasks = []
+    if speculative:
+        tasks.append(asyncio.create_task(fetch_years_async(client, athlete_id, speculative, semaphore)))
+
+    try:
+        await asyncio.wait_for(asyncio.shield(probe_task), _remaining())
+        probe = probe_task.result()
+    except asyncio.TimeoutError:
+        probe_task.cancel()
+        probe = {}
+    except CircuitOpenError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    active_years = set(probe[end_year][2]) if end_year in probe else set()
+
+    # ÉTAPE 2 : saisons actives restantes, par paquets
+    if active_years:
+        wanted = {int(y) for y in active_years if start_year <= int(y) <= end_year}
+    else:
+        # années actives inconnues : toute la plage est attendue
+        wanted = set(range(start_year, end_year + 1))
+    if probe:
+        remaining = sorted(wanted - {end_year} - set(speculative))
+        tasks += [
+            asyncio.create_task(fetch_years_async(client, athlete_id, chunk, semaphore))
+            for chunk in _chunks(remaining, batch_years)
+        ]
+
+    results = await _gather_until(tasks, _remaining(), athlete_id)
+    results.update(probe)
+    # saisons spéculatives hors carrière : ignorées
+    results = {y: r for y, r in results.items() if y in wanted}
+
+    # ÉTAPE 3 : consolidation
+    return _results_to_df(athlete_id, results, active_years, wanted)
+
+
+async def get_years_results_async(
+    athlete_id: int,
+    years: Iterable[int],
+    client: Optional[httpx.AsyncClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    batch_years: int = WA_BATCH_YEARS,
+    max_total_seconds: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Récupère uniquement les saisons `years` (reprise d'un chargement partiel,
+    rafraîchissement incrémental), sans requête d'amorce. Même sortie que
+    `get_competition_results_async` ; les années actives renvoyées par WA
+    sont reportées dans `df.attrs["wa_fetch"]["active_years"]`.
+    """
+    if client is None:
+        async with build_client() as own_client:
+            return await get_years_results_async(
+                athlete_id, years, own_client, semaphore, batch_years, max_total_seconds
+            )
+
+    athlete_id = int(athlete_id)
+    years = sorted({int(y) for y in years}, reverse=True)
+    tasks = [
+        asyncio.create_task(fetch_years_async(client, athlete_id, chunk, semaphore))
+        for chunk in _chunks(years, batch_years)
+    ]
+    results = await _gather_until(tasks, max_total_seconds, athlete_id)
+    return _results_to_df(athlete_id, results, set(), years)
+
+
+async def get_many_competition_results_async(
+    athlete_ids: Iterable[int],
+    start_year: int = 1990,
+    end_year: Optional[int] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncIterator[Tuple[int, pd.DataFrame]]:
+    """
+    Résultats WA de plusieurs athlètes en pipeline sur un seul client :
+    chaque (athlete_id, DataFrame) est produit dès que l'athlète est terminé.
+    """
+    athlete_ids = list(dict.fromkeys(int(a) for a in athlete_ids))
+    if not athlete_ids:
+        return
+
+    own_client = client is None
+    if own_client:
+        client = build_client(max_connections=max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(athlete_id: int) -> Tuple[int, pd.DataFrame]:
+        try:
+            return athlete_id, await get_competition_results_async(
+                athlete_id, start_year, end_year, client=client, semaphore=semaphore
+            )
+        except Exception as e:
+            print(f"Error fetching WA results for {athlete_id}: {e}")
+            return athlete_id, pd.DataFrame()
+
+    tasks = [asyncio.create_task(_one(a)) for a in athlete_ids]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_client:
+            await client.aclose()
+
+
+async def _competition_results_shared(athlete_id, start_year, end_year, max_total_seconds) -> pd.DataFrame:
+    return await get_competition_results_async(
+        athlete_id, start_year, end_year, client=shared_client(), max_total_seconds=max_total_seconds
+    )
+
+
+def get_competition_results_fast(
+    athlete_id: int,
+    start_year: int = 1990,
+    end_year: Optional[int] = None,
+    max_total_seconds: Optional[float] = None,
+) -> pd.DataFrame:
+    """Version synchrone (boucle d'arrière-plan + client WA partagé)."""
+    return async_runner.run(_competition_results_shared(athlete_id, start_year, end_year, max_total_seconds))
+
+
+async def _years_results_shared(athlete_id, years, max_total_seconds) -> pd.DataFrame:
+    return await get_years_results_async(
+        athlete_id, years, client=shared_client(), max_total_seconds=max_total_seconds
+    )
+
+
+def get_years_results_fast(
+    athlete_id: int,
+    years: Iterable[int],
+    max_total_seconds: Optional[float] = None,
+) -> pd.DataFrame:
+    """Version synchrone de `get_years_results_async` (client WA partagé)."""
+    return async_runner.run(_years_results_shared(athlete_id, list(years), max_total_seconds))
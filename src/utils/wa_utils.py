@@ -3,6 +3,11 @@
 Fonctions principales
 • `search_wa_athletes()`  – suggestions fallback si FFA ≠ résultats
 • `fetch_and_store_wa_results()` – scraping complet + insertion DB
+• `fetch_wa_results_by_id()` – résultats par identifiant WA (seq « WA_<id> »),
+  sans recherche par nom
+• `get_wa_fetch_status()` / `schedule_wa_continuation()` – saisons WA
+  récupérées par athlète (table `wa_fetch_state`) et reprise en arrière-plan
+  des saisons manquantes après un chargement interrompu par le délai UI
 
 Notes
 -----
@@ -15,8 +20,12 @@ Notes
 """
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Iterable
+import concurrent.futures
+import threading
+import numpy as np
 import pandas as pd
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from datetime import datetime
 
@@ -62,6 +71,7 @@ def search_wa_athletes(search_term: str) -> List[Dict[str, Any]]:
                 "seq": f"WA_{aa_id}",
                 "source": "WA",
                 "aa_id": aa_id,
+                "birth_date": row.get("birthDate") if pd.notna(row.get("birthDate")) else None,
             }
         )
     return out
@@ -134,18 +144,49 @@ _COL_RENAME = {
 }
 
 
+# Colonnes à faible cardinalité (quelques épreuves / niveaux / lieux par carrière)
+_CATEGORICAL_COLS = ["epreuve", "niv", "ville"]
+
+
+def _map_disciplines(discipline: pd.Series) -> pd.Series:
+    """`_map_discipline` sur toute la colonne : clé minuscule, libellé brut si inconnu."""
+    keys = discipline.where(discipline.isna(), discipline.astype(str)).str.strip().str.lower()
+    mapped = keys.map(_DISCIPLINE_MAP_CI)
+    return mapped.where(mapped.notna(), discipline).astype(object)
+
+
+def _clean_str_column(col: pd.Series) -> pd.Series:
+    """
+    `str(x).strip()` pour toute valeur non None (NaN → "nan", 3 → "3"),
+    None conservé. Le texte est nettoyé par `.str.strip()` ; seules les
+    valeurs distinctes non textuelles passent par `str()`.
+    """
+    values = col.to_numpy(dtype=object)
+    out = np.full(len(values), None, dtype=object)
+    present = values != None  # noqa: E711 – comparaison élément par élément
+    if present.any():
+        codes, uniques = pd.factorize(values[present], use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object)
+        is_text = np.fromiter((isinstance(u, str) for u in uniques), dtype=bool, count=len(uniques))
+        cleaned = uniques.copy()
+        if is_text.any():
+            cleaned[is_text] = uniques[is_text].str.strip()
+        cleaned[~is_text] = [str(u).strip() for u in uniques[~is_text]]
+        out[present] = cleaned.to_numpy(dtype=object)[codes]
+    return pd.Series(out, index=col.index, name=col.name, dtype=object)
+
+
 def _prepare_results_df(raw: pd.DataFrame, seq: str) -> pd.DataFrame:
     if raw.empty:
         return raw
 
     df = raw.copy()
 
-    # Discipline : si colonne absente / NaN → on tente disciplineCode
-    def _disc(row):
-        d = row.get("discipline")
-        return _map_discipline(d, bool(row.get("indoor")))
-
-    df["epreuve"] = df.apply(_disc, axis=1)
+    # Discipline : si colonne absente → None
+    if "discipline" in df.columns:
+        df["epreuve"] = _map_disciplines(df["discipline"])
+    else:
+        df["epreuve"] = None
 
     # Renommage des autres colonnes utiles
     df = df.rename(columns=_COL_RENAME)
@@ -156,26 +197,52 @@ def _prepare_results_df(raw: pd.DataFrame, seq: str) -> pd.DataFrame:
             df[col] = None
 
     # Dates + année
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    # une date WA se répète sur toutes les épreuves d'un meeting : parsing des valeurs distinctes
+    codes, uniques = pd.factorize(df["date"])
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce")
+    df["date"] = pd.Series(parsed.to_numpy()[codes], index=df.index).where(codes >= 0)
     df["annee"] = df["date"].dt.year
 
     df["seq"] = seq
 
     # Sélection finale & nettoyage strings
     df = df[_EXPECTED_COLS].copy()
-    str_cols = [c for c in _EXPECTED_COLS if c not in ("date", "annee")]
-    df[str_cols] = df[str_cols].applymap(
-        lambda x: str(x).strip() if x is not None else None
-    )
+    for col in _EXPECTED_COLS:
+        if col not in ("date", "annee"):
+            df[col] = _clean_str_column(df[col])
 
-    return df.drop_duplicates(subset=_EXPECTED_COLS)
+    df = df.drop_duplicates(subset=_EXPECTED_COLS)
+    # None devient NaN dans une catégorie : save_results_to_postgres le remet à None
+    return df.astype({col: "category" for col in _CATEGORICAL_COLS})
 
 ###############################################################################
 # 4. Scraping + insertion DB ##################################################
 ###############################################################################
 
-from src.utils.athlete_utils import save_athlete_info, save_results_to_postgres
-from src.utils.scraping_wa import search_athletes_by_name, get_athlete_results_by_name
+from src.utils.athlete_utils import save_athlete_info, save_results_to_postgres, table_columns
+from src.utils.rate_limiter import CircuitOpenError
+from src.utils.scraping_wa import search_athletes_by_name, get_athlete_competition_results
+from src.utils.wa_fast import get_competition_results_fast, get_years_results_fast
+
+
+def wa_id_from_seq(seq) -> Optional[int]:
+    """Identifiant WA (`aaAthleteId`) encodé dans un seq « WA_<id> », sinon None."""
+    seq = str(seq or "").strip()
+    if not seq.startswith("WA_"):
+        return None
+    try:
+        return int(seq[3:])
+    except ValueError:
+        return None
+
+
+def _normalize_wa_sex(raw_sex) -> str:
+    # Correction du sexe (Men -> M)
+    if str(raw_sex).lower() == 'men':
+        return 'M'
+    if str(raw_sex).lower() == 'women':
+        return 'F'
+    return str(raw_sex)[0].upper() if raw_sex else ''
 
 
 def _pick_best_wa_candidate(df_search: pd.DataFrame, name_query: str, athlete_hint: Optional[dict]) -> pd.Series:
@@ -218,6 +285,17 @@ def _pick_best_wa_candidate(df_search: pd.DataFrame, name_query: str, athlete_hi
     return df_search.iloc[0]
 
 
+def _stored_birth_year(engine, seq: str) -> Optional[int]:
+    """`athletes.birth_year` de `seq` (None si absent ou illisible)."""
+    try:
+        with engine.connect() as conn:
+            value = conn.execute(text("SELECT birth_year FROM athletes WHERE seq = :seq"), {"seq": seq}).scalar()
+    except Exception as e:
+        print(f"Lecture de la naissance impossible pour {seq} : {e}")
+        return None
+    return int(value) if value is not None else None
+
+
 def fetch_and_store_wa_results(
     name_query: str,
     engine,
@@ -227,43 +305,46 @@ def fetch_and_store_wa_results(
     """
     Cherche un athlète sur WA, récupère ses résultats et sauvegarde tout en base.
     """
-    if progress_callback:
-        progress_callback("Recherche du profil World Athletics…")
+    aa_id = wa_id_from_seq(athlete_hint.get("seq")) if athlete_hint else None
+    if aa_id is not None and athlete_hint.get("name"):
+        # Athlète déjà identifié (suggestion WA ou ligne en base) : pas de nouvelle recherche
+        full_name = str(athlete_hint["name"])
+        country = athlete_hint.get("club") or "WA"
+        sex = _normalize_wa_sex(athlete_hint.get("sex", ""))
+        birth_date_raw = athlete_hint.get("birth_date")
+    else:
+        # Première découverte : seule étape qui passe par la recherche par nom
+        if progress_callback:
+            progress_callback("Recherche du profil World Athletics…")
 
-    # 1. Recherche de l'athlète
-    df_search = search_athletes_by_name(name_query)
-    
-    if df_search.empty:
-        print(f"Aucun athlète trouvé sur WA pour : {name_query}")
-        return pd.DataFrame() # Retourne un DF vide au lieu de None pour éviter le crash
+        # 1. Recherche de l'athlète
+        df_search = search_athletes_by_name(name_query)
+
+        if df_search.empty:
+            print(f"Aucun athlète trouvé sur WA pour : {name_query}")
+            return pd.DataFrame() # Retourne un DF vide au lieu de None pour éviter le crash
+
+        athlete = _pick_best_wa_candidate(df_search, name_query, athlete_hint)
+        if athlete.empty:
+            return pd.DataFrame()
+
+        # L'ID s'appelle 'aaAthleteId' ; le seq est 'WA_<id>'
+        aa_id = int(athlete['aaAthleteId'])
+
+        # Le nom est séparé en 'givenName' et 'familyName'
+        full_name = f"{athlete['givenName']} {athlete['familyName']}"
+
+        # Le pays et le sexe
+        country = athlete.get('country', 'WA')
+        sex = _normalize_wa_sex(athlete.get('gender', ''))
+        birth_date_raw = athlete.get('birthDate')
+
+    wa_id = f"WA_{aa_id}"
 
-    athlete = _pick_best_wa_candidate(df_search, name_query, athlete_hint)
-    if athlete.empty:
-        return pd.DataFrame()
-    
-    # 1. L'ID s'appelle 'aaAthleteId' et on ajoute le préfixe WA_
-    wa_id = f"WA_{athlete['aaAthleteId']}"
-    
-    # 2. Le nom est séparé en 'givenName' et 'familyName'
-    full_name = f"{athlete['givenName']} {athlete['familyName']}"
-    
-    # 3. Le pays et le sexe
-    country = athlete.get('country', 'WA')
-    
-    # Correction du sexe (Men -> M)
-    raw_sex = athlete.get('gender', '')
-    if str(raw_sex).lower() == 'men':
-        sex = 'M'
-    elif str(raw_sex).lower() == 'women':
-        sex = 'F'
-    else:
-        sex = str(raw_sex)[0].upper() if raw_sex else ''
-    
     # Gestion de la date de naissance
-    birth_date_raw = athlete.get('birthDate')
     birth_year = None
 
-    if birth_date_raw:
+    if birth_date_raw is not None and not pd.isna(birth_date_raw) and str(birth_date_raw).strip():
         try:
             birth_date_raw = str(birth_date_raw).strip()
             parts = birth_date_raw.split()
@@ -273,6 +354,8 @@ def fetch_and_store_wa_results(
                     birth_year = int(possible_year)
         except Exception:
             pass
+    else:
+        birth_date_raw = None
 
     print(f"Sauvegarde infos athlète WA : {full_name} ({birth_date_raw})")
 
@@ -287,20 +370,26 @@ def fetch_and_store_wa_results(
         sex=sex,
         engine=engine,
         birth_date_raw=birth_date_raw,
-        birth_year=birth_year
+        birth_year=birth_year,
     )
 
     # 3. Récupération et sauvegarde des résultats
+    if birth_year is None:
+        # Suggestion issue de la base / de l'index mémoire : naissance déjà connue ?
+        birth_year = _stored_birth_year(engine, wa_id)
     current_year = datetime.now().year
-    start_year = max(1990, current_year - 20)
+    # Sans naissance : toute la plage ; l'amorce (activeYears) limite les
+    # saisons réellement demandées, la carrière n'est pas tronquée
+    start_year = 1990
     if birth_year is not None:
         start_year = max(1990, birth_year + 13)
 
     if progress_callback:
         progress_callback("Scraping des performances WA…")
 
-    raw_df = get_athlete_results_by_name(
-        full_name,
+    # Directement par identifiant : pas de seconde recherche par nom (homonymes)
+    raw_df = get_athlete_competition_results(
+        aa_id,
         start_year=start_year,
         end_year=current_year,
         use_threading=True,
@@ -315,10 +404,46 @@ def fetch_and_store_wa_results(
         if progress_callback:
             progress_callback("Insertion des résultats en base…")
         save_results_to_postgres(df_clean, wa_id, engine)
+
+    # Saisons reçues avant le délai : les manquantes sont reprises en arrière-plan.
+    # Couverture enregistrée après l'écriture (save_results_to_postgres lève
+    # en cas d'échec) : jamais de saison marquée récupérée sans ses lignes
+    record_wa_fetch(engine, wa_id, raw_df.attrs.get("wa_fetch"))
+    if get_wa_fetch_status(engine, wa_id)["status"] == "partial":
+        schedule_wa_continuation(engine, wa_id)
     
     return df_clean # <--- C'est ce return qui manquait !
 
-# ─── helper lecture-seule : DataFrame WA sans écriture DB ──────────────────
+# ─── helpers lecture-seule : DataFrame WA sans écriture DB ─────────────────
+def fetch_wa_results_by_id(
+    aa_id: int,
+    start_year: int = 1990,
+    end_year: Optional[int] = None,
+    max_total_seconds: Optional[float] = None,
+    years: Optional[Iterable[int]] = None,
+) -> pd.DataFrame:
+    """
+    Résultats WA normalisés (schéma `results`) d'un athlète déjà identifié,
+    sans recherche par nom ni écriture en base. DataFrame vide si rien
+    trouvé ou si l'API WA est indisponible.
+    Avec `years`, seules ces saisons sont demandées (rafraîchissement
+    incrémental / reprise). La couverture de la requête est transmise dans
+    `df.attrs["wa_fetch"]` (cf. `record_wa_fetch`).
+    """
+    try:
+        if years is not None:
+            raw_df = get_years_results_fast(aa_id, years, max_total_seconds)
+        else:
+            raw_df = get_competition_results_fast(aa_id, start_year, end_year, max_total_seconds)
+    except CircuitOpenError:
+        print("API World Athletics indisponible (disjoncteur ouvert).")
+        return pd.DataFrame()
+    out = pd.DataFrame() if raw_df.empty else _prepare_results_df(raw_df, f"WA_{int(aa_id)}")
+    out.attrs["wa_fetch"] = raw_df.attrs.get("wa_fetch")
+    return out
+
+
+
 def fetch_wa_results_df(name: str) -> pd.DataFrame:
     """
     Scrape World Athletics → renvoie un DataFrame normalisé *sans* rien écrire
@@ -347,3 +472,107 @@ def fetch_wa_results_df(name: str) -> pd.DataFrame:
 
     # 3. Nettoyage / mapping vers le schéma Postgres déjà défini
     return _prepare_results_df(raw_df, seq)
+
+
+###############################################################################
+# 5. Saisons récupérées & reprise en arrière-plan #############################
+###############################################################################
+# Une ligne par athlète WA : saisons attendues (actives dans la plage
+# demandée) et saisons effectivement récupérées. Les manquantes sont
+# complétées plus tard sans jamais redemander celles déjà en base.
+# Table créée par la migration 0005_wa_fetch_state. Tant qu'elle n'existe
+# pas (migrations bloquées, ex. extensions de 0002 refusées), la couverture
+# n'est pas suivie : statut « unknown », carrière complète redemandée.
+
+_continuations: Dict[str, concurrent.futures.Future] = {}
+_continuations_lock = threading.Lock()
+_continuation_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="wa-resume")
+
+
+def _fetch_state_available(engine: Engine) -> bool:
+    """Table `wa_fetch_state` présente (colonnes relues après chaque migration)."""
+    return bool(table_columns(engine, "wa_fetch_state"))
+
+
+def record_wa_fetch(engine: Engine, seq: str, fetch_info: Optional[dict]):
+    """Ajoute (union) les saisons attendues / récupérées d'une requête WA."""
+    if not fetch_info or not _fetch_state_available(engine):
+        return
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO wa_fetch_state (seq, expected_years, fetched_years, updated_at)
+            VALUES (:seq, :expected, :fetched, :now)
+            ON CONFLICT (seq) DO UPDATE SET
+                expected_years = ARRAY(
+                    SELECT DISTINCT y FROM unnest(wa_fetch_state.expected_years || EXCLUDED.expected_years) AS y ORDER BY y
+                ),
+                fetched_years = ARRAY(
+                    SELECT DISTINCT y FROM unnest(wa_fetch_state.fetched_years || EXCLUDED.fetched_years) AS y ORDER BY y
+                ),
+                updated_at = EXCLUDED.updated_at
+        """), dict(
+            seq=seq,
+            expected=[int(y) for y in fetch_info.get("expected_years") or []],
+            fetched=[int(y) for y in fetch_info.get("fetched_years") or []],
+            now=datetime.utcnow(),
+        ))
+
+
+def get_wa_fetch_status(engine: Engine, seq: str) -> Dict[str, Any]:
+    """
+    Couverture WA d'un athlète :
+    status = "complete" | "partial" (saisons manquantes) | "unknown" (jamais
+    suivi, ou table `wa_fetch_state` absente).
+    """
+    if not _fetch_state_available(engine):
+        return {"status": "unknown", "expected": [], "fetched": [], "missing": []}
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT expected_years, fetched_years FROM wa_fetch_state WHERE seq = :seq"),
+            {"seq": seq},
+        ).fetchone()
+    if row is None:
+        return {"status": "unknown", "expected": [], "fetched": [], "missing": []}
+    expected, fetched = list(row[0] or []), list(row[1] or [])
+    missing = sorted(set(expected) - set(fetched))
+    return {
+        "status": "partial" if missing else "complete",
+        "expected": expected,
+        "fetched": fetched,
+        "missing": missing,
+    }
+
+
+def continue_wa_fetch(engine: Engine, seq: str, max_total_seconds: Optional[float] = None) -> int:
+    """Récupère les saisons manquantes d'un athlète WA et les insère ; renvoie le nb de lignes ajoutées."""
+    aa_id = wa_id_from_seq(seq)
+    missing = get_wa_fetch_status(engine, seq)["missing"] if aa_id is not None else []
+    if not missing:
+        return 0
+    df = fetch_wa_results_by_id(aa_id, years=missing, max_total_seconds=max_total_seconds)
+    inserted = save_results_to_postgres(df, seq, engine) if not df.empty else 0
+    # Après l'écriture, comme fetch_and_store_wa_results
+    record_wa_fetch(engine, seq, df.attrs.get("wa_fetch"))
+    print(f"Reprise WA {seq} : {len(missing)} saison(s) demandée(s), {inserted} ligne(s) ajoutée(s)")
+    return inserted
+
+
+def _run_continuation(engine: Engine, seq: str) -> int:
+    try:
+        return continue_wa_fetch(engine, seq)
+    except Exception as e:
+        print(f"Erreur reprise WA pour {seq}: {e}")
+        return 0
+
+
+def schedule_wa_continuation(engine: Engine, seq: str) -> concurrent.futures.Future:
+    """
+    Lance `continue_wa_fetch` dans un thread d'arrière-plan (une seule reprise
+    en cours par athlète) et renvoie le Future correspondant.
+    """
+    with _continuations_lock:
+        fut = _continuations.get(seq)
+        if fut is None or fut.done():
+            fut = _continuation_pool.submit(_run_continuation, engine, seq)
+            _continuations[seq] = fut
+        return fut
@@ -0,0 +1,106 @@
+"""
+Écriture des résultats par COPY → table temporaire → `INSERT … ON CONFLICT
+DO NOTHING RETURNING` (`copy_results` / `save_results_to_postgres`).
+Nécessite une base PostgreSQL (DB_URL dans l'environnement) ; ignoré sinon.
+Le test travaille sur une table jetable au schéma de `results` (0001).
+"""
+import os
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from src.utils.athlete_utils import (
+    clear_table_columns_cache,
+    copy_results,
+    save_results_to_postgres,
+    table_columns,
+)
+
+DB_URL = os.getenv("DB_URL")
+pytestmark = pytest.mark.skipif(not DB_URL, reason="DB_URL non défini")
+
+TABLE = "results_copy_test"
+
+
+@pytest.fixture
+def engine():
+    from src.data_storage.engine import get_engine
+
+    engine = get_engine(DB_URL)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.exec_driver_sql(
+            f"""
+            CREATE TABLE {TABLE} (
+                seq TEXT, club TEXT, date DATE, epreuve TEXT, tour TEXT, pl TEXT, perf TEXT,
+                vt TEXT, niv TEXT, pts TEXT, ville TEXT, annee INTEGER,
+                UNIQUE (seq, date, epreuve, tour, perf)
+            )
+            """
+        )
+    clear_table_columns_cache()
+    yield engine
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {TABLE}")
+    clear_table_columns_cache()
+
+
+def _results(seq="1", n=3):
+    return pd.DataFrame({
+        "seq": [seq] * n,
+        "club": ["EA Paris"] * n,
+        "date": [f"2024-05-{d:02d}" for d in range(1, n + 1)],
+        "epreuve": ["100m"] * n,
+        "tour": [""] * n,
+        "pl": [str(i + 1) for i in range(n)],
+        "perf": ["10''50"] * n,
+        "vt": [None] * n,
+        "niv": [float("nan")] * n,
+        "pts": [None] * n,
+        "ville": ["Paris"] * n,
+        # année float côté WA : « 2024.0 » doit passer dans une colonne integer
+        "annee": [2024.0] * n,
+    })
+
+
+def _copy(engine, df):
+    raw = engine.raw_connection()
+    try:
+        with closing(raw.cursor()) as cur:
+            inserted = copy_results(cur, df, TABLE, table_columns(engine, TABLE))
+        raw.commit()
+        return inserted
+    finally:
+        raw.close()
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            f"SELECT seq, date::text, tour, vt, niv, pts, annee FROM {TABLE} ORDER BY seq, date"
+        ).fetchall()
+
+
+def test_duplicates_collapse_and_count_is_exact(engine):
+    df = pd.concat([_results("1"), _results("1").head(2), _results("2", n=1)], ignore_index=True)
+    assert _copy(engine, df) == {"1": 3, "2": 1}
+    assert len(_rows(engine)) == 4
+
+
+def test_nulls_round_trip(engine):
+    _copy(engine, _results(n=1))
+    # None / NaN → NULL ; chaîne vide conservée (clé d'unicité « tour »)
+    assert _rows(engine) == [("1", "2024-05-01", "", None, None, None, 2024)]
+
+
+def test_second_call_inserts_nothing(engine):
+    df = _results()
+    assert save_results_to_postgres(df, "1", engine, table=TABLE) == 3
+    assert save_results_to_postgres(df, "1", engine, table=TABLE) == 0
+    assert len(_rows(engine)) == 3
+
+
+def test_empty_frame_writes_nothing(engine):
+    assert save_results_to_postgres(_results().head(0), "1", engine, table=TABLE) == 0
+    assert _rows(engine) == []
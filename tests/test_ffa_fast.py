@@ -0,0 +1,76 @@
+"""Saisons FFA en échec distinguées des saisons vides ; pages mises en cache."""
+import asyncio
+import threading
+
+import httpx
+import pandas as pd
+
+from conftest import FIXTURES
+from src.utils import ffa_fast, season_cache
+
+PROFILE = {"years": ["2024", "2023", "2022"], "birth_date_raw": None, "birth_year": None, "name": "X", "club": None}
+
+
+def _run(monkeypatch, season_results):
+    async def profile(client, seq, semaphore=None):
+        return PROFILE
+
+    async def season(client, seq, year, semaphore=None):
+        return season_results[year]
+
+    monkeypatch.setattr(ffa_fast, "get_athlete_profile_async", profile)
+    monkeypatch.setattr(ffa_fast, "get_athlete_results_async", season)
+    return asyncio.run(ffa_fast.get_all_results_async("1", client=object()))
+
+
+def _season(year):
+    return pd.DataFrame({"Date": ["1 Mai"], "Epreuve": ["100m"], "Annee": [year]})
+
+
+def test_failed_year_is_reported(monkeypatch):
+    df = _run(monkeypatch, {"2024": None, "2023": _season("2023"), "2022": _season("2022")})
+    assert df.attrs["failed_years"] == ["2024"]
+    assert sorted(df["Annee"]) == ["2022", "2023"]
+
+
+def test_all_years_failed_is_not_an_empty_career(monkeypatch):
+    df = _run(monkeypatch, {"2024": None, "2023": None, "2022": None})
+    assert df.empty
+    assert df.attrs["failed_years"] == ["2024", "2023", "2022"]
+    assert df.attrs["profile"] == PROFILE
+
+
+def test_no_failure(monkeypatch):
+    df = _run(monkeypatch, {y: _season(y) for y in PROFILE["years"]})
+    assert df.attrs["failed_years"] == []
+
+
+def _season_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(season_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(season_cache, "CACHE_PATH", str(tmp_path / "season.sqlite"))
+    monkeypatch.setattr(season_cache, "_local", threading.local())
+    return season_cache
+
+
+def _fetch_season(body: str):
+    async def main():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+        async with httpx.AsyncClient(transport=transport) as client:
+            url = "https://www.athle.fr/ajax/fiche-athlete-resultats.aspx?seq=1&annee=2019"
+            return await ffa_fast.fetch_url(client, url, cache_key=("ffa", "1", "2019"))
+
+    return asyncio.run(main())
+
+
+def test_page_without_results_table_is_not_cached(tmp_path, monkeypatch):
+    cache = _season_cache(tmp_path, monkeypatch)
+    maintenance = "<html><body><h1>Site en maintenance</h1></body></html>"
+    assert _fetch_season(maintenance) == maintenance
+    assert cache.get("ffa", "1", "2019") is None
+
+
+def test_results_page_is_cached(tmp_path, monkeypatch):
+    cache = _season_cache(tmp_path, monkeypatch)
+    page = (FIXTURES / "ffa" / "results_season.html").read_text(encoding="utf-8")
+    _fetch_season(page)
+    assert cache.get("ffa", "1", "2019").body == page
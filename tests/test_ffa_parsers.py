@@ -0,0 +1,56 @@
+"""Équivalence des backends de `ffa_parsers` sur des pages enregistrées.
+
+`tests/fixtures/ffa/*.html` : fragments au format de
+`fiche-athlete-resultats.aspx` (retours chariot compris). Chaque backend
+doit rendre exactement la sortie de la référence BeautifulSoup, et la
+référence elle-même est figée sur quelques valeurs connues.
+"""
+import pytest
+
+from conftest import FIXTURES
+from src.utils.ffa_parsers import PARSERS, parse_results_table, results_table_to_df
+
+PAGES = sorted((FIXTURES / "ffa").glob("results_*.html"))
+_BACKEND_MODULES = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html"}
+
+
+@pytest.fixture(params=sorted(PARSERS))
+def backend(request):
+    if request.param in _BACKEND_MODULES:
+        pytest.importorskip(_BACKEND_MODULES[request.param])
+    return request.param
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda p: p.stem)
+def test_backend_matches_bs4(page, backend):
+    with open(page, encoding="utf-8", newline="") as f:
+        html = f.read()
+    assert parse_results_table(html, backend) == parse_results_table(html, "bs4")
+
+
+def test_reference_edge_cases():
+    with open(FIXTURES / "ffa" / "results_edge_cases.html", encoding="utf-8", newline="") as f:
+        headers, rows = parse_results_table(f.read(), "bs4")
+    assert headers == ["Date", "Epreuve", "Performance", "Lieu"]
+    assert rows == [
+        ["12 janv.", "800m Piste\xa0Courte", "1'52''30", "Val-de-Reuil(27)"],
+        ["3 Fév.", "1 500m", "3'58''1\n(3'57)", "Liévin"],
+        ["", "A B", "", ""],
+    ]
+
+
+def test_reference_season_page():
+    with open(FIXTURES / "ffa" / "results_season.html", encoding="utf-8", newline="") as f:
+        df = results_table_to_df(f.read(), "2019", "bs4")
+    assert list(df.columns) == [
+        "Club", "Date", "Epreuve", "Tour", "Place", "Performance", "Vent", "Niveau", "Points", "Lieu", "Annee",
+    ]
+    assert len(df) == 40
+    assert df.iloc[0].tolist() == [
+        "ES MASSY", "27 Mars", "1 500m", "Série 2", "3", "2'51''31", "", "IR3", "1077", "Val-de-Reuil(27)", "2019",
+    ]
+
+
+def test_empty_page_has_no_table(backend):
+    with open(FIXTURES / "ffa" / "results_empty.html", encoding="utf-8", newline="") as f:
+        assert parse_results_table(f.read(), backend) is None
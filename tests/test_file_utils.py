@@ -0,0 +1,71 @@
+"""`convert_times_to_seconds` (vectorisé) contre la référence `convert_time_to_seconds`."""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.file_utils import convert_time_to_seconds, convert_times_to_seconds, mark_status
+
+# Valeurs figées (reprises du bloc `__main__` de file_utils).
+KNOWN = {
+    "14'09''95": 849.95,
+    "14'31''": 871.0,
+    "13'12'' (13'05'')": 785.0,
+    "13:13.66": 793.66,
+    "13:28": 808.0,
+    "1h02'23''": 3743.0,
+    "1h02'27'' (1h02'27'')": 3747.0,
+    "1:00:00": 3600.0,
+    "59:59": 3599.0,
+    "DNF": None,
+    "9''58": 9.58,
+    "65''58": 65.58,
+    '9"58': 9.58,
+    '65"58': 65.58,
+}
+
+MARKS = list(KNOWN) + [
+    # h / min / s
+    "2h10'05''", "2:10:05", "1h", "3'45''", "3:45.2", "10''85", '10"85', "10.85", "45''",
+    # codes d'invalidité
+    "DNF", "DQ", "DNS", "AB", "NP", "dnf", "DNF (DQ)",
+    # vent / mentions entre parenthèses
+    "10''85 (+1.8)", "10''85 (-0.4)", "20''51 (+2.4 w)", "10.85 (+1,2)", "3'45'' (3'44'')",
+    # vides, manquants, non-chaînes
+    "", "   ", None, np.nan, 12.5, "n/a", "abc",
+]
+
+
+def _same(got, expected):
+    if expected is None:
+        return pd.isna(got)
+    return not pd.isna(got) and math.isclose(got, expected, rel_tol=0, abs_tol=1e-9)
+
+
+@pytest.mark.parametrize("mark, expected", KNOWN.items())
+def test_known_values(mark, expected):
+    assert _same(convert_time_to_seconds(mark), expected)
+    assert _same(convert_times_to_seconds(pd.Series([mark], dtype=object)).iloc[0], expected)
+
+
+def test_vectorised_matches_scalar_elementwise():
+    series = pd.Series(MARKS, dtype=object)
+    got = convert_times_to_seconds(series)
+    assert got.dtype == float
+    assert got.index.equals(series.index)
+    for mark, value in zip(MARKS, got):
+        assert _same(value, convert_time_to_seconds(mark)), f"{mark!r} → {value}"
+
+
+def test_vectorised_keeps_index_and_duplicates():
+    series = pd.Series(["13:28", "DNF", "13:28", None], index=[10, 3, 7, 1], name="perf")
+    got = convert_times_to_seconds(series)
+    assert list(got.index) == [10, 3, 7, 1] and got.name == "perf"
+    assert got.iloc[0] == got.iloc[2] == 808.0
+    assert got.iloc[[1, 3]].isna().all()
+
+
+def test_mark_status():
+    series = pd.Series(["13:28", "DNF", "", None, "abc"], dtype=object)
+    assert list(mark_status(series)) == ["ok", "DNF", "empty", "empty", "unparsed"]
@@ -0,0 +1,69 @@
+"""Index des noms : noms normalisés mis en cache, rafraîchissement en arrière-plan."""
+import threading
+
+from src.utils.name_index import AthleteNameIndex
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Conn:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.engine.gate.wait(5)
+        self.engine.calls += 1
+        return _Result(self.engine.rows)
+
+
+class FakeEngine:
+    """Moteur minimal : `connect().execute(...).fetchall()`."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def connect(self):
+        return _Conn(self)
+
+
+ROWS = [
+    ("1", "Jean-Pierre Dupont", "EA Paris", "M", None),
+    ("WA_2", "Émilie Durand", "FRA", "F", None),
+]
+
+
+def test_search_uses_cached_normalized_names():
+    index = AthleteNameIndex()
+    index.refresh(FakeEngine(ROWS))
+    assert index._names_norm == ["jean-pierre dupont", "emilie durand"]
+    assert [r["seq"] for r in index.search("pierre dup")] == ["1"]
+    assert [r["seq"] for r in index.search("emilie", source="WA")] == ["WA_2"]
+
+
+def test_refresh_if_stale_does_not_block_and_is_single_flight():
+    engine = FakeEngine(ROWS)
+    engine.gate.clear()
+    index = AthleteNameIndex()
+    assert index.refresh_if_stale(engine, max_age=0) is True
+    # refresh en cours (bloqué) : la recherche répond tout de suite, sans second thread
+    assert index.search("dupont") == []
+    assert index.refresh_if_stale(engine, max_age=0) is False
+    engine.gate.set()
+    index._refresher.join(5)
+    assert engine.calls == 1
+    assert [r["seq"] for r in index.search("dupont")] == ["1"]
@@ -0,0 +1,43 @@
+"""
+Plans des requêtes chaudes (`schema.HOT_QUERIES`) après application des
+migrations : chacune doit passer par un index. Nécessite une base
+PostgreSQL (DB_URL dans l'environnement, migrations appliquées dessus) ;
+ignoré sinon.
+"""
+import os
+
+import pytest
+
+from src.data_storage import schema
+
+DB_URL = os.getenv("DB_URL")
+pytestmark = pytest.mark.skipif(not DB_URL, reason="DB_URL non défini")
+
+QUERIES = [*schema.HOT_QUERIES, schema.search_hot_query()]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    from sqlalchemy import text
+
+    from src.data_storage.engine import get_engine
+
+    engine = get_engine(DB_URL)
+    with engine.connect() as conn:
+        available = {
+            r[0]
+            for r in conn.execute(
+                text("SELECT name FROM pg_available_extensions WHERE name IN ('pg_trgm', 'unaccent')")
+            )
+        }
+    missing = {"pg_trgm", "unaccent"} - available
+    if missing:
+        pytest.skip(f"extension(s) indisponible(s) pour la migration 0002 : {', '.join(sorted(missing))}")
+    schema.apply_migrations(engine)
+    return engine
+
+
+@pytest.mark.parametrize("label, sql, params, table", QUERIES, ids=[q[0] for q in QUERIES])
+def test_hot_query_uses_an_index(engine, label, sql, params, table):
+    ok, detail = schema.explain_uses_index(engine, sql, params, table)
+    assert ok, f"{label} : {detail}"
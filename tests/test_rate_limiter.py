@@ -0,0 +1,216 @@
+"""Limiteur par hôte : seau à jetons, fenêtre AIMD, disjoncteur, relances (horloge simulée)."""
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import CircuitOpenError, HostLimiter, HostPolicy
+
+HOST = "limiter.test"
+URL = f"https://{HOST}/page"
+
+
+class FakeClock:
+    """Horloge monotone simulée ; `sleep` avance le temps au lieu d'attendre."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    async def asleep(self, seconds):
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.asleep)
+    return clock
+
+
+def make_limiter(clock, monkeypatch=None, **policy):
+    limiter = HostLimiter(HOST, HostPolicy(**policy), clock=clock)
+    if monkeypatch is not None:
+        monkeypatch.setitem(rate_limiter._LIMITERS, HOST, limiter)
+    return limiter
+
+
+# ------------------------------------------------------------------ seau à jetons
+def test_token_bucket_allows_burst_then_paces(clock):
+    limiter = make_limiter(clock, rate=2.0, burst=3, initial_concurrency=10)
+    for _ in range(3):
+        assert limiter._try_acquire() == 0.0
+        limiter.release(200, 0.01)
+    assert limiter._try_acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter._try_acquire() == 0.0
+
+
+def test_acquire_sleeps_until_a_token_is_available(clock):
+    limiter = make_limiter(clock, rate=1.0, burst=1)
+    limiter.acquire()
+    limiter.release(200, 0.01)
+    limiter.acquire()
+    assert sum(clock.slept) == pytest.approx(1.0)
+    assert limiter.snapshot()["throttled"] == 1
+
+
+# ------------------------------------------------------------------ AIMD
+def test_window_grows_on_success_and_halves_on_overload(clock):
+    limiter = make_limiter(clock, initial_concurrency=4, latency_target=3.0)
+    limiter._try_acquire()
+    limiter.release(200, 0.1)
+    assert limiter.snapshot()["concurrency_limit"] == pytest.approx(4.25)
+    limiter._try_acquire()
+    limiter.release(429, 0.1)
+    assert limiter.snapshot()["concurrency_limit"] == pytest.approx(2.12, abs=0.01)
+    # une seule réduction par fenêtre de latence cible
+    clock.now += 1.0
+    limiter._try_acquire()
+    limiter.release(429, 0.1, retry_after=0.0)
+    assert limiter.snapshot()["concurrency_limit"] == pytest.approx(2.12, abs=0.01)
+
+
+def test_window_caps_in_flight_requests(clock):
+    limiter = make_limiter(clock, initial_concurrency=2, burst=10)
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == HostLimiter._POLL_SECONDS
+
+
+def test_slow_responses_shrink_the_window(clock):
+    limiter = make_limiter(clock, initial_concurrency=8, latency_target=2.0)
+    limiter._try_acquire()
+    limiter.release(200, 5.0)
+    assert limiter.snapshot()["concurrency_limit"] == 4
+
+
+# ------------------------------------------------------------------ Retry-After
+def test_retry_after_pauses_the_host(clock):
+    limiter = make_limiter(clock)
+    limiter._try_acquire()
+    limiter.release(429, 0.1, retry_after=5.0)
+    assert limiter._try_acquire() == pytest.approx(5.0)
+
+
+def test_retry_after_is_capped(clock):
+    limiter = make_limiter(clock, max_retry_after=10.0)
+    limiter._try_acquire()
+    limiter.release(503, 0.1, retry_after=86400.0)
+    assert limiter._try_acquire() == pytest.approx(10.0)
+
+
+# ------------------------------------------------------------------ disjoncteur
+def _fail(limiter, times):
+    for _ in range(times):
+        limiter._try_acquire()
+        limiter.release(None, 0.1, error=True)
+
+
+def test_breaker_closed_open_half_open_closed(clock):
+    limiter = make_limiter(clock, failure_threshold=3, reset_timeout=30.0)
+    _fail(limiter, 2)
+    assert limiter.snapshot()["breaker_state"] == "closed"
+    _fail(limiter, 1)
+    assert limiter.snapshot()["breaker_state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        limiter._try_acquire()
+
+    clock.now += 30.0
+    assert limiter._try_acquire() == 0.0           # requête d'essai
+    assert limiter.snapshot()["breaker_state"] == "half_open"
+    with pytest.raises(CircuitOpenError):          # une seule requête d'essai à la fois
+        limiter._try_acquire()
+    limiter.release(200, 0.1)
+    assert limiter.snapshot()["breaker_state"] == "closed"
+    assert limiter._try_acquire() == 0.0
+    assert limiter.snapshot()["breaker_trips"] == 1
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    limiter = make_limiter(clock, failure_threshold=2, reset_timeout=10.0)
+    _fail(limiter, 2)
+    clock.now += 10.0
+    limiter._try_acquire()
+    limiter.release(502, 0.1)
+    assert limiter.snapshot()["breaker_state"] == "open"
+    clock.now += 5.0
+    with pytest.raises(CircuitOpenError):
+        limiter._try_acquire()
+
+
+def test_success_resets_the_failure_streak(clock):
+    limiter = make_limiter(clock, failure_threshold=3)
+    _fail(limiter, 2)
+    limiter._try_acquire()
+    limiter.release(200, 0.1)
+    _fail(limiter, 2)
+    assert limiter.snapshot()["breaker_state"] == "closed"
+
+
+# ------------------------------------------------------------------ relances
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.responses = [FakeResponse(*s) if isinstance(s, tuple) else FakeResponse(s) for s in statuses]
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def test_request_retries_5xx_with_backoff(clock, monkeypatch):
+    make_limiter(clock, monkeypatch)
+    session = FakeSession([500, 502, 200])
+    resp = rate_limiter.request("GET", URL, session=session)
+    assert resp.status_code == 200 and session.calls == 3
+    assert clock.slept[:2] == [pytest.approx(0.4), pytest.approx(0.8)]
+
+
+def test_request_honours_capped_retry_after_on_429(clock, monkeypatch):
+    make_limiter(clock, monkeypatch, max_retry_after=20.0)
+    session = FakeSession([(429, {"retry-after": "3600"}), 200])
+    resp = rate_limiter.request("GET", URL, session=session)
+    assert resp.status_code == 200 and session.calls == 2
+    assert sum(clock.slept) == pytest.approx(20.0)
+
+
+def test_request_returns_last_response_after_max_attempts(clock, monkeypatch):
+    make_limiter(clock, monkeypatch, failure_threshold=10)
+    session = FakeSession([503, 503, 503])
+    assert rate_limiter.request("GET", URL, session=session).status_code == 503
+    assert session.calls == 3
+
+
+def test_arequest_retries_transport_errors_then_429(clock, monkeypatch):
+    make_limiter(clock, monkeypatch)
+    outcomes = [httpx.ConnectError("down"), httpx.Response(429, headers={"retry-after": "2"}), httpx.Response(200)]
+
+    def handler(request):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await rate_limiter.arequest(client, "GET", URL)
+
+    assert asyncio.run(main()).status_code == 200
+    assert not outcomes
+    assert sum(clock.slept) == pytest.approx(0.4 + 2.0)
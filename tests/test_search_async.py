@@ -0,0 +1,36 @@
+"""Ordre de priorité des requêtes de recherche et pannes partielles."""
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils.search_async import _first_hit_in_order
+
+
+async def _hits(value):
+    return value
+
+
+async def _fails():
+    raise httpx.ConnectError("down")
+
+
+def run(coros):
+    return asyncio.run(_first_hit_in_order(coros))
+
+
+def test_first_non_empty_hit_wins():
+    assert run([_hits([]), _hits([{"seq": "1"}]), _hits([{"seq": "2"}])]) == [{"seq": "1"}]
+
+
+def test_empty_when_every_query_answered():
+    assert run([_hits([]), _hits([])]) == []
+
+
+def test_failed_priority_query_is_not_an_empty_answer():
+    with pytest.raises(httpx.ConnectError):
+        run([_fails(), _hits([])])
+
+
+def test_hit_after_failure_is_returned():
+    assert run([_fails(), _hits([{"seq": "1"}])]) == [{"seq": "1"}]
@@ -0,0 +1,46 @@
+"""Durées de vie et élagage du cache disque des saisons."""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.utils import season_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(season_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(season_cache, "CACHE_PATH", str(tmp_path / "season.sqlite"))
+    # connexion propre au fichier temporaire pour ce thread
+    monkeypatch.setattr(season_cache, "_local", threading.local())
+    return season_cache
+
+
+def test_previous_season_stays_recent_all_year():
+    for month in (1, 3, 4, 7, 12):
+        now = datetime(2026, month, 15)
+        assert season_cache.season_ttl(2026, now) == season_cache.CURRENT_SEASON_TTL
+        assert season_cache.season_ttl(2025, now) == season_cache.RECENT_SEASON_TTL
+        assert season_cache.season_ttl(2024, now) == season_cache.CLOSED_SEASON_TTL
+
+
+def test_prune_drops_long_expired_entries(cache):
+    cache.put("ffa", "1", "2010", "<table/>")
+    cache.put("ffa", "2", "2010", "<table/>")
+    conn = cache._connection()
+    with conn:
+        conn.execute("UPDATE season_responses SET expires_at = ? WHERE athlete = '1'", (time.time() - cache.MAX_STALE - 1,))
+    assert cache.prune() == 1
+    assert cache.get("ffa", "1", "2010") is None
+    assert cache.get("ffa", "2", "2010") is not None
+
+
+def test_prune_caps_entry_count(cache, monkeypatch):
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 3)
+    for i in range(5):
+        cache.put("wa", str(i), "2020", "{}")
+        time.sleep(0.01)
+    cache.prune()
+    kept = {row[0] for row in cache._connection().execute("SELECT athlete FROM season_responses")}
+    assert kept == {"2", "3", "4"}
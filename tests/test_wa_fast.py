@@ -0,0 +1,54 @@
+"""Saisons WA non récupérées (réponses GraphQL en erreur), cache hors de la boucle."""
+import asyncio
+import threading
+
+import httpx
+
+from src.utils import season_cache, wa_fast
+from src.utils.wa_fast import _failed_years
+
+YEARS = [2019, 2020]
+
+
+def test_errors_without_data_fail_every_year():
+    assert _failed_years({"data": None, "errors": [{"message": "boom"}]}, YEARS) == {2019, 2020}
+
+
+def test_error_path_fails_only_its_alias():
+    payload = {"data": {"y2019": None, "y2020": None}, "errors": [{"message": "x", "path": ["y2020"]}]}
+    assert _failed_years(payload, YEARS) == {2020}
+
+
+def test_missing_alias_fails():
+    assert _failed_years({"data": {"y2019": None}}, YEARS) == {2020}
+
+
+def test_null_alias_without_error_is_an_empty_season():
+    assert _failed_years({"data": {"y2019": None, "y2020": None}}, YEARS) == set()
+
+
+def test_season_cache_io_runs_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    def lookup(source, athlete, year):
+        threads.setdefault("lookup", set()).add(threading.get_ident())
+        return None
+
+    def put(source, athlete, year, body, *args):
+        threads.setdefault("put", set()).add(threading.get_ident())
+
+    monkeypatch.setattr(season_cache, "lookup", lookup)
+    monkeypatch.setattr(season_cache, "put", put)
+    monkeypatch.setattr(wa_fast, "WA_API_URL", "https://wa.invalid/graphql")
+    season = {"activeYears": [2019, 2020], "resultsByDate": []}
+    payload = {"data": {"y2019": season, "y2020": season}}
+
+    async def main():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return threading.get_ident(), await wa_fast.fetch_years_async(client, 1, YEARS)
+
+    loop_thread, out = asyncio.run(main())
+    assert sorted(out) == YEARS
+    assert threads["lookup"] and threads["put"]
+    assert loop_thread not in threads["lookup"] | threads["put"]
@@ -0,0 +1,32 @@
+"""
+Non-régression de `wa_utils._prepare_results_df` (version vectorisée) :
+sortie identique à l'ancienne implémentation `apply` + `applymap`
+(`benchmarks.bench_wa_prepare.legacy_prepare`) sur le fixture synthétique.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.bench_wa_prepare import assert_identical, synthetic_career
+from src.utils.wa_utils import _prepare_results_df
+
+
+@pytest.fixture(scope="module")
+def career():
+    # 8 saisons : colonnes absentes certaines années (wind, remark) → NaN
+    return synthetic_career(8, 150)
+
+
+def test_synthetic_career(career):
+    assert_identical(career)
+
+
+def test_small_career_other_seed():
+    assert_identical(synthetic_career(3, 50, seed=1))
+
+
+def test_without_discipline_column(career):
+    assert_identical(career.drop(columns=["discipline"]))
+
+
+def test_empty_frame():
+    assert _prepare_results_df(pd.DataFrame(), "WA_123").empty
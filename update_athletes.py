@@ -7,11 +7,18 @@
 • Mode boucle  --loop               : répète des mini‑batches jusqu’à
   ce que tous les athlètes soient à jour, avec une pause --delay.
 
-Dépend d’un helper « lecture seule » dans *wa_utils.py* :
+Côté World Athletics, les helpers « lecture seule » de *wa_utils.py*
+retournent un DataFrame déjà nettoyé sans rien écrire en DB :
+
+    def fetch_wa_results_by_id(aa_id: int, ..., years=None) -> pd.DataFrame
+
+chemin principal pour les seq « WA_<id> » : l’identifiant WA est lu dans le
+seq (aucune recherche par nom) et, hors --full, seules les saisons encore
+modifiables ou jamais récupérées (table wa_fetch_state) sont demandées ;
 
     def fetch_wa_results_df(name: str) -> pd.DataFrame
 
-qui retourne un DataFrame déjà nettoyé sans rien écrire en DB.
+repli par recherche de nom, pour les seq qui ne sont pas de la forme WA_<id>.
 """
 from __future__ import annotations
 
@@ -19,20 +26,30 @@ import os
 import time
 import logging
 import argparse
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
 
-from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from dotenv import load_dotenv
 
 # ─── utils projet ────────────────────────────────────────────────────────────
-from src.utils.ffa_fast import get_all_results_fast
-from src.utils.athlete_utils import (
-    clean_and_prepare_results_df,
-    save_athlete_info,
-    save_results_to_postgres,
+from src.data_storage.database_handler import run_with_handler
+from src.data_storage.engine import get_engine
+from src.data_storage.enrich_birth import enrich_birth_info
+from src.data_storage.schema import ensure_schema
+from src.utils.ffa_fast import get_all_results_fast, stream_many_results
+from src.utils.athlete_utils import clean_and_prepare_results_df
+from src.utils.results_writer import Outcome, ResultsWriter
+from src.utils.wa_utils import (
+    fetch_wa_results_by_id,
+    fetch_wa_results_df,  # repli : recherche par nom (seq hors WA_<id>)
+    get_wa_fetch_status,
+    wa_id_from_seq,
 )
-from src.utils.wa_utils import fetch_wa_results_df   # ← nouveau helper
+from src.utils.rate_limiter import limiter_stats
+from src.utils.season_cache import cache_stats
 
 # ─── configuration ───────────────────────────────────────────────────────────
 load_dotenv()
@@ -40,119 +57,183 @@ DB_URL        = os.getenv("DB_URL")
 DEFAULT_BATCH = int(os.getenv("BATCH_SIZE", 10))
 MAX_AGE_DAYS  = int(os.getenv("MAX_AGE_DAYS", 1))
 DEFAULT_DELAY = int(os.getenv("DELAY_SECONDS", 600))  # 10 min
+FFA_CONCURRENCY = int(os.getenv("FFA_CONCURRENCY", 20))  # requêtes athle.fr en vol
 
 if not DB_URL:
     raise SystemExit("❌  DB_URL manquant dans l’environnement")
 
-engine: Engine = create_engine(
-    DB_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=5,
-    max_overflow=10,
-)
+engine: Engine = get_engine(DB_URL)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 
 # ─── sélection des athlètes à rafraîchir ─────────────────────────────────────
 
-def select_stale_athletes(engine: Engine, batch_size: int) -> List[Dict]:
-    q = text(
-        """
-        SELECT seq, name, club, sex, last_update
-          FROM athletes
-         WHERE last_update IS NULL
-            OR last_update < (NOW() AT TIME ZONE 'utc') - INTERVAL :age
-         ORDER BY last_update NULLS FIRST
-         LIMIT :limit
-        """
-    )
-    with engine.begin() as conn:
-        rows = (
-            conn.execute(q, {"age": f"{MAX_AGE_DAYS} days", "limit": batch_size})
-            .mappings()
-            .all()
-        )
-    return [dict(r) for r in rows]
+def select_stale_athletes(batch_size: int) -> List[Dict]:
+    """Athlètes jamais rafraîchis ou plus vieux que MAX_AGE_DAYS (DatabaseHandler)."""
+    return run_with_handler(lambda db: db.select_stale_athletes(MAX_AGE_DAYS, batch_size))
+
+def get_stored_years(seqs: Iterable[str]) -> Dict[str, Set[str]]:
+    """Années (`annee`) déjà présentes dans `results`, par athlète."""
+    seqs = list(seqs)
+    return run_with_handler(lambda db: db.stored_years(seqs))
 
 # ─── helpers ─────────────────────────────────────────────────────────────────
 
-def _touch(seq: str, name: str, club: str, sex: str, engine: Engine):
-    """Met à jour la colonne *last_update*."""
-    save_athlete_info(seq, name, club, sex, engine)
+def fetch_ffa_batch(seqs: List[str], known_years: Optional[Dict[str, Set[str]]] = None) -> Dict[str, pd.DataFrame]:
+    """Télécharge les résultats FFA du batch via le client partagé de la boucle d'arrière-plan."""
+    out: Dict[str, pd.DataFrame] = {}
+    for seq, df in stream_many_results(seqs, max_concurrency=FFA_CONCURRENCY, known_years=known_years):
+        logging.info("   ↳ FFA %s téléchargé (%d lignes)", seq, len(df))
+        out[seq] = df
+    return out
 
 
-def refresh_ffa(ath: Dict, engine: Engine):
-    seq, name, club, sex = ath["seq"], ath["name"], ath["club"], ath["sex"]
-    df = get_all_results_fast(seq)
+def refresh_ffa(ath: Dict, engine: Engine, writer: ResultsWriter, df: Optional[pd.DataFrame] = None, full: bool = False):
+    """
+    Nettoie les résultats FFA et les confie à `writer`. Renvoie
+    (mis en attente ?, issues des vidages déclenchés).
+    """
+    seq = ath["seq"]
+    if df is None:
+        known = None if full else get_stored_years([seq])[seq]
+        df = get_all_results_fast(seq, known_years=known)
+    profile = df.attrs.get("profile")
+    failed_years = df.attrs.get("failed_years") or []
+    if failed_years:
+        # Saison illisible (erreur réseau, disjoncteur…) ≠ saison vide : réessayé au prochain batch
+        logging.warning(
+            "   ↳ saison(s) %s non lue(s) pour %s (last_update non modifié)", ", ".join(failed_years), seq
+        )
+        return False, []
+    if df.empty and not full and profile and profile.get("years"):
+        # Profil lu correctement mais aucune saison modifiable n'a de résultat
+        logging.info("   ↳ aucune saison récente à rafraîchir pour %s", seq)
+        return True, writer.add(ath, profile=profile)
     if df.empty:
         logging.warning("   ↳ aucune donnée FFA reçue pour %s (last_update non modifié)", seq)
-        return False, 0
+        return False, []
 
     df = clean_and_prepare_results_df(df, seq)
     if df.empty:
         logging.warning("   ↳ données FFA invalides/vides après nettoyage pour %s", seq)
-        return False, 0
+        return False, []
+    return True, writer.add(ath, df, profile=profile)
 
-    ins = save_results_to_postgres(df, seq, engine)
-    if ins == 0:
-        logging.info("   ↳ aucune nouvelle ligne (idempotent)")
-    else:
-        logging.info("   ↳ %d nouvelles lignes insérées", ins)
-    _touch(seq, name, club, sex, engine)
-    return True, ins
 
+def refresh_wa(ath: Dict, engine: Engine, writer: ResultsWriter, full: bool = False):
+    """
+    Scrape WA puis confie les performances à `writer` (déduplication gérée
+    en DB), avec la couverture de la requête : les saisons ne sont marquées
+    récupérées qu'une fois leurs lignes écrites.
+    """
+    seq, name = ath["seq"], ath["name"]
 
-def refresh_wa(ath: Dict, engine: Engine):
-    """Scrape WA puis insère les performances (déduplication gérée en DB)."""
-    seq, name, club, sex = ath["seq"], ath["name"], ath["club"], ath["sex"]
+    aa_id = wa_id_from_seq(seq)
+    status = get_wa_fetch_status(engine, seq) if aa_id is not None else None
+    if aa_id is None:
+        # Repli : pas d’identifiant WA dans le seq → recherche par nom
+        df = fetch_wa_results_df(name)  # DataFrame déjà nettoyé, pas d’insert
+    elif not full and status["status"] != "unknown":
+        # Incrémental : saisons encore modifiables + saisons jamais récupérées
+        current_year = datetime.now().year
+        years = set(status["missing"]) | {current_year, current_year - 1}
+        df = fetch_wa_results_by_id(aa_id, years=years)
+    else:
+        # Identifiant WA connu (seq « WA_<id> ») : pas de recherche par nom
+        df = fetch_wa_results_by_id(aa_id)
 
-    df = fetch_wa_results_df(name)  # DataFrame déjà nettoyé, pas d’insert
+    fetch_info = df.attrs.get("wa_fetch") if aa_id is not None else None
+    if df.empty and not full and fetch_info and fetch_info.get("fetched_years"):
+        # Saisons bien récupérées mais sans résultat
+        logging.info("   ↳ aucun résultat WA récent pour %s", name)
+        return True, writer.add(ath, fetch_info=fetch_info)
     if df.empty:
         logging.warning("   ↳ aucune donnée WA reçue pour %s (last_update non modifié)", name)
-        return False, 0
+        return False, []
+    return True, writer.add(ath, df, fetch_info=fetch_info)
 
-    inserted = save_results_to_postgres(df, seq, engine)
-    if inserted == 0:
-        logging.info("   ↳ aucune nouvelle ligne (idempotent)")
-    else:
-        logging.info("   ↳ %d nouvelles lignes insérées", inserted)
 
-    _touch(seq, name, club, sex, engine)
-    return True, inserted
+def _account(outcomes: List[Outcome], counts: Dict[str, int]):
+    """Reporte les issues d'un vidage du tampon dans les compteurs du batch."""
+    for seq, inserted in outcomes:
+        if inserted is None:
+            counts["failed"] += 1
+            logging.error("   ↳ écriture en échec pour %s (last_update non modifié)", seq)
+            continue
+        counts["success"] += 1
+        counts["inserted"] += inserted
+        if inserted == 0:
+            logging.info("   ↳ %s : aucune nouvelle ligne (idempotent)", seq)
+        else:
+            logging.info("   ↳ %s : %d nouvelles lignes insérées", seq, inserted)
 
 
-def process_batch(batch_size: int) -> int:
+def process_batch(batch_size: int, full: bool = False) -> int:
     """Traite un batch et renvoie le nombre d’athlètes rafraîchis."""
-    stale = select_stale_athletes(engine, batch_size)
+    stale = select_stale_athletes(batch_size)
     if not stale:
         logging.info("✅ Base déjà à jour – aucune action nécessaire.")
         return 0
 
     logging.info("➡️  %d athlète(s) à mettre à jour (batch=%d, seuil=%dj)", len(stale), batch_size, MAX_AGE_DAYS)
-    success = 0
-    failed = 0
-    inserted_total = 0
+
+    # Scraping FFA de tout le batch en une passe (client et boucle uniques)
+    ffa_seqs = [str(a["seq"]) for a in stale if not str(a["seq"]).startswith("WA_")]
+    prefetched: Dict[str, pd.DataFrame] = {}
+    if ffa_seqs:
+        try:
+            known_years = None if full else get_stored_years(ffa_seqs)
+            prefetched = fetch_ffa_batch(ffa_seqs, known_years)
+        except Exception:
+            logging.exception("   ↳ Erreur lors du téléchargement groupé FFA")
+
+    # Résultats et last_update écrits par paquets (quelques transactions par batch)
+    writer = ResultsWriter()
+    counts = {"success": 0, "failed": 0, "inserted": 0}
     for ath in stale:
         logging.info("• Rafraîchissement %s (%s)", ath["name"], ath["seq"])
         try:
             if str(ath["seq"]).startswith("WA_"):
-                ok, inserted = refresh_wa(ath, engine)
+                queued, outcomes = refresh_wa(ath, engine, writer, full=full)
             else:
-                ok, inserted = refresh_ffa(ath, engine)
-            if ok:
-                success += 1
-                inserted_total += inserted
-            else:
-                failed += 1
+                queued, outcomes = refresh_ffa(ath, engine, writer, prefetched.get(str(ath["seq"])), full=full)
+            if not queued:
+                counts["failed"] += 1
+            _account(outcomes, counts)
         except Exception:
-            failed += 1
+            counts["failed"] += 1
             logging.exception("   ↳ Erreur sur %s", ath["seq"])
+    _account(writer.flush(), counts)
     logging.info(
         "🏁 Batch terminé. total=%d, success=%d, failed=%d, inserted=%d",
         len(stale),
-        success,
-        failed,
-        inserted_total,
+        counts["success"],
+        counts["failed"],
+        counts["inserted"],
+    )
+    logging.info(
+        "   ↳ écritures : %d transaction(s) groupée(s), %d reprise(s) une par une",
+        writer.stats["flushes"],
+        writer.stats["fallbacks"],
+    )
+    for host, stats in limiter_stats().items():
+        logging.info(
+            "   ↳ %s : requêtes=%d, throttlées=%d (%.1fs), 429=%d, échecs=%d, disjoncteur=%s (%d déclenchement(s))",
+            host,
+            stats["requests"],
+            stats["throttled"],
+            stats["throttled_seconds"],
+            stats["rate_limited"],
+            stats["failures"],
+            stats["breaker_state"],
+            stats["breaker_trips"],
+        )
+    cache = cache_stats()
+    logging.info(
+        "   ↳ cache saisons : hits=%d, revalidés=%d, réseau=%d (ratio=%.0f%%)",
+        cache["hits"],
+        cache["revalidated"],
+        cache["misses"],
+        100 * cache["hit_ratio"],
     )
     return len(stale)
 
@@ -163,17 +244,30 @@ def main():
     parser.add_argument("--loop", action="store_true", help="boucle jusqu’à mise à jour complète")
     parser.add_argument("--delay", type=int, default=DEFAULT_DELAY, help="délai entre batches en secondes")
     parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="taille du batch (par ex. 10)")
+    parser.add_argument("--full", action="store_true", help="re-crawl complet (toutes les saisons) au lieu de l’incrémental")
+    parser.add_argument("--enrich-birth", action="store_true", help="complète ensuite les naissances manquantes (birth_year NULL)")
     args = parser.parse_args()
 
+    try:
+        applied = ensure_schema(engine)
+        if applied:
+            logging.info("🗄️  Migrations appliquées : %s", applied)
+    except Exception as e:
+        logging.warning("⚠️  Migrations non appliquées : %s", e)
+
     if args.loop:
         while True:
-            count = process_batch(args.batch)
+            count = process_batch(args.batch, full=args.full)
             if count == 0:
                 break
             logging.info("⏳ Pause %d s avant batch suivant…", args.delay)
             time.sleep(args.delay)
     else:
-        process_batch(args.batch)
+        process_batch(args.batch, full=args.full)
+
+    if args.enrich_birth:
+        completed = enrich_birth_info(engine, max_concurrency=FFA_CONCURRENCY)
+        logging.info("🎂 Naissances complétées : %d athlète(s)", completed)
 
 
 if __name__ == "__main__":